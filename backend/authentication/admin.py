@@ -1,5 +1,8 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from posts.admin import subquery_count
+from posts.models import Post
+from posts.pagination import EstimatedCountPaginator
 from .models import User
 
 @admin.register(User)
@@ -12,14 +15,19 @@ class CustomUserAdmin(UserAdmin):
     search_fields = ('username', 'email', 'first_name', 'last_name', 'bio')
     ordering = ('-date_joined',)
     list_per_page = 25
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     list_editable = ('is_active',)
     readonly_fields = ('date_joined', 'last_login', 'created_at', 'updated_at')
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(num_posts=subquery_count(Post, 'author'))
+    
     def post_count(self, obj):
         """Display number of posts by user"""
-        return obj.post_set.count()
+        return obj.num_posts
     post_count.short_description = 'Posts'
-    post_count.admin_order_field = 'post_count'
+    post_count.admin_order_field = 'num_posts'
     
     # Fields to display in the admin form
     fieldsets = (
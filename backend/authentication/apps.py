@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class AuthenticationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'authentication'
+    
+    def ready(self):
+        # Drop cached users/tokens used by the cached authentication classes
+        from . import backends  # noqa: F401
+        # Register the profile image job handler
+        from . import images  # noqa: F401
@@ -0,0 +1,159 @@
+"""
+Authentication classes that cache the authenticated user.
+
+Token and JWT authentication normally load the user row on every request.
+Here the user is kept in the cache for AUTH_CACHE_TIMEOUT seconds: `token key
+-> user id` and `user id -> user snapshot`, so an authenticated request on a
+cache hit runs no queries for authentication. Entries are dropped when a user
+is saved (profile updates, password resets, deactivation in delete_user and
+update_user) or deleted, and when a token is deleted (logout). With the local
+memory cache this only reaches the current process; set REDIS_URL to share
+invalidation between workers. Other processes then see the change once the
+short timeout expires.
+
+`SnapshotJWTAuthentication` is the opt-in fast path for identity-only
+endpoints: snapshot access tokens (authentication/tokens.py) carry the user
+fields those endpoints need, so it builds the user from the token and checks
+the in-memory revocation list instead of touching the database.
+
+Snapshots are loaded without the `version`/`changed_at` columns, which are
+bumped with queryset updates (posts/versioning.py), so saving `request.user`
+never writes back a stale version. A snapshot can still be up to
+AUTH_CACHE_TIMEOUT seconds old, so write paths reload the row and save only
+the columns they change.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed as JWTAuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .tokens import SnapshotAccessToken, SnapshotUser, revocations, revoke_snapshot_tokens
+
+# Columns changed outside of Model.save(); never part of a cached snapshot
+VOLATILE_USER_FIELDS = ('version', 'changed_at')
+
+
+def token_cache_key(key):
+    return f'auth:token:{key}'
+
+
+def user_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def cache_user(user):
+    cache.set(user_cache_key(user.pk), user, settings.AUTH_CACHE_TIMEOUT)
+
+
+def get_cached_user(user_id):
+    """User snapshot for `user_id` from the cache or the database; None if the user does not exist"""
+    user = cache.get(user_cache_key(user_id))
+    if user is None:
+        user = get_user_model().objects.defer(*VOLATILE_USER_FIELDS).filter(pk=user_id).first()
+        if user is not None:
+            cache_user(user)
+    return user
+
+
+def invalidate_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+def invalidate_token(key):
+    cache.delete(token_cache_key(key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication backed by the token and user snapshot cache"""
+
+    def authenticate_credentials(self, key):
+        user_id = cache.get(token_cache_key(key))
+        user = get_cached_user(user_id) if user_id is not None else None
+
+        if user is None:
+            model = self.get_model()
+            try:
+                token = model.objects.select_related('user').defer(
+                    *(f'user__{field}' for field in VOLATILE_USER_FIELDS)
+                ).get(key=key)
+            except model.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            user = token.user
+            cache.set(token_cache_key(key), user.pk, settings.AUTH_CACHE_TIMEOUT)
+            cache_user(user)
+
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        # Unsaved instance: same key and user as the stored token, so .delete() still works
+        return (user, Token(key=key, user=user))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that reads the user from the snapshot cache"""
+
+    def get_user_id(self, validated_token):
+        try:
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        # Snapshot tokens are also accepted here (AUTH_TOKEN_CLASSES) and must honour revocations
+        is_snapshot = validated_token.get(jwt_settings.TOKEN_TYPE_CLAIM) == SnapshotAccessToken.token_type
+        if is_snapshot and revocations.is_revoked(user_id, validated_token['iat']):
+            raise JWTAuthenticationFailed(_('Token has been revoked'), code='token_revoked')
+        return user_id
+
+    def get_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        user = get_cached_user(user_id)
+        if user is None:
+            raise JWTAuthenticationFailed(_('User not found'), code='user_not_found')
+        if not user.is_active:
+            raise JWTAuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        if jwt_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(jwt_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise JWTAuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+
+        return user
+
+
+class SnapshotJWTAuthentication(CachedJWTAuthentication):
+    """
+    Authenticate snapshot access tokens without database access; the user is a
+    stateless SnapshotUser (id, username, is_staff, is_active), so only use it on
+    views that need nothing more. Regular access tokens fall back to the cached lookup.
+    """
+
+    def get_user(self, validated_token):
+        if validated_token.get(jwt_settings.TOKEN_TYPE_CLAIM) != SnapshotAccessToken.token_type:
+            return super().get_user(validated_token)
+
+        self.get_user_id(validated_token)
+        user = SnapshotUser(validated_token)
+        if not user.is_active:
+            raise JWTAuthenticationFailed(_('User is inactive'), code='user_inactive')
+        return user
+
+
+@receiver([post_save, post_delete], sender=settings.AUTH_USER_MODEL)
+def _user_changed(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+    # Snapshot tokens still say is_active=True; reject them once the user is gone or deactivated
+    if kwargs.get('signal') is post_delete or not instance.is_active:
+        revoke_snapshot_tokens(instance.pk, reason='deactivated')
+
+
+@receiver(post_delete, sender=Token)
+def _token_deleted(sender, instance, **kwargs):
+    invalidate_token(instance.key)
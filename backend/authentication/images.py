@@ -0,0 +1,141 @@
+"""
+Profile image variants.
+
+`upload_profile_image` only stores the original and queues a
+`users.profile_image_variants` job. The worker (`manage.py process_jobs`)
+renders every size in settings.PROFILE_IMAGE['SIZES'] as square WebP and JPEG
+copies with EXIF (location, camera data) stripped, and records them in
+`User.profile_image_variants`. `User.get_profile_image_url()` serves the
+variant a client asks for via `?image_size=` / `?image_format=`.
+
+Media storage is content-addressed (core/storage.py), so identical images share
+files; `prune_orphaned_media()` (periodic job and `manage.py prune_media`)
+removes the ones no user references any more.
+"""
+import io
+import os
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from core.storage import is_content_addressed
+from posts.jobs import enqueue, job_handler
+
+SAVE_OPTIONS = {
+    'webp': lambda options: {'format': 'WEBP', 'quality': options['WEBP_QUALITY'], 'method': 4},
+    'jpeg': lambda options: {'format': 'JPEG', 'quality': options['JPEG_QUALITY'], 'optimize': True, 'progressive': True},
+}
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+
+
+def requested_variant(request):
+    """(size, format) asked for by the request's query parameters; None means the default"""
+    if request is None:
+        return None, None
+    params = getattr(request, 'query_params', request.GET)
+    options = settings.PROFILE_IMAGE
+    size = params.get('image_size')
+    image_format = params.get('image_format')
+    if size not in options['SIZES'] and size != 'original':
+        size = None
+    if image_format not in options['FORMATS']:
+        image_format = None
+    return size, image_format
+
+
+def queue_profile_image_variants(user):
+    """Queue rendering of the variants of `user`'s current profile image"""
+    return enqueue('users.profile_image_variants', {'user_id': user.pk, 'name': user.profile_image.name})
+
+
+def render_variants(original):
+    """{size: {format: bytes}} for every configured size and format"""
+    options = settings.PROFILE_IMAGE
+    with Image.open(original) as image:
+        # Apply the EXIF rotation to the pixels; the metadata itself is not copied to the variants
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+        variants = {}
+        for size_name, pixels in options['SIZES'].items():
+            resized = ImageOps.fit(image, (pixels, pixels), Image.LANCZOS)
+            variants[size_name] = {}
+            for image_format in options['FORMATS']:
+                frame = resized
+                if image_format == 'jpeg' and has_alpha:
+                    # JPEG has no alpha channel: flatten onto white
+                    frame = Image.new('RGB', resized.size, (255, 255, 255))
+                    frame.paste(resized, mask=resized.getchannel('A'))
+                buffer = io.BytesIO()
+                frame.save(buffer, **SAVE_OPTIONS[image_format](options))
+                variants[size_name][image_format] = buffer.getvalue()
+    return variants
+
+
+@job_handler('users.profile_image_variants')
+def handle_profile_image_variants(user_id, name):
+    from authentication.backends import invalidate_user
+
+    User = get_user_model()
+    user = User.objects.filter(pk=user_id).first()
+    if user is None or user.profile_image.name != name:
+        return  # User gone or a newer upload superseded this one (it has its own job)
+
+    with default_storage.open(name, 'rb') as original:
+        rendered = render_variants(original)
+
+    variants = {}
+    for size_name, formats in rendered.items():
+        variants[size_name] = {}
+        for image_format, content in formats.items():
+            # Content-addressed storage (core/storage.py) replaces the name with the content hash
+            path = f'profile_images/variants/{size_name}.{EXTENSIONS[image_format]}'
+            variants[size_name][image_format] = default_storage.save(path, ContentFile(content))
+
+    # Only attach the variants if the image was not replaced while rendering;
+    # files left unreferenced either way are removed by prune_orphaned_media()
+    updated = User.objects.filter(pk=user_id, profile_image=name).update(
+        profile_image_variants=variants, updated_at=timezone.now()
+    )
+    if updated:
+        invalidate_user(user_id)  # queryset updates bypass the cache invalidation signal
+
+
+def referenced_media():
+    """Storage names of every profile image and variant still in use"""
+    names = set()
+    rows = get_user_model().objects.exclude(profile_image='').exclude(profile_image__isnull=True)
+    for image, variants in rows.values_list('profile_image', 'profile_image_variants').iterator():
+        names.add(image)
+        for formats in (variants or {}).values():
+            names.update(formats.values())
+    return names
+
+
+@job_handler('media.prune_orphans')
+def prune_orphaned_media(dry_run=False):
+    """
+    Delete content-addressed profile images nobody references. Files are shared
+    between users, so they are never deleted on replacement; files younger than
+    PROFILE_IMAGE['PRUNE_GRACE_SECONDS'] may belong to an upload still in flight.
+    """
+    referenced = referenced_media()
+    cutoff = time.time() - settings.PROFILE_IMAGE['PRUNE_GRACE_SECONDS']
+    root = os.path.join(settings.MEDIA_ROOT, 'profile_images')
+    removed = []
+    for directory, _, files in os.walk(root):
+        for filename in files:
+            full_path = os.path.join(directory, filename)
+            name = os.path.relpath(full_path, settings.MEDIA_ROOT).replace(os.sep, '/')
+            if name in referenced or not is_content_addressed(name) or os.path.getmtime(full_path) > cutoff:
+                continue
+            if not dry_run:
+                default_storage.delete(name)
+            removed.append(name)
+    return removed
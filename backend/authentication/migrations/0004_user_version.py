@@ -0,0 +1,23 @@
+# Generated manually for conditional GET validators
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0003_user_reset_token_user_reset_token_expires'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='changed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
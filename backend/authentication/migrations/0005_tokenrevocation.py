@@ -0,0 +1,27 @@
+# Generated manually for snapshot access token revocation
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0004_user_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenRevocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.BigIntegerField()),
+                ('revoked_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('reason', models.CharField(blank=True, max_length=50)),
+            ],
+            options={
+                'db_table': 'token_revocations',
+                'indexes': [models.Index(fields=['revoked_at'], name='token_revocations_at_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated manually for the admin user list (indexed search, keyset pagination)
+
+from django.db import migrations, models
+
+
+TRIGRAM_INDEX = 'users_search_text_trgm_idx'
+
+
+def backfill_search_text(apps, schema_editor):
+    User = apps.get_model('authentication', 'User')
+    batch = []
+    for user in User.objects.only('id', 'username', 'first_name', 'last_name', 'email').iterator():
+        values = (user.username, user.first_name, user.last_name, user.email)
+        user.search_text = ' '.join(value for value in values if value).lower()
+        batch.append(user)
+        if len(batch) >= 1000:
+            User.objects.bulk_update(batch, ['search_text'])
+            batch = []
+    if batch:
+        User.objects.bulk_update(batch, ['search_text'])
+
+
+def create_trigram_index(apps, schema_editor):
+    # A trigram GIN index serves `LIKE '%term%'`; other databases scan the column
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {TRIGRAM_INDEX} ON users USING gin (search_text gin_trgm_ops)')
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {TRIGRAM_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0006_user_profile_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(backfill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['-date_joined', '-id'], name='users_date_joined_id_idx'),
+        ),
+    ]
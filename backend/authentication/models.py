@@ -1,9 +1,19 @@
 from django.contrib.auth.models import AbstractUser
+from django.conf import settings
 from django.db import models
 from django.core.validators import RegexValidator
+from django.utils import timezone
 import os
 
 
+SEARCH_TEXT_FIELDS = ('username', 'first_name', 'last_name', 'email')
+
+
+def build_search_text(*values):
+    """Text matched by the admin user search: the non-empty values, lower-cased"""
+    return ' '.join(value for value in values if value).lower()
+
+
 class User(AbstractUser):
     """
     Custom User model for Wrytera
@@ -19,6 +29,8 @@ class User(AbstractUser):
         null=True,
         help_text='Upload a profile image (JPG, PNG, WebP)'
     )
+    # Resized copies made by the job worker (authentication/images.py): {size: {format: storage name}}
+    profile_image_variants = models.JSONField(default=dict, blank=True, editable=False)
     date_of_birth = models.DateField(blank=True, null=True)
     
     # Phone number with validation
@@ -41,6 +53,14 @@ class User(AbstractUser):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Bumped whenever the public profile payload changes (follows, posts; see posts/versioning.py)
+    version = models.PositiveIntegerField(default=0, editable=False)
+    changed_at = models.DateTimeField(null=True, blank=True, editable=False)
+    
+    # Lower-cased username, names and email for the admin user search, kept in sync
+    # by save() and served by a trigram index on PostgreSQL (migration 0007)
+    search_text = models.TextField(blank=True, default='', editable=False)
+    
     # Email should be unique
     email = models.EmailField(unique=True)
     
@@ -60,25 +80,60 @@ class User(AbstractUser):
         db_table = 'users'
         verbose_name = 'User'
         verbose_name_plural = 'Users'
+        indexes = [
+            # Keyset order of the admin user list (views.users_list)
+            models.Index(fields=['-date_joined', '-id'], name='users_date_joined_id_idx'),
+        ]
     
     def __str__(self):
         return self.username
     
+    def save(self, *args, **kwargs):
+        self.search_text = build_search_text(self.username, self.first_name, self.last_name, self.email)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) & set(SEARCH_TEXT_FIELDS):
+            kwargs['update_fields'] = {*update_fields, 'search_text'}
+        super().save(*args, **kwargs)
+    
     def get_full_name(self):
         """Return the user's full name"""
         return f"{self.first_name} {self.last_name}".strip() or self.username
     
-    def save(self, *args, **kwargs):
-        """Override save method"""
-        super().save(*args, **kwargs)
-        
-        # TODO: Re-enable image resizing when PIL is properly installed
-        # Image processing temporarily disabled due to PIL import issues
-        pass
-    
     @property
     def profile_image_url(self):
         """Return the profile image URL or None"""
-        if self.profile_image:
-            return self.profile_image.url
-        return None
+        return self.get_profile_image_url()
+    
+    def get_profile_image_url(self, size=None, image_format=None):
+        """
+        URL of a resized variant of the profile image (default size and format
+        from settings.PROFILE_IMAGE), or of the original until the variants exist
+        """
+        if not self.profile_image:
+            return None
+        if size != 'original':
+            options = settings.PROFILE_IMAGE
+            formats = self.profile_image_variants.get(size or options['DEFAULT_SIZE'], {})
+            name = formats.get(image_format or options['FORMATS'][0])
+            if name:
+                return self.profile_image.storage.url(name)
+        return self.profile_image.url
+
+
+class TokenRevocation(models.Model):
+    """
+    Snapshot access tokens of `user` issued at or before `revoked_at` are rejected
+    (logout, password change, deactivation). See authentication/tokens.py.
+    """
+    user_id = models.BigIntegerField()  # Not a foreign key: revocations must outlive deleted users
+    revoked_at = models.DateTimeField(default=timezone.now)
+    reason = models.CharField(max_length=50, blank=True)
+    
+    class Meta:
+        db_table = 'token_revocations'
+        indexes = [
+            models.Index(fields=['revoked_at'], name='token_revocations_at_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} revoked at {self.revoked_at} ({self.reason})"
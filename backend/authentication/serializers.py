@@ -1,7 +1,11 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from posts.models import Post, SavedPost
 from .models import User
+from .images import requested_variant
 import re
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -138,15 +142,27 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'profile_image_url', 'is_staff', 'is_superuser']
     
     def get_profile_image_url(self, obj):
-        """Return the full URL for the profile image"""
+        """Return the full URL for the profile image (size/format from ?image_size=&image_format=)"""
         if obj.profile_image:
             request = self.context.get('request')
+            variant = self.context.get('image_variant') or requested_variant(request)
+            url = obj.get_profile_image_url(*variant)
             if request:
-                return request.build_absolute_uri(obj.profile_image.url)
-            return obj.profile_image.url
+                return request.build_absolute_uri(url)
+            return url
         return None
 
 
+def with_admin_counts(queryset):
+    """Annotate post and saved-post counts as correlated subqueries (no row loading, no join fan-out)"""
+    posts = Post.objects.filter(author=OuterRef('pk')).order_by().values('author').annotate(count=Count('id')).values('count')
+    saved = SavedPost.objects.filter(user=OuterRef('pk')).order_by().values('user').annotate(count=Count('id')).values('count')
+    return queryset.annotate(
+        num_posts=Coalesce(Subquery(posts), 0),
+        num_saved_posts=Coalesce(Subquery(saved), 0),
+    )
+
+
 class AdminUserSerializer(serializers.ModelSerializer):
     """
     Enhanced serializer for admin dashboard with calculated fields
@@ -170,20 +186,26 @@ class AdminUserSerializer(serializers.ModelSerializer):
         ]
     
     def get_profile_image_url(self, obj):
-        """Return the full URL for the profile image"""
+        """Return the full URL for the profile image (size/format from ?image_size=&image_format=)"""
         if obj.profile_image:
             request = self.context.get('request')
+            variant = self.context.get('image_variant') or requested_variant(request)
+            url = obj.get_profile_image_url(*variant)
             if request:
-                return request.build_absolute_uri(obj.profile_image.url)
-            return obj.profile_image.url
+                return request.build_absolute_uri(url)
+            return url
         return None
     
     def get_posts_count(self, obj):
         """Return the number of posts by this user"""
+        if hasattr(obj, 'num_posts'):
+            return obj.num_posts  # annotated by with_admin_counts()
         return obj.posts.count()
     
     def get_saved_posts_count(self, obj):
         """Return the number of posts saved by this user"""
+        if hasattr(obj, 'num_saved_posts'):
+            return obj.num_saved_posts
         return obj.saved_posts.count()
     
     def get_full_name(self, obj):
@@ -1,3 +1,36 @@
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from .models import User
+
+
+class CachedUserWriteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='writer', email='writer@example.com', password='pass12345')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+        # Cache the user snapshot
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 200)
+
+    def test_profile_update_keeps_changes_made_elsewhere(self):
+        # Another process (the image worker) writes without reaching this process's cache
+        variants = {'64': {'webp': 'profile_images/variants/abc.webp'}}
+        User.objects.filter(pk=self.user.pk).update(profile_image_variants=variants)
+
+        response = self.client.put('/api/auth/profile/', {'bio': 'Hello'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.bio, 'Hello')
+        self.assertEqual(self.user.profile_image_variants, variants)
+
+    def test_profile_update_does_not_reactivate(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+
+        self.client.put('/api/auth/profile/', {'bio': 'Hello'}, format='json')
+
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
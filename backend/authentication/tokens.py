@@ -0,0 +1,90 @@
+"""
+Snapshot access tokens: short-lived JWTs that carry the few user fields the
+API needs for identity-only endpoints (id, username, is_staff, is_active), so
+`SnapshotJWTAuthentication` can authenticate them without loading the user.
+
+Because the user row is not consulted, revocation (logout, password change,
+deactivation) goes through `TokenRevocation` rows. Every process keeps the
+recent revocations in memory and reloads them at most every
+SNAPSHOT_JWT['REVOCATION_REFRESH_SECONDS'], so checks are in-memory dict lookups.
+Revocations older than the token lifetime cannot match a live token and are pruned.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.tokens import AccessToken
+
+SNAPSHOT_CLAIMS = ('username', 'is_staff', 'is_active')
+
+
+class SnapshotAccessToken(AccessToken):
+    """Access token with an embedded user snapshot (POST /api/auth/token/snapshot/)"""
+    token_type = 'snapshot_access'
+    lifetime = settings.SNAPSHOT_JWT['LIFETIME']
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim in SNAPSHOT_CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
+
+
+class SnapshotUser(TokenUser):
+    """Stateless user backed by a snapshot token; has no database row behind it"""
+
+    @property
+    def is_active(self):
+        return self.token.get('is_active', False)
+
+
+class RevocationList:
+    """Process-local view of recent TokenRevocation rows: user id -> latest revocation timestamp"""
+
+    def __init__(self):
+        self._revoked = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def _window_start(self):
+        return timezone.now() - settings.SNAPSHOT_JWT['LIFETIME']
+
+    def reload(self):
+        from .models import TokenRevocation
+        rows = (
+            TokenRevocation.objects.filter(revoked_at__gte=self._window_start())
+            .values('user_id').annotate(latest=Max('revoked_at'))
+        )
+        revoked = {row['user_id']: row['latest'].timestamp() for row in rows}
+        with self._lock:
+            self._revoked = revoked
+            self._loaded_at = time.monotonic()
+
+    def is_revoked(self, user_id, issued_at):
+        """Whether a token of `user_id` issued at `issued_at` (epoch seconds) has been revoked"""
+        loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at >= settings.SNAPSHOT_JWT['REVOCATION_REFRESH_SECONDS']:
+            self.reload()
+        revoked_at = self._revoked.get(user_id)
+        # iat has whole-second precision: a token from the same second as the revocation is rejected too
+        return revoked_at is not None and issued_at <= revoked_at
+
+    def revoke(self, user_id, reason=''):
+        from .models import TokenRevocation
+        revocation = TokenRevocation.objects.create(user_id=user_id, reason=reason)
+        TokenRevocation.objects.filter(revoked_at__lt=self._window_start()).delete()
+        with self._lock:
+            self._revoked[user_id] = max(self._revoked.get(user_id, 0), revocation.revoked_at.timestamp())
+        return revocation
+
+
+revocations = RevocationList()
+
+
+def revoke_snapshot_tokens(user_id, reason=''):
+    """Reject every snapshot token issued to `user_id` so far"""
+    return revocations.revoke(user_id, reason)
@@ -2,6 +2,7 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes, parser_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
 from rest_framework_simplejwt.tokens import RefreshToken
@@ -14,12 +15,22 @@ from django.conf import settings
 from django.utils.crypto import get_random_string
 from django.utils import timezone
 from datetime import timedelta
-from django.core.paginator import Paginator
-from django.db.models import Q, Count
 from PIL import Image
 import os
-from .serializers import UserRegistrationSerializer, UserLoginSerializer, UserSerializer, AdminUserSerializer
+from .serializers import UserRegistrationSerializer, UserLoginSerializer, UserSerializer, AdminUserSerializer, with_admin_counts
 from .models import User
+from .tokens import SnapshotAccessToken, revoke_snapshot_tokens
+from .images import queue_profile_image_variants, requested_variant
+from posts.pagination import count_rows
+from core.db_routing import pin_credentials
+
+
+class AdminUserPagination(CursorPagination):
+    """Keyset pages of the admin user list: cost does not grow with the page depth"""
+    page_size = 50
+    ordering = ('-date_joined', '-id')
+    # Numbered pages (legacy `?page=N`) use OFFSET; deeper pages must follow the `next` cursor
+    max_page_number = 100
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -42,6 +53,8 @@ def signup(request):
             
             # Create or get DRF token
             token, created = Token.objects.get_or_create(user=user)
+            # The new credentials read from the primary until replicas have the user and token
+            pin_credentials(f'Token {token.key}', f'Bearer {access_token}')
             
             # Return user data and token
             user_data = UserSerializer(user).data
@@ -86,6 +99,8 @@ def login(request):
             
             # Create or get DRF token
             token, created = Token.objects.get_or_create(user=user)
+            # The new credentials read from the primary until replicas have the user and token
+            pin_credentials(f'Token {token.key}', f'Bearer {access_token}')
             
             # Return user data and token
             user_data = UserSerializer(user).data
@@ -129,6 +144,8 @@ def user_profile(request):
         elif request.method == 'PUT':
             # Update user profile
             data = request.data
+            # request.user may be a cached snapshot: write through the current row
+            user = User.objects.get(pk=user.pk)
             
             # Check if password change is requested
             if 'new_password' in data and data['new_password']:
@@ -147,6 +164,7 @@ def user_profile(request):
                 user.set_password(data['new_password'])
             
             # Update other fields
+            profile_fields = ['username', 'email', 'first_name', 'last_name', 'bio', 'website', 'phone_number']
             user.username = data.get('username', user.username)
             user.email = data.get('email', user.email)
             user.first_name = data.get('first_name', user.first_name)
@@ -158,7 +176,10 @@ def user_profile(request):
             # Validate and save
             try:
                 user.full_clean()
-                user.save()
+                # Only the edited columns: a full save would write back values other processes changed
+                user.save(update_fields=[*profile_fields, 'password', 'updated_at'])
+                if data.get('new_password'):
+                    revoke_snapshot_tokens(user.id, reason='password_change')
                 
                 # Return updated user data
                 user_data = UserSerializer(user).data
@@ -217,24 +238,23 @@ def upload_profile_image(request):
                 'error': 'Image size must be less than 5MB'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Delete old profile image if exists
-        if user.profile_image:
-            try:
-                if os.path.isfile(user.profile_image.path):
-                    os.remove(user.profile_image.path)
-            except Exception as e:
-                print(f"Error deleting old profile image: {e}")
-        
-        # Save new profile image
+        # Save new profile image; resized variants are rendered by the job worker.
+        # Files are content-addressed and may be shared with other users, so the old
+        # image is left for the periodic media prune instead of being deleted here.
+        # request.user may be a cached snapshot: save only the image columns on the current row
+        user = User.objects.get(pk=user.pk)
         user.profile_image = image_file
-        user.save()
+        user.profile_image_variants = {}
+        user.save(update_fields=['profile_image', 'profile_image_variants', 'updated_at'])
+        queue_profile_image_variants(user)
         
-        # Return success response with updated user data
+        # Return success response with updated user data (original image URL until the variants exist)
         user_data = UserSerializer(user).data
         return Response({
             'message': 'Profile image uploaded successfully!',
             'user': user_data,
-            'profile_image_url': user.profile_image_url
+            'profile_image_url': user.profile_image_url,
+            'variants_pending': True
         }, status=status.HTTP_200_OK)
         
     except Exception as e:
@@ -253,7 +273,7 @@ def current_user(request):
     """
     try:
         user = request.user
-        user_data = UserSerializer(user).data
+        user_data = UserSerializer(user, context={'image_variant': requested_variant(request)}).data
         return Response({
             'user': user_data
         }, status=status.HTTP_200_OK)
@@ -273,7 +293,7 @@ def get_user_by_id(request, user_id):
     """
     try:
         user = User.objects.get(id=user_id)
-        user_data = UserSerializer(user).data
+        user_data = UserSerializer(user, context={'image_variant': requested_variant(request)}).data
         return Response(user_data, status=status.HTTP_200_OK)
     except User.DoesNotExist:
         return Response({
@@ -291,7 +311,7 @@ def users_list(request):
     """
     Get paginated list of users with search functionality
     Requires: Authentication (staff users only for admin)
-    Query params: page, search
+    Query params: cursor (keyset pages, see `next`/`previous`), page (numbered pages, legacy), search
     Returns: Paginated user list
     """
     try:
@@ -304,33 +324,48 @@ def users_list(request):
         # Get query parameters
         page = int(request.GET.get('page', 1))
         search = request.GET.get('search', '').strip()
-        page_size = 50  # Items per page - increased to show more users
-        
-        # Build queryset with search and optimize for admin dashboard
-        queryset = User.objects.select_related().prefetch_related('posts', 'saved_posts').order_by('-date_joined')
         
+        users_queryset = User.objects.all()
         if search:
-            queryset = queryset.filter(
-                Q(username__icontains=search) |
-                Q(email__icontains=search) |
-                Q(first_name__icontains=search) |
-                Q(last_name__icontains=search)
-            )
+            # One LIKE on the denormalized column (trigram index on PostgreSQL)
+            users_queryset = users_queryset.filter(search_text__contains=search.lower())
+        
+        # Counts are correlated subqueries; no post or saved-post rows are loaded
+        queryset = with_admin_counts(users_queryset)
         
-        # Paginate results
-        paginator = Paginator(queryset, page_size)
-        page_obj = paginator.get_page(page)
+        paginator = AdminUserPagination()
+        if page > 1 and paginator.cursor_query_param not in request.GET:
+            if page > paginator.max_page_number:
+                return Response({
+                    'message': f'Numbered pages stop at {paginator.max_page_number}; follow the `next` cursor for deeper pages.'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            # Numbered pages still work for old clients, at (bounded) OFFSET cost
+            offset = (page - 1) * paginator.page_size
+            users = list(queryset.order_by(*paginator.ordering)[offset:offset + paginator.page_size + 1])
+            has_next = len(users) > paginator.page_size
+            users = users[:paginator.page_size]
+            has_previous = True
+            next_url = previous_url = None
+        else:
+            users = paginator.paginate_queryset(queryset, request)
+            has_next, has_previous = paginator.has_next, paginator.has_previous
+            next_url, previous_url = paginator.get_next_link(), paginator.get_previous_link()
         
         # Serialize users with admin-specific data
-        users_data = AdminUserSerializer(page_obj.object_list, many=True, context={'request': request}).data
+        users_data = AdminUserSerializer(users, many=True, context={'request': request}).data
         
+        # Exact while cheap, estimated from table statistics on large user tables
+        count, count_is_estimated = count_rows(users_queryset)
         return Response({
             'results': users_data,
-            'count': paginator.count,
-            'num_pages': paginator.num_pages,
+            'next': next_url,
+            'previous': previous_url,
+            'count': count,
+            'count_is_estimated': count_is_estimated,
+            'num_pages': max(1, -(-count // paginator.page_size)),
             'current_page': page,
-            'has_next': page_obj.has_next(),
-            'has_previous': page_obj.has_previous(),
+            'has_next': has_next,
+            'has_previous': has_previous,
         }, status=status.HTTP_200_OK)
         
     except Exception as e:
@@ -360,7 +395,7 @@ def delete_user(request, user_id):
         user.is_active = False
         user.email = f"deleted_{user.id}_{user.email}"  # Prevent email conflicts
         user.username = f"deleted_{user.id}_{user.username}"  # Prevent username conflicts
-        user.save()
+        user.save(update_fields=['is_active', 'email', 'username', 'updated_at'])
         
         return Response({'message': 'User deactivated successfully'}, status=status.HTTP_200_OK)
     except User.DoesNotExist:
@@ -381,7 +416,7 @@ def update_user(request, user_id):
         
         user = User.objects.get(id=user_id)
         user.is_active = not user.is_active
-        user.save()
+        user.save(update_fields=['is_active', 'updated_at'])
         return Response({'message': 'User updated successfully', 'is_active': user.is_active}, status=status.HTTP_200_OK)
     except User.DoesNotExist:
         return Response({'message': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -415,7 +450,7 @@ def forgot_password(request):
         reset_token = get_random_string(32)
         user.reset_token = reset_token
         user.reset_token_expires = timezone.now() + timedelta(hours=1)
-        user.save()
+        user.save(update_fields=['reset_token', 'reset_token_expires'])
         
         # Send password reset email
         try:
@@ -502,7 +537,8 @@ def reset_password(request):
         user.set_password(new_password)
         user.reset_token = None
         user.reset_token_expires = None
-        user.save()
+        user.save(update_fields=['password', 'reset_token', 'reset_token_expires', 'updated_at'])
+        revoke_snapshot_tokens(user.id, reason='password_reset')
         
         return Response({
             'message': 'Password reset successfully!'
@@ -526,6 +562,7 @@ def logout(request):
         # Delete the user's token to log them out
         if hasattr(request.user, 'auth_token'):
             request.user.auth_token.delete()
+        revoke_snapshot_tokens(request.user.id, reason='logout')
         
         return Response({
             'message': 'Logged out successfully!'
@@ -537,6 +574,21 @@ def logout(request):
             'error': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def snapshot_token(request):
+    """
+    Issue a short-lived snapshot access token
+    Requires: Authentication
+    Returns: JWT carrying id, username, is_staff and is_active, accepted by
+    identity-only endpoints without a user lookup (send as "Bearer <token>")
+    """
+    token = SnapshotAccessToken.for_user(request.user)
+    return Response({
+        'snapshot_token': str(token),
+        'expires_in': int(SnapshotAccessToken.lifetime.total_seconds()),
+    }, status=status.HTTP_200_OK)
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def create_admin(request):
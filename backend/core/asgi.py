@@ -2,6 +2,8 @@
 ASGI config for core project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Production runs it under gunicorn with uvicorn workers (see Procfile) so the
+server-sent notification stream can keep idle connections open cheaply.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -0,0 +1,113 @@
+"""
+Response compression for the API.
+
+Negotiates brotli (when the `brotli` package is installed) or gzip from the
+Accept-Encoding header and compresses responses above COMPRESSION['MIN_SIZE'].
+Responses that carry an ETag (see posts/versioning.py) are compressed once:
+the compressed bytes are cached under the encoding, Content-Type and a digest
+of the uncompressed body, so hot responses are served from the cache instead
+of being compressed per request. The key never trusts the ETag, which is
+computed by view code that does not know the rendered representation.
+Streaming responses (server-sent events, file downloads) are left untouched.
+
+Only the API's JSON and MessagePack bodies are compressed. HTML pages (admin,
+browsable API) carry CSRF tokens next to reflected input, and compressing them
+would expose the tokens to BREACH; they are served uncompressed.
+"""
+import gzip
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:  # Optional: fall back to gzip only
+    brotli = None
+
+COMPRESSIBLE_TYPES = frozenset({'application/json', 'application/msgpack'})
+
+
+def accepted_encodings(accept_encoding):
+    """Map of encoding -> q-value from an Accept-Encoding header"""
+    encodings = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        encodings[name] = quality
+    return encodings
+
+
+def choose_encoding(accept_encoding):
+    """Best encoding the client accepts and we support, or None"""
+    encodings = accepted_encodings(accept_encoding)
+    candidates = ['br', 'gzip'] if brotli is not None else ['gzip']
+    best = None
+    for encoding in candidates:
+        quality = encodings.get(encoding, encodings.get('*', 0))
+        if quality > 0 and (best is None or quality > best[1]):
+            best = (encoding, quality)
+    return best[0] if best else None
+
+
+def compress(content, encoding):
+    options = settings.COMPRESSION
+    if encoding == 'br':
+        return brotli.compress(content, quality=options['BROTLI_QUALITY'])
+    # mtime=0 keeps the output deterministic for identical content
+    return gzip.compress(content, compresslevel=options['GZIP_LEVEL'], mtime=0)
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """gzip/brotli compression of API responses with a compressed-bytes cache"""
+
+    def process_response(self, request, response):
+        options = settings.COMPRESSION
+
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type not in COMPRESSIBLE_TYPES:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        if response.status_code != 200 or len(response.content) < options['MIN_SIZE']:
+            return response
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        etag = response.get('ETag')
+        cache_key = None
+        compressed = None
+        if etag and options['CACHE_TIMEOUT']:
+            body_hash = hashlib.md5(response.content, usedforsecurity=False).hexdigest()
+            cache_key = f'compressed:{encoding}:{content_type}:{body_hash}'
+            compressed = cache.get(cache_key)
+
+        if compressed is None:
+            compressed = compress(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            if cache_key:
+                cache.set(cache_key, compressed, options['CACHE_TIMEOUT'])
+
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        response.headers['Content-Encoding'] = encoding
+        # The representation changed, so a strong ETag must become weak (as GZipMiddleware does)
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        return response
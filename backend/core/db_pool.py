@@ -0,0 +1,33 @@
+"""
+Connection pool metrics for the database aliases that use psycopg's pool.
+"""
+from django.db import connections
+
+
+def pool_stats():
+    """Per-alias pool counters: size, idle connections, waiting requests, wait time, timeouts"""
+    stats = {}
+    for alias in connections:
+        pool = getattr(connections[alias], 'pool', None)
+        if pool is None:
+            stats[alias] = {'pooled': False}
+            continue
+
+        raw = pool.get_stats()
+        stats[alias] = {
+            'pooled': True,
+            'min_size': raw.get('pool_min', pool.min_size),
+            'max_size': raw.get('pool_max', pool.max_size),
+            'size': raw.get('pool_size', 0),
+            'available': raw.get('pool_available', 0),
+            'waiting': raw.get('requests_waiting', 0),
+            # Counters below are cumulative since the pool was opened in this process
+            'checkouts': raw.get('requests_num', 0),
+            'queued': raw.get('requests_queued', 0),
+            'wait_ms': raw.get('requests_wait_ms', 0),
+            'timeouts': raw.get('requests_errors', 0),
+            'connections_opened': raw.get('connections_num', 0),
+            'connection_errors': raw.get('connections_errors', 0),
+            'connections_lost': raw.get('connections_lost', 0),
+        }
+    return stats
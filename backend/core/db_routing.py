@@ -0,0 +1,116 @@
+"""
+Read-replica routing with read-your-writes pinning.
+
+`ReplicaRoutingMiddleware` marks each request as replica-safe or not: GET,
+HEAD and OPTIONS requests may read from a replica (settings.DATABASE_REPLICAS),
+everything else uses the primary. After a client writes, its reads are pinned
+to the primary for REPLICA_PIN_SECONDS so it sees its own changes while the
+replicas catch up. Clients are identified by their Authorization header;
+login and signup pin the credentials they issue (`pin_credentials`), so a
+fresh session is pinned too. The client address is only used when
+REPLICA_PIN_TRUSTED_PROXIES says where to read it from: X-Forwarded-For is
+set by the client unless a trusted proxy overwrites it, and behind a proxy
+REMOTE_ADDR is the same for everyone.
+
+`ReplicaRouter` sends reads to a random replica only inside such requests and
+only until the request itself writes or opens a transaction; management
+commands, the job worker and anything else outside a request use the primary.
+"""
+import hashlib
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.deprecation import MiddlewareMixin
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# True while the current request may read from a replica
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+def use_primary():
+    """Send the remaining reads of the current request to the primary"""
+    _replica_reads.set(False)
+
+
+def _client_address(request):
+    """Client address as reported by the trusted proxies, or None if it cannot be trusted"""
+    proxies = settings.REPLICA_PIN_TRUSTED_PROXIES
+    if proxies is None:
+        return None
+    if proxies == 0:
+        return request.META.get('REMOTE_ADDR') or None
+    # Each trusted proxy appends the address it received from; entries before those are client-supplied
+    forwarded = [part.strip() for part in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if part.strip()]
+    return forwarded[-proxies] if len(forwarded) >= proxies else None
+
+
+def _authorization_key(authorization):
+    return f'db_pin:auth:{hashlib.sha256(authorization.encode()).hexdigest()}'
+
+
+def _client_keys(request):
+    """Cache keys identifying the client for read-your-writes pins"""
+    keys = []
+    authorization = request.META.get('HTTP_AUTHORIZATION')
+    if authorization:
+        keys.append(_authorization_key(authorization))
+    address = _client_address(request)
+    if address:
+        keys.append(f'db_pin:addr:{address}')
+    return keys
+
+
+def _pin(keys):
+    if settings.DATABASE_REPLICAS and keys:
+        cache.set_many({key: True for key in keys}, settings.REPLICA_PIN_SECONDS)
+
+
+def pin_credentials(*authorizations):
+    """Pin requests made with newly issued credentials (Authorization header values) to the primary"""
+    _pin([_authorization_key(authorization) for authorization in authorizations])
+
+
+class ReplicaRouter:
+    """Reads go to a replica when the current request allows it, writes to the primary"""
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db  # keep related lookups on the instance's database
+        if not _replica_reads.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        # Reads after a write in the same request must see it
+        use_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # replicas hold the same data as the primary
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Replicas receive the schema through replication
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaRoutingMiddleware(MiddlewareMixin):
+    """Allow replica reads for safe requests of clients that have not written recently"""
+
+    def process_request(self, request):
+        if not settings.DATABASE_REPLICAS or request.method not in SAFE_METHODS:
+            _replica_reads.set(False)
+            return
+        keys = _client_keys(request)
+        pinned = cache.get_many(keys) if keys else {}
+        _replica_reads.set(not pinned)
+
+    def process_response(self, request, response):
+        _replica_reads.set(False)
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            _pin(_client_keys(request))
+        return response
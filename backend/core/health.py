@@ -0,0 +1,106 @@
+"""
+Liveness and readiness probes for the platform's health checks.
+
+`/healthz` answers as long as the process can serve requests and never touches
+the database. `/readyz` checks the database aliases, applied migrations, the
+cache and the job queue table. Its result is kept in-process for
+READINESS_CACHE_SECONDS, so frequent probes do not compete with real traffic.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_safe
+
+_lock = threading.Lock()
+_last_result = None  # (checked_at monotonic, ready, checks)
+_migrations_applied = False  # Stays true for the life of the process once seen
+
+
+def check_databases():
+    for alias in connections:
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SELECT 1')
+    return {'aliases': list(connections)}
+
+
+def check_migrations():
+    global _migrations_applied
+    if not _migrations_applied:
+        executor = MigrationExecutor(connections[DEFAULT_DB_ALIAS])
+        pending = executor.migration_plan(executor.loader.graph.leaf_nodes())
+        if pending:
+            raise RuntimeError(f'{len(pending)} unapplied migration(s)')
+        _migrations_applied = True
+    return {}
+
+
+def check_cache():
+    cache.set('readyz:probe', 1, 30)
+    if cache.get('readyz:probe') != 1:
+        raise RuntimeError('cache did not return the probe value')
+    return {}
+
+
+def check_job_queue():
+    from posts.models import Job
+    # Served by jobs_status_run_at_idx; a lagging worker is reported, not fatal
+    oldest_due = Job.objects.filter(status='pending', run_at__lte=timezone.now()).order_by('run_at').values_list(
+        'run_at', flat=True
+    ).first()
+    lag = (timezone.now() - oldest_due).total_seconds() if oldest_due else 0
+    return {'lag_seconds': round(lag, 3)}
+
+
+CHECKS = [
+    ('database', check_databases),
+    ('migrations', check_migrations),
+    ('cache', check_cache),
+    ('job_queue', check_job_queue),
+]
+
+
+def run_checks():
+    """(ready, {check name: result}) for every readiness check"""
+    ready = True
+    checks = {}
+    for name, check in CHECKS:
+        started = time.perf_counter()
+        try:
+            result = {'ok': True, **check()}
+        except Exception as exc:
+            ready = False
+            result = {'ok': False, 'error': str(exc)}
+        result['ms'] = round((time.perf_counter() - started) * 1000, 2)
+        checks[name] = result
+    return ready, checks
+
+
+@never_cache
+@require_safe
+def healthz(request):
+    """Liveness: the process is up"""
+    return JsonResponse({'status': 'ok'})
+
+
+@never_cache
+@require_safe
+def readyz(request):
+    """Readiness: dependencies are reachable (results cached for a few seconds)"""
+    global _last_result
+    with _lock:
+        now = time.monotonic()
+        if _last_result is None or now - _last_result[0] >= settings.READINESS_CACHE_SECONDS:
+            _last_result = (now, *run_checks())
+        checked_at, ready, checks = _last_result
+
+    return JsonResponse(
+        {'status': 'ok' if ready else 'unavailable', 'age_seconds': round(now - checked_at, 3), 'checks': checks},
+        status=200 if ready else 503,
+    )
@@ -0,0 +1,128 @@
+"""
+Media file serving.
+
+Content-addressed files (core/storage.py) never change, so they are served
+with `Cache-Control: public, max-age=31536000, immutable` and browsers and
+CDNs do not ask again. Other files (uploads from before content addressing)
+get a short max-age. Single byte ranges are honoured with 206 responses.
+
+When MEDIA_SENDFILE['HEADER'] is set, the response carries only headers and
+the front proxy streams the file: `X-Accel-Redirect` (nginx, pointing at an
+`internal` location under MEDIA_SENDFILE['ACCEL_PREFIX']) or `X-Sendfile`
+(Apache/lighttpd, absolute path). The proxy then handles ranges itself.
+"""
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+from .storage import is_content_addressed
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def parse_range(header, size):
+    """(start, end) inclusive for a single `bytes=` range, None to serve everything, or 'unsatisfiable'"""
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None  # Malformed or multiple ranges: ignore the header
+    first, last = match.groups()
+    if first == '':
+        length = int(last)  # Suffix range: the last N bytes
+        if length == 0:
+            return 'unsatisfiable'
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return 'unsatisfiable'
+    return start, end
+
+
+class RangeFileWrapper:
+    """Iterate over `length` bytes of a file starting at `offset`"""
+    block_size = 64 * 1024
+
+    def __init__(self, filelike, offset, length):
+        self.filelike = filelike
+        self.filelike.seek(offset)
+        self.remaining = length
+
+    def __iter__(self):
+        try:
+            while self.remaining > 0:
+                data = self.filelike.read(min(self.block_size, self.remaining))
+                if not data:
+                    break
+                self.remaining -= len(data)
+                yield data
+        finally:
+            self.filelike.close()
+
+
+@require_safe
+def serve_media(request, path):
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('Invalid path')
+    if not os.path.isfile(full_path):
+        raise Http404('File not found')
+
+    stat = os.stat(full_path)
+    immutable = is_content_addressed(path)
+    # The file name is the content hash; for other files size + mtime will do
+    etag = f'"{os.path.splitext(os.path.basename(path))[0]}"' if immutable else f'"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+    headers = {
+        'Cache-Control': IMMUTABLE_CACHE_CONTROL if immutable else f"public, max-age={settings.MEDIA_SENDFILE['MUTABLE_MAX_AGE']}",
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Accept-Ranges': 'bytes',
+    }
+
+    if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+        response = HttpResponseNotModified()
+        for header in ('Cache-Control', 'ETag'):
+            response[header] = headers[header]
+        return response
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+
+    sendfile_header = settings.MEDIA_SENDFILE['HEADER']
+    if sendfile_header:
+        response = HttpResponse(content_type=content_type)
+        if sendfile_header == 'X-Accel-Redirect':
+            response[sendfile_header] = settings.MEDIA_SENDFILE['ACCEL_PREFIX'].rstrip('/') + '/' + path.lstrip('/')
+        else:
+            response[sendfile_header] = full_path
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    size = stat.st_size
+    byte_range = parse_range(request.headers['Range'], size) if 'Range' in request.headers else None
+    if byte_range == 'unsatisfiable':
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if byte_range is None:
+        response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+    else:
+        start, end = byte_range
+        response = FileResponse(RangeFileWrapper(open(full_path, 'rb'), start, end - start + 1), content_type=content_type, status=206)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+    if encoding:
+        response['Content-Encoding'] = encoding
+    for header, value in headers.items():
+        response[header] = value
+    return response
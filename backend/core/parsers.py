@@ -0,0 +1,33 @@
+"""
+Fast parsers for the REST API (see core/renderers.py for the matching renderers).
+"""
+import orjson
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+try:
+    import msgpack
+except ImportError:  # Optional: only needed for MessagePackParser
+    msgpack = None
+
+
+class ORJSONParser(BaseParser):
+    """JSON parser backed by orjson"""
+    media_type = 'application/json'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
+
+
+class MessagePackParser(BaseParser):
+    """MessagePack request bodies (`Content-Type: application/msgpack`)"""
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, msgpack.ExtraData, msgpack.FormatError, msgpack.StackError) as exc:
+            raise ParseError(f'MessagePack parse error - {exc}')
@@ -0,0 +1,77 @@
+"""
+Fast renderers for the REST API.
+
+ORJSONRenderer replaces DRF's JSONRenderer: orjson serializes datetimes,
+dates, UUIDs and dict/list subclasses (ReturnDict, OrderedDict) natively and
+anything else (Decimal, lazy strings, querysets, timedeltas) goes through DRF's
+own encoder, so the output matches what JSONRenderer produced.
+MessagePackRenderer serves the same data as application/msgpack for clients
+that ask for it in the Accept header.
+"""
+import datetime
+
+import orjson
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import msgpack
+except ImportError:  # Optional: only needed for MessagePackRenderer
+    msgpack = None
+
+# Fallback for types orjson does not handle itself
+_drf_encoder = JSONEncoder()
+
+
+def default(obj):
+    return _drf_encoder.default(obj)
+
+
+def _indent_requested(accepted_media_type, renderer_context):
+    """Same indent negotiation as DRF's JSONRenderer (`Accept: application/json; indent=4`)"""
+    if accepted_media_type:
+        for param in accepted_media_type.split(';')[1:]:
+            key, _, value = param.strip().partition('=')
+            if key == 'indent' and value.isdigit():
+                return int(value) > 0
+    return bool((renderer_context or {}).get('indent'))
+
+
+class ORJSONRenderer(BaseRenderer):
+    """JSON renderer backed by orjson"""
+    media_type = 'application/json'
+    format = 'json'
+    charset = None  # orjson always emits UTF-8
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        # OPT_UTC_Z writes UTC datetimes with a "Z" suffix like DRF's encoder
+        option = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+        if _indent_requested(accepted_media_type, renderer_context):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=default, option=option)
+
+
+def _msgpack_default(obj):
+    # Dates travel as the same ISO 8601 strings the JSON API uses
+    if isinstance(obj, datetime.datetime):
+        representation = obj.isoformat()
+        return representation[:-6] + 'Z' if representation.endswith('+00:00') else representation
+    if isinstance(obj, (datetime.date, datetime.time)):
+        return obj.isoformat()
+    return _drf_encoder.default(obj)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """MessagePack renderer, selected with `Accept: application/msgpack`"""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_msgpack_default, use_bin_type=True, datetime=False)
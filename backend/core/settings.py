@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 from datetime import timedelta
 import os
+from importlib.util import find_spec
 from decouple import config
 import dj_database_url
 
@@ -66,6 +67,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.compression.CompressionMiddleware',  # gzip/brotli for API responses
+    'core.db_routing.ReplicaRoutingMiddleware',  # read replicas with read-your-writes pinning
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Whitenoise for static files
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # CORS middleware
@@ -102,10 +105,29 @@ WSGI_APPLICATION = 'core.wsgi.application'
 
 # Use PostgreSQL for production (Railway) and SQLite for local development
 DATABASE_URL = config('DATABASE_URL', default=None)
+
+
+def pooled(database):
+    """Enable psycopg's connection pool on a parsed PostgreSQL database setting"""
+    if database['ENGINE'].endswith('postgresql') and config('DB_POOL', default=True, cast=bool):
+        # psycopg connection pool per worker process instead of a new connection per request.
+        # CONN_HEALTH_CHECKS makes the pool check connections before handing them out.
+        # See gunicorn.conf.py for fork handling and posts.views.db_pool_stats for metrics.
+        database['CONN_HEALTH_CHECKS'] = True
+        database.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+            'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+            'timeout': config('DB_POOL_TIMEOUT', default=10, cast=float),  # seconds to wait for a free connection
+            'max_idle': 300,  # close connections idle for 5 minutes (down to min_size)
+            'max_lifetime': 1800,  # recycle connections every 30 minutes
+        }
+    return database
+
+
 if DATABASE_URL:
     # Production database (Railway provides DATABASE_URL)
     DATABASES = {
-        'default': dj_database_url.parse(DATABASE_URL)
+        'default': pooled(dj_database_url.parse(DATABASE_URL))
     }
 else:
     # Local development database
@@ -116,6 +138,27 @@ else:
         }
     }
 
+# Read replicas (core/db_routing.py): comma-separated database URLs, e.g.
+# DATABASE_REPLICA_URLS=sqlite:///replica.sqlite3 locally. Safe-method requests
+# read from a replica; writes, and reads of clients that wrote within
+# REPLICA_PIN_SECONDS, go to the primary.
+DATABASE_REPLICAS = []
+for index, url in enumerate(config('DATABASE_REPLICA_URLS', default='', cast=lambda v: [s.strip() for s in v.split(',') if s.strip()])):
+    alias = f'replica_{index + 1}'
+    DATABASES[alias] = pooled(dj_database_url.parse(url))
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}  # tests see the primary's data
+    DATABASE_REPLICAS.append(alias)
+
+if DATABASE_REPLICAS:
+    DATABASE_ROUTERS = ['core.db_routing.ReplicaRouter']
+
+# Longer than the worst replication lag you expect; pins are stored in the
+# cache, so multi-process deployments need REDIS_URL for them to be shared
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=10, cast=int)
+# Also pin by client address: unset pins by credentials only, 0 uses REMOTE_ADDR
+# (no proxy in front), N takes the address added by the N trusted proxies to X-Forwarded-For
+REPLICA_PIN_TRUSTED_PROXIES = config('REPLICA_PIN_TRUSTED_PROXIES', default=None, cast=lambda v: None if v in (None, '') else int(v))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref
@@ -170,17 +213,40 @@ SERVER_EMAIL = 'noreply@wrytera.com'
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
-# Whitenoise configuration for static files
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
-
 # Media files (User uploaded content)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Uploads are stored under their content hash and served as immutable (core/storage.py, core/media.py)
+STORAGES = {
+    'default': {'BACKEND': 'core.storage.ContentAddressedStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+# Let a front proxy stream media files: HEADER 'X-Accel-Redirect' (nginx, with an
+# internal location at ACCEL_PREFIX aliased to MEDIA_ROOT) or 'X-Sendfile'; empty
+# serves files from Django
+MEDIA_SENDFILE = {
+    'HEADER': config('MEDIA_SENDFILE_HEADER', default=''),
+    'ACCEL_PREFIX': config('MEDIA_ACCEL_PREFIX', default='/protected-media/'),
+    'MUTABLE_MAX_AGE': 3600,  # seconds, for files stored before content addressing
+}
+
 # File upload settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB
 
+# Profile image variants rendered by the job worker (authentication/images.py).
+# Sizes are square edge lengths in pixels; the first format is the default.
+PROFILE_IMAGE = {
+    'SIZES': {'small': 48, 'medium': 128, 'large': 320},
+    'DEFAULT_SIZE': 'medium',
+    'FORMATS': ('webp', 'jpeg'),
+    'WEBP_QUALITY': 80,
+    'JPEG_QUALITY': 85,
+    'PRUNE_GRACE_SECONDS': 3600,  # unreferenced files younger than this are kept
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -192,20 +258,26 @@ AUTH_USER_MODEL = 'authentication.User'
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',  # Add TokenAuthentication
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # Token/JWT authentication with cached user lookups (authentication/backends.py)
+        'authentication.backends.CachedTokenAuthentication',
+        'authentication.backends.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.AllowAny',
     ),
+    # orjson-backed JSON (core/renderers.py, core/parsers.py); MessagePack when msgpack is installed
     'DEFAULT_RENDERER_CLASSES': (
-        'rest_framework.renderers.JSONRenderer',
-    ),
+        'core.renderers.ORJSONRenderer',
+    ) + (('core.renderers.MessagePackRenderer',) if find_spec('msgpack') else ()),
     'DEFAULT_PARSER_CLASSES': (
-        'rest_framework.parsers.JSONParser',
-    ),
+        'core.parsers.ORJSONParser',
+    ) + (('core.parsers.MessagePackParser',) if find_spec('msgpack') else ()),
 }
 
+# Seconds an authenticated user stays cached (authentication/backends.py); bounds how
+# long other processes keep accepting a logged-out token when the cache is not shared
+AUTH_CACHE_TIMEOUT = config('AUTH_CACHE_TIMEOUT', default=60, cast=int)
+
 # JWT Configuration
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
@@ -225,12 +297,101 @@ SIMPLE_JWT = {
     'USER_ID_FIELD': 'id',
     'USER_ID_CLAIM': 'user_id',
 
-    'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
+    'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken', 'authentication.tokens.SnapshotAccessToken'),
     'TOKEN_TYPE_CLAIM': 'token_type',
 
     'JTI_CLAIM': 'jti',
 }
 
+# Snapshot access tokens carry id/username/is_staff/is_active and authenticate
+# identity-only endpoints without a user lookup (authentication/tokens.py)
+SNAPSHOT_JWT = {
+    'LIFETIME': timedelta(minutes=config('SNAPSHOT_JWT_LIFETIME_MINUTES', default=15, cast=int)),
+    'REVOCATION_REFRESH_SECONDS': config('SNAPSHOT_JWT_REVOCATION_REFRESH_SECONDS', default=5, cast=int),
+}
+
+# Admin dashboard statistics snapshot (posts/stats.py): refreshed by the job worker
+# every REFRESH_SECONDS; a request recomputes it inline once it is older than MAX_AGE
+STATS_SNAPSHOT = {
+    'REFRESH_SECONDS': config('STATS_SNAPSHOT_REFRESH_SECONDS', default=300, cast=int),
+    'MAX_AGE': config('STATS_SNAPSHOT_MAX_AGE', default=3600, cast=int),
+}
+
+# Background job queue (drained by `python manage.py process_jobs`)
+JOB_QUEUE = {
+    'BATCH_SIZE': config('JOB_QUEUE_BATCH_SIZE', default=20, cast=int),
+    'VISIBILITY_TIMEOUT': config('JOB_QUEUE_VISIBILITY_TIMEOUT', default=300, cast=int),  # seconds
+    'POLL_INTERVAL': config('JOB_QUEUE_POLL_INTERVAL', default=2.0, cast=float),  # seconds
+    'MAX_ATTEMPTS': config('JOB_QUEUE_MAX_ATTEMPTS', default=5, cast=int),
+    'RETRY_BACKOFF_BASE': 10,  # seconds, doubled on every failed attempt
+    'RETRY_BACKOFF_MAX': 3600,  # seconds
+    'RETENTION_HOURS': 24 * 7,  # finished jobs are pruned after a week
+    # Jobs the worker re-queues on a fixed interval (name -> seconds)
+    'PERIODIC': {
+        'notifications.reconcile_counters': 3600,
+        'media.prune_orphans': 86400,
+        'stats.refresh_dashboard': STATS_SNAPSHOT['REFRESH_SECONDS'],
+    },
+}
+
+# Repeated likes/saves of the same post within this window update one notification
+NOTIFICATION_COALESCE_WINDOW = timedelta(hours=config('NOTIFICATION_COALESCE_WINDOW_HOURS', default=24, cast=int))
+
+# Token-bucket throttling of toggle-style write endpoints (posts/throttling.py).
+# RATES: view name -> bucket -> (refill rate, burst); 'user' is per user (per IP when
+# anonymous), 'ip' is per client address. STORE 'cache' shares buckets between workers.
+THROTTLE = {
+    'STORE': config('THROTTLE_STORE', default='memory'),
+    'RATES': {
+        'like_post': {'user': ('60/min', 15), 'ip': ('300/min', 60)},
+        'like_comment': {'user': ('60/min', 15), 'ip': ('300/min', 60)},
+        'follow_user': {'user': ('30/min', 10), 'ip': ('150/min', 30)},
+        'save_post': {'user': ('30/min', 10), 'ip': ('150/min', 30)},
+        'repost': {'user': ('20/min', 5), 'ip': ('100/min', 20)},
+        'track_post_view': {'user': ('120/min', 30), 'ip': ('600/min', 120)},
+    },
+}
+
+# Server-sent notification streams (see posts/realtime.py)
+# LocalTransport only reaches clients connected to the publishing process; use
+# PostgresTransport (LISTEN/NOTIFY) when the job worker and web workers are separate processes.
+REALTIME = {
+    'TRANSPORT': config(
+        'REALTIME_TRANSPORT',
+        default='posts.realtime.PostgresTransport' if DATABASES['default']['ENGINE'].endswith('postgresql') else 'posts.realtime.LocalTransport'
+    ),
+    'HEARTBEAT_INTERVAL': config('REALTIME_HEARTBEAT_INTERVAL', default=15, cast=int),  # seconds
+    'RETRY_MS': 3000,  # client reconnect delay sent in the stream
+    'QUEUE_SIZE': 100,  # buffered events per connection
+}
+
+# Cache (compressed response bytes and the like); shared across processes when REDIS_URL is set
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# API response compression (core/compression.py); brotli is used when the package is installed
+COMPRESSION = {
+    'MIN_SIZE': config('COMPRESSION_MIN_SIZE', default=1024, cast=int),  # bytes
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 5,  # favours speed; 11 is too slow for per-request compression
+    'CACHE_TIMEOUT': config('COMPRESSION_CACHE_TIMEOUT', default=300, cast=int),  # seconds, 0 disables
+}
+
+# /readyz re-runs its dependency checks at most this often (core/health.py)
+READINESS_CACHE_SECONDS = config('READINESS_CACHE_SECONDS', default=5, cast=int)
+
 # CORS Configuration (for frontend communication)
 CORS_ALLOWED_ORIGINS = config(
     'CORS_ALLOWED_ORIGINS',
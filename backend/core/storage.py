@@ -0,0 +1,57 @@
+"""
+Content-addressed media storage.
+
+Uploaded files are stored under the SHA-256 of their content:
+`profile_images/me.jpg` becomes `profile_images/3f/3f9a…c2.jpg`. Identical
+uploads share one file, and a name never changes content, so media can be
+served with an immutable Cache-Control header (core/media.py).
+
+Because files may be shared, nothing deletes them when a user replaces an
+upload; `manage.py prune_media` (also a periodic job) removes files that no
+row references any more.
+"""
+import hashlib
+import os
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+HASHED_NAME_RE = re.compile(r'(^|/)([0-9a-f]{2})/\2[0-9a-f]{62}(\.[A-Za-z0-9]+)?$')
+
+
+def is_content_addressed(name):
+    return HASHED_NAME_RE.search(name) is not None
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names files by content hash and deduplicates them"""
+
+    def __init__(self, **kwargs):
+        # Only a concurrent save of the same content can hit an existing name
+        kwargs.setdefault('allow_overwrite', True)
+        super().__init__(**kwargs)
+
+    def hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        hexdigest = digest.hexdigest()
+        return os.path.join(directory, hexdigest[:2], hexdigest + extension).replace('\\', '/')
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            # Deduplicated: the same bytes are already stored. Touch the file so the
+            # orphan prune's grace period covers the row about to reference it.
+            os.utime(self.path(name))
+            return name
+        return super().save(name, content, max_length=max_length)
@@ -0,0 +1,81 @@
+import gzip
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core import db_routing
+from core.compression import CompressionMiddleware
+
+COMPRESSION = {'MIN_SIZE': 10, 'GZIP_LEVEL': 6, 'BROTLI_QUALITY': 5, 'CACHE_TIMEOUT': 300}
+
+
+@override_settings(COMPRESSION=COMPRESSION)
+class CompressionMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def compress(self, content, content_type, etag='"abc"'):
+        request = self.factory.get('/api/posts/1/', HTTP_ACCEPT_ENCODING='gzip')
+        response = HttpResponse(content, content_type=content_type)
+        if etag:
+            response['ETag'] = etag
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_compresses_json(self):
+        response = self.compress(b'{"title": "hello"}' * 20, 'application/json')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['ETag'], 'W/"abc"')
+        self.assertEqual(gzip.decompress(response.content), b'{"title": "hello"}' * 20)
+
+    def test_html_is_not_compressed(self):
+        response = self.compress(b'<html>csrf</html>' * 20, 'text/html; charset=utf-8')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_cache_is_keyed_by_content_type_and_body(self):
+        # Same URL and ETag, different representation: each body must come back as itself
+        json_body, msgpack_body = b'{"title": "hello"}' * 20, b'\x81\xa5title\xa5hello' * 20
+        self.compress(json_body, 'application/json')
+        response = self.compress(msgpack_body, 'application/msgpack')
+        self.assertEqual(gzip.decompress(response.content), msgpack_body)
+        response = self.compress(b'{"title": "other"}' * 20, 'application/json')
+        self.assertEqual(gzip.decompress(response.content), b'{"title": "other"}' * 20)
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'], REPLICA_PIN_SECONDS=10, REPLICA_PIN_TRUSTED_PROXIES=None)
+class ReplicaPinningTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.middleware = db_routing.ReplicaRoutingMiddleware(lambda request: HttpResponse())
+
+    def write(self, **headers):
+        self.middleware(self.factory.post('/api/posts/', **headers))
+
+    def reads_from_replica(self, **headers):
+        request = self.factory.get('/api/posts/', **headers)
+        self.middleware.process_request(request)
+        return db_routing._replica_reads.get()
+
+    def test_writer_is_pinned_by_credentials(self):
+        self.write(HTTP_AUTHORIZATION='Token abc')
+        self.assertFalse(self.reads_from_replica(HTTP_AUTHORIZATION='Token abc'))
+        self.assertTrue(self.reads_from_replica(HTTP_AUTHORIZATION='Token other'))
+
+    def test_address_is_ignored_without_trusted_proxies(self):
+        # Behind a proxy every client shares REMOTE_ADDR, and X-Forwarded-For is client-controlled
+        self.write(HTTP_X_FORWARDED_FOR='203.0.113.9')
+        self.assertTrue(self.reads_from_replica())
+        self.assertTrue(self.reads_from_replica(HTTP_X_FORWARDED_FOR='203.0.113.9'))
+
+    @override_settings(REPLICA_PIN_TRUSTED_PROXIES=1)
+    def test_address_from_trusted_proxy(self):
+        # The client prepends a spoofed entry; the proxy appends the real address
+        self.write(HTTP_X_FORWARDED_FOR='198.51.100.1, 203.0.113.9')
+        self.assertFalse(self.reads_from_replica(HTTP_X_FORWARDED_FOR='203.0.113.9'))
+        self.assertTrue(self.reads_from_replica(HTTP_X_FORWARDED_FOR='198.51.100.1'))
+
+    def test_issued_credentials_are_pinned(self):
+        db_routing.pin_credentials('Token fresh')
+        self.assertFalse(self.reads_from_replica(HTTP_AUTHORIZATION='Token fresh'))
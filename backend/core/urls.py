@@ -14,15 +14,21 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
 from debug_views import debug_post_creation, debug_info
+from core.health import healthz, readyz
+from core.media import serve_media
 
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    # Health probes (liveness never touches the database)
+    path('healthz', healthz, name='healthz'),
+    path('readyz', readyz, name='readyz'),
     # API endpoints
     path('api/auth/', include('authentication.urls')),
     path('api/posts/', include('posts.urls')),
@@ -31,6 +37,7 @@ urlpatterns = [
     path('api/debug/info/', debug_info, name='debug_info'),
 ]
 
-# Serve media files during development
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# Media files: immutable caching, range requests and X-Accel-Redirect/X-Sendfile offload
+urlpatterns += [
+    re_path(r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/')), serve_media, name='media'),
+]
@@ -0,0 +1,20 @@
+"""
+Gunicorn settings, picked up automatically from the working directory.
+
+Database connection pools (see DATABASES in core/settings.py) must never be
+shared between processes: a connection inherited through fork() is the same
+socket in parent and child. With --preload the app, and possibly a pool, is
+loaded in the master, so close any pool there before forking workers.
+"""
+import sys
+
+
+def pre_fork(server, worker):
+    if 'django.db' not in sys.modules:
+        return  # Django not loaded in the master, nothing to share
+
+    from django.db import connections
+    for connection in connections.all(initialized_only=True):
+        if hasattr(connection, 'close_pool'):
+            connection.close_pool()
+        connection.close()
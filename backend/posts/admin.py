@@ -1,5 +1,16 @@
 from django.contrib import admin
-from .models import Category, Post, Comment, Follow, Repost
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import AuthorStats, Category, Post, Comment, Follow, Repost, Job
+from .pagination import EstimatedCountPaginator
+from .versioning import bump_users
+
+
+def subquery_count(model, field):
+    """Count of `model` rows whose `field` is the outer row, as a correlated subquery (no join fan-out)"""
+    rows = model.objects.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(count=Count('*')).values('count')
+    return Coalesce(Subquery(rows), 0)
 
 
 @admin.register(Category)
@@ -16,11 +27,14 @@ class CategoryAdmin(admin.ModelAdmin):
     list_per_page = 25
     actions = ['activate_categories', 'deactivate_categories']
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(num_posts=subquery_count(Post, 'category'))
+    
     def post_count(self, obj):
         """Display number of posts in this category"""
-        return obj.post_set.count()
+        return obj.num_posts
     post_count.short_description = 'Posts'
-    post_count.admin_order_field = 'post_count'
+    post_count.admin_order_field = 'num_posts'
     
     def activate_categories(self, request, queryset):
         """Bulk action to activate categories"""
@@ -61,23 +75,45 @@ class PostAdmin(admin.ModelAdmin):
     ordering = ('-created_at',)
     date_hierarchy = 'created_at'
     list_per_page = 20
+    # Large table: estimate the unfiltered total and skip the second, unfiltered COUNT on filtered pages
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     actions = ['make_published', 'make_unpublished', 'reset_views']
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('author', 'category').prefetch_related('categories').annotate(
+            num_likes=subquery_count(Post.likes.through, 'post'),
+            num_comments=subquery_count(Comment, 'post'),
+        )
+    
+    @staticmethod
+    def bulk_update(queryset, **changes):
+        """
+        queryset.update() bypasses the signal receivers, so bump the posts' versions
+        (HTTP validators) in the same UPDATE and refresh the authors' stats and profiles
+        """
+        now = timezone.now()
+        updated = queryset.update(**changes, version=F('version') + 1, changed_at=now, updated_at=now)
+        author_ids = list(queryset.values_list('author_id', flat=True).distinct())
+        AuthorStats.rebuild(author_ids)
+        bump_users(author_ids)
+        return updated
+    
     def make_published(self, request, queryset):
         """Bulk action to publish posts"""
-        updated = queryset.update(is_published=True)
+        updated = self.bulk_update(queryset, is_published=True)
         self.message_user(request, f'{updated} posts were successfully published.')
     make_published.short_description = "Mark selected posts as published"
     
     def make_unpublished(self, request, queryset):
         """Bulk action to unpublish posts"""
-        updated = queryset.update(is_published=False)
+        updated = self.bulk_update(queryset, is_published=False)
         self.message_user(request, f'{updated} posts were successfully unpublished.')
     make_unpublished.short_description = "Mark selected posts as unpublished"
     
     def reset_views(self, request, queryset):
         """Bulk action to reset view counts"""
-        updated = queryset.update(views=0)
+        updated = self.bulk_update(queryset, views=0)
         self.message_user(request, f'View counts reset for {updated} posts.')
     reset_views.short_description = "Reset view counts to 0"
     
@@ -104,17 +140,18 @@ class PostAdmin(admin.ModelAdmin):
     
     # Custom methods to display in list_display
     def like_count(self, obj):
-        return obj.like_count()
+        return obj.num_likes
     like_count.short_description = 'Likes'
-    like_count.admin_order_field = 'likes'
+    like_count.admin_order_field = 'num_likes'
     
     def comment_count(self, obj):
-        return obj.comment_count()
+        return obj.num_comments
     comment_count.short_description = 'Comments'
+    comment_count.admin_order_field = 'num_comments'
     
     def get_categories(self, obj):
         """Display all categories for this post"""
-        categories = obj.categories.all()
+        categories = obj.categories.all()  # prefetched by get_queryset
         if categories:
             return ", ".join([cat.name for cat in categories])
         elif obj.category:
@@ -129,14 +166,23 @@ class CommentAdmin(admin.ModelAdmin):
     Enhanced admin interface for Comment model with comprehensive features
     """
     list_display = ('get_short_content', 'author', 'post', 'parent', 'like_count', 'created_at')
-    list_filter = ('created_at', 'updated_at', 'author', 'post')
+    # No `post` filter: its sidebar rendered every post (one author query each); search by post title instead
+    list_filter = ('created_at', 'updated_at', 'author')
     search_fields = ('content', 'author__username', 'post__title')
     ordering = ('-created_at',)
     date_hierarchy = 'created_at'
     list_per_page = 30
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     raw_id_fields = ('parent', 'post')
     actions = ['delete_selected_comments']
     
+    def get_queryset(self, request):
+        # __str__ of the post and parent columns reads their authors (and the parent's post)
+        return super().get_queryset(request).select_related(
+            'author', 'post__author', 'parent__author', 'parent__post'
+        ).annotate(num_likes=subquery_count(Comment.likes.through, 'comment'))
+    
     def delete_selected_comments(self, request, queryset):
         """Bulk action to delete comments"""
         count = queryset.count()
@@ -163,8 +209,9 @@ class CommentAdmin(admin.ModelAdmin):
     get_short_content.short_description = 'Content'
     
     def like_count(self, obj):
-        return obj.like_count()
+        return obj.num_likes
     like_count.short_description = 'Likes'
+    like_count.admin_order_field = 'num_likes'
 
 
 @admin.register(Follow)
@@ -173,6 +220,7 @@ class FollowAdmin(admin.ModelAdmin):
     Admin interface for Follow model
     """
     list_display = ('follower', 'following', 'created_at')
+    list_select_related = ('follower', 'following')
     list_filter = ('created_at',)
     search_fields = ('follower__username', 'following__username')
     ordering = ('-created_at',)
@@ -196,6 +244,7 @@ class RepostAdmin(admin.ModelAdmin):
     Admin interface for Repost model
     """
     list_display = ('user', 'original_post', 'get_short_comment', 'created_at')
+    list_select_related = ('user', 'original_post__author')
     list_filter = ('created_at',)
     search_fields = ('user__username', 'original_post__title', 'comment')
     ordering = ('-created_at',)
@@ -222,6 +271,28 @@ class RepostAdmin(admin.ModelAdmin):
     get_short_comment.short_description = 'Comment'
 
 
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """
+    Admin interface for background jobs
+    """
+    list_display = ('name', 'status', 'attempts', 'max_attempts', 'run_at', 'locked_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'last_error')
+    ordering = ('-created_at',)
+    list_per_page = 50
+    readonly_fields = ('created_at', 'started_at', 'finished_at', 'locked_by', 'locked_until', 'last_error')
+    actions = ['retry_jobs']
+    
+    def retry_jobs(self, request, queryset):
+        """Bulk action to requeue failed jobs"""
+        updated = queryset.filter(status='failed').update(
+            status='pending', attempts=0, run_at=timezone.now(), locked_by='', locked_until=None
+        )
+        self.message_user(request, f'{updated} jobs were queued for retry.')
+    retry_jobs.short_description = "Retry selected failed jobs"
+
+
 # Additional admin configurations for better user experience
 admin.site.site_header = "Wrytera Admin"
 admin.site.site_title = "Wrytera Admin Portal"
@@ -2,4 +2,10 @@ from django.apps import AppConfig
 
 class PostsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'posts' 
\ No newline at end of file
+    name = 'posts'
+    
+    def ready(self):
+        # Register background job handlers and the AuthorStats write-path receivers
+        from . import author_stats, notification_helpers, stats  # noqa: F401
+        # Bump post/user versions used for conditional GETs
+        from . import versioning  # noqa: F401
\ No newline at end of file
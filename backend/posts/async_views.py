@@ -0,0 +1,314 @@
+"""
+Async read path for the busiest endpoints.
+
+Under ASGI (core/asgi.py) these views await the database through Django's
+async ORM instead of holding a worker thread for the whole request. DRF has no
+async views, so authentication, content negotiation and rendering use DRF's
+classes directly; serializers still run in a thread via sync_to_async. Write
+methods are handed to the regular DRF views in views.py.
+"""
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.http import HttpResponse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotAcceptable, NotAuthenticated
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from authentication.backends import CachedTokenAuthentication, SnapshotJWTAuthentication
+
+from . import views
+from .models import Comment, NotificationCounter, Post, PostView
+from .pagination import count_rows
+from .serializers import PostSerializer
+from .versioning import not_modified_response, post_validators, set_validators
+
+
+async def _drf_request(request, authentication_classes=None):
+    """Wrap a Django request for DRF authentication and negotiation; authenticates off the event loop"""
+    classes = authentication_classes or api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    drf_request = Request(
+        request,
+        authenticators=[auth_class() for auth_class in classes],
+        negotiator=DefaultContentNegotiation(),
+    )
+    await sync_to_async(lambda: drf_request.user)()
+    return drf_request
+
+
+def _render(drf_request, data, status_code=status.HTTP_200_OK):
+    """Render with the configured renderer the client asked for (JSON, MessagePack)"""
+    renderers = [renderer_class() for renderer_class in api_settings.DEFAULT_RENDERER_CLASSES]
+    try:
+        renderer, accepted_media_type = drf_request.negotiator.select_renderer(drf_request, renderers)
+    except NotAcceptable:
+        renderer, accepted_media_type = renderers[0], renderers[0].media_type
+
+    content = renderer.render(data, accepted_media_type, {'request': drf_request})
+    content_type = renderer.media_type
+    if renderer.charset:
+        content_type = f'{content_type}; charset={renderer.charset}'
+    return HttpResponse(content, status=status_code, content_type=content_type)
+
+
+async def _serialize(serializer_class, instance, drf_request, many=False):
+    # Method fields (like counts, is_liked) use the sync ORM
+    return await sync_to_async(
+        lambda: serializer_class(instance, many=many, context={'request': drf_request}).data
+    )()
+
+
+async def _paginate(drf_request, queryset, serializer_class):
+    """Async equivalent of PostPagination: same query parameters and response shape"""
+    paginator = views.PostPagination()
+    page_size = paginator.get_page_size(drf_request)
+    try:
+        page_number = int(drf_request.query_params.get(paginator.page_query_param, 1))
+        if page_number < 1:
+            raise ValueError
+    except ValueError:
+        return None
+
+    count, estimated = await sync_to_async(count_rows)(queryset)
+    offset = (page_number - 1) * page_size
+    if page_number > 1 and offset >= count and not estimated:
+        return None
+
+    items = [item async for item in queryset[offset:offset + page_size]]
+    if page_number > 1 and not items:
+        return None
+    results = await _serialize(serializer_class, items, drf_request, many=True)
+
+    url = drf_request.build_absolute_uri()
+    next_url = None
+    # An estimated count cannot tell where the rows end; a full page may have a successor
+    if (len(items) == page_size) if estimated else (offset + page_size < count):
+        next_url = replace_query_param(url, paginator.page_query_param, page_number + 1)
+    previous_url = None
+    if page_number == 2:
+        previous_url = remove_query_param(url, paginator.page_query_param)
+    elif page_number > 2:
+        previous_url = replace_query_param(url, paginator.page_query_param, page_number - 1)
+
+    return {'count': count, 'count_is_estimated': estimated, 'next': next_url, 'previous': previous_url, 'results': results}
+
+
+def _method_not_allowed(request):
+    response = _render(
+        Request(request, negotiator=DefaultContentNegotiation()),
+        {'detail': f'Method "{request.method}" not allowed.'},
+        status.HTTP_405_METHOD_NOT_ALLOWED,
+    )
+    response['Allow'] = 'GET, HEAD'
+    return response
+
+
+async def _authenticate_or_error(request, authentication_classes=None):
+    """(drf_request, None) or (None, error response) when credentials are invalid"""
+    try:
+        return await _drf_request(request, authentication_classes), None
+    except APIException as exc:
+        drf_request = Request(request, negotiator=DefaultContentNegotiation())
+        # Same body shape as DRF's exception handler
+        data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+        return None, _render(drf_request, data, exc.status_code)
+
+
+@csrf_exempt
+async def post_list(request):
+    """Get all published posts (POST creates a post through views.create_post)"""
+    if request.method not in ('GET', 'HEAD'):
+        return await sync_to_async(views.create_post)(request)
+
+    drf_request, error = await _authenticate_or_error(request)
+    if error:
+        return error
+
+    posts = Post.objects.filter(is_published=True).select_related('author').prefetch_related('likes', 'comments')
+
+    # Handle search parameter - only search by post title and username
+    search = request.GET.get('search', '')
+    if search:
+        posts = posts.filter(
+            Q(title__icontains=search) |
+            Q(author__username__icontains=search)
+        )
+
+    data = await _paginate(drf_request, posts, PostSerializer)
+    if data is None:
+        return _render(drf_request, {'detail': 'Invalid page.'}, status.HTTP_404_NOT_FOUND)
+    return _render(drf_request, data)
+
+
+@csrf_exempt
+async def post_detail(request, pk):
+    """Get a specific post (PUT/DELETE go through views.modify_post)"""
+    if request.method not in ('GET', 'HEAD'):
+        return await sync_to_async(views.modify_post)(request, pk=pk)
+
+    drf_request, error = await _authenticate_or_error(request)
+    if error:
+        return error
+
+    # Cheap version lookup first: unchanged posts are answered without serializing
+    etag, last_modified = await sync_to_async(post_validators)(drf_request, pk)
+    response = not_modified_response(request, etag, last_modified)
+    if response is not None:
+        return response
+
+    post = await Post.objects.select_related('author').filter(pk=pk).afirst()
+    if post is None:
+        return _render(drf_request, {'detail': 'No Post matches the given query.'}, status.HTTP_404_NOT_FOUND)
+
+    data = await _serialize(PostSerializer, post, drf_request)
+    return set_validators(_render(drf_request, data), etag, last_modified)
+
+
+def _count(model, field):
+    """Correlated COUNT subquery (avoids the join fan-out of several Count() annotations)"""
+    counts = (
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by().values(field).annotate(count=Count('pk')).values('count')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+async def trending_posts(request):
+    """Get trending posts using Exponential Decay Algorithm"""
+    if request.method not in ('GET', 'HEAD'):
+        return _method_not_allowed(request)
+
+    drf_request, error = await _authenticate_or_error(request)
+    if error:
+        return error
+
+    try:
+        # Get all published posts from the last 30 days (wider range for algorithm)
+        month_ago = timezone.now() - timedelta(days=30)
+
+        # Engagement counts come from one query instead of three per post
+        posts = Post.objects.filter(
+            is_published=True,
+            created_at__gte=month_ago
+        ).select_related('author', 'category').annotate(
+            num_likes=_count(Post.likes.through, 'post'),
+            num_comments=_count(Comment, 'post'),
+            num_views=_count(PostView, 'post'),
+        )
+
+        # Calculate trending scores for all posts
+        posts_with_scores = []
+        async for post in posts:
+            score = post.trending_score(
+                decay_hours=24, lambda_decay=0.1,
+                likes=post.num_likes, views=post.num_views, comments=post.num_comments,
+            )
+
+            # Only include posts with engagement (score > 0)
+            if score > 0:
+                posts_with_scores.append({
+                    'post': post,
+                    'trending_score': score
+                })
+
+        # Sort by trending score (highest first) and keep the top 10
+        posts_with_scores.sort(key=lambda x: x['trending_score'], reverse=True)
+        top_trending = posts_with_scores[:10]
+
+        # Format response data
+        posts_data = []
+        for item in top_trending:
+            post = item['post']
+
+            posts_data.append({
+                'id': post.id,
+                'title': post.title,
+                'content': post.content,
+                'excerpt': post.excerpt,
+                'created_at': post.created_at,
+                'views': post.num_views,
+                'like_count': post.num_likes,
+                'comment_count': post.num_comments,
+                'trending_score': item['trending_score'],  # Include the algorithm score
+                'author': {
+                    'id': post.author.id,
+                    'username': post.author.username,
+                    'first_name': post.author.first_name,
+                    'last_name': post.author.last_name
+                },
+                'category': {
+                    'id': post.category.id,
+                    'name': post.category.name,
+                    'slug': post.category.slug
+                } if post.category else None
+            })
+
+        return _render(drf_request, {
+            'results': posts_data,
+            'algorithm_info': {
+                'name': 'Time Delay Weighted Engagement Algorithm',
+                'description': 'Uses exponential decay to prioritize recent engagement',
+                'formula': '(comments×5 + likes×3 + views×1) × e^(-λ×hours_since_decay)',
+                'decay_hours': 24,
+                'lambda_decay': 0.1
+            }
+        })
+
+    except Exception:
+        return _render(drf_request, {'error': 'Failed to fetch trending posts'}, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+async def search_posts(request):
+    """Search posts by title, content, or author"""
+    if request.method not in ('GET', 'HEAD'):
+        return _method_not_allowed(request)
+
+    drf_request, error = await _authenticate_or_error(request)
+    if error:
+        return error
+
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return _render(drf_request, [])
+
+    try:
+        # Search in title, content, excerpt, and author username
+        posts = Post.objects.filter(
+            Q(title__icontains=query) |
+            Q(content__icontains=query) |
+            Q(excerpt__icontains=query) |
+            Q(author__username__icontains=query),
+            is_published=True
+        ).select_related('author', 'category').prefetch_related('likes', 'comments').order_by('-created_at')
+
+        # Limit results to prevent overwhelming response
+        results = [post async for post in posts[:50]]
+        data = await _serialize(PostSerializer, results, drf_request, many=True)
+        return _render(drf_request, data)
+
+    except Exception:
+        return _render(drf_request, {'error': 'Search failed. Please try again.'}, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+async def notifications_count(request):
+    """Get count of unread notifications"""
+    if request.method not in ('GET', 'HEAD'):
+        return _method_not_allowed(request)
+
+    drf_request, error = await _authenticate_or_error(request, [CachedTokenAuthentication, SnapshotJWTAuthentication])
+    if error:
+        return error
+    if not drf_request.user.is_authenticated:
+        response = _render(drf_request, {'detail': NotAuthenticated.default_detail}, status.HTTP_401_UNAUTHORIZED)
+        response['WWW-Authenticate'] = 'Token'
+        return response
+
+    unread_count = await NotificationCounter.aget_unread_count(drf_request.user.id)
+    return _render(drf_request, {'unread_count': unread_count})
@@ -0,0 +1,167 @@
+"""
+Incremental maintenance of AuthorStats, the per-author dashboard counters.
+
+The receivers below turn each write that changes a counter (post created,
+published, deleted or viewed; follow; save; like) into one
+`UPDATE author_stats SET counter = counter + delta` on the affected row, so
+`user_stats` reads a single row instead of running seven aggregates.
+
+Post saves are diffed against the state the instance was loaded with
+(`post_init`), so no extra query is needed to know the old values. Views are
+the exception: concurrent `track_post_view` requests save from the same stale
+snapshot, so a change to `views` re-sums the author's views in the UPDATE
+instead of adding a delta. Writes that bypass signals (queryset `update()`,
+`bulk_create`, raw SQL) are not seen; `manage.py rebuild_author_stats`
+recomputes the table from the source tables.
+
+Delete paths only ever decrement existing rows (`adjust(..., seed=False)`) and
+skip the user whose deletion cascaded to the row: that user's AuthorStats row
+is deleted in the same transaction, and writing it back would break the
+foreign key at commit.
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Count, QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import AuthorStats, Follow, Post, SavedPost
+
+# Post fields the counters depend on (field name -> attribute)
+TRACKED_POST_FIELDS = {'author': 'author_id', 'is_published': 'is_published', 'views': 'views'}
+
+
+def _being_deleted(user_id, origin):
+    """Whether `user_id` is the user (or one of the users) whose deletion cascaded to this row"""
+    User = get_user_model()
+    if isinstance(origin, User):
+        return origin.pk == user_id
+    if isinstance(origin, QuerySet) and issubclass(origin.model, User):
+        return origin.filter(pk=user_id).exists()
+    return False
+
+
+def _post_state(post):
+    # Deferred fields are missing from __dict__; reading them would cost a query each
+    return {field: post.__dict__.get(attname) for field, attname in TRACKED_POST_FIELDS.items()}
+
+
+@receiver(post_init, sender=Post)
+def _remember_post_state(sender, instance, **kwargs):
+    instance._author_stats_state = _post_state(instance)
+
+
+@receiver(post_save, sender=Post)
+def _post_saved(sender, instance, created, update_fields=None, **kwargs):
+    old, new = instance._author_stats_state, _post_state(instance)
+    instance._author_stats_state = new
+    if created:
+        AuthorStats.adjust(
+            instance.author_id, posts=1, views=instance.views,
+            published_posts=int(instance.is_published), drafts=int(not instance.is_published),
+        )
+        return
+
+    fields = TRACKED_POST_FIELDS.keys() if update_fields is None else set(update_fields) & TRACKED_POST_FIELDS.keys()
+    if any(old[field] is None or new[field] is None for field in fields):
+        AuthorStats.rebuild([instance.author_id])  # Loaded with deferred fields: old values unknown
+        return
+    if 'author' in fields and old['author'] != new['author']:
+        AuthorStats.rebuild([old['author'], new['author']])
+        return
+
+    deltas = {}
+    if 'is_published' in fields and old['is_published'] != new['is_published']:
+        published = 1 if new['is_published'] else -1
+        deltas.update(published_posts=published, drafts=-published)
+    AuthorStats.adjust(instance.author_id, **deltas)
+    if 'views' in fields and old['views'] != new['views']:
+        AuthorStats.refresh_views(instance.author_id)
+
+
+@receiver(pre_delete, sender=Post)
+def _remember_deleted_post(sender, instance, origin=None, **kwargs):
+    if _being_deleted(instance.author_id, origin):
+        return
+    # Read the stored values: the instance may be stale, and the likes are gone (without m2m signals) by post_delete
+    instance._author_stats_deleted = (
+        Post.objects.filter(pk=instance.pk).annotate(like_count=Count('likes'))
+        .values('is_published', 'views', 'like_count').first()
+    )
+
+
+@receiver(post_delete, sender=Post)
+def _post_deleted(sender, instance, **kwargs):
+    state = instance.__dict__.pop('_author_stats_deleted', None)
+    if state is None:
+        return
+    published = int(state['is_published'])
+    AuthorStats.adjust(
+        instance.author_id, seed=False, posts=-1, published_posts=-published, drafts=published - 1,
+        views=-state['views'], likes=-state['like_count'],
+    )
+
+
+@receiver(post_save, sender=Follow)
+def _follow_created(sender, instance, created, **kwargs):
+    if created:
+        AuthorStats.adjust(instance.following_id, followers=1)
+        AuthorStats.adjust(instance.follower_id, following=1)
+
+
+@receiver(post_delete, sender=Follow)
+def _follow_deleted(sender, instance, origin=None, **kwargs):
+    if not _being_deleted(instance.following_id, origin):
+        AuthorStats.adjust(instance.following_id, seed=False, followers=-1)
+    if not _being_deleted(instance.follower_id, origin):
+        AuthorStats.adjust(instance.follower_id, seed=False, following=-1)
+
+
+@receiver(post_save, sender=SavedPost)
+def _saved_post_created(sender, instance, created, **kwargs):
+    if created:
+        AuthorStats.adjust(instance.user_id, saved_posts=1)
+
+
+@receiver(post_delete, sender=SavedPost)
+def _saved_post_deleted(sender, instance, origin=None, **kwargs):
+    if not _being_deleted(instance.user_id, origin):
+        AuthorStats.adjust(instance.user_id, seed=False, saved_posts=-1)
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def _remember_liked_authors(sender, instance, **kwargs):
+    # The user's likes are deleted with them without m2m signals
+    likes = Post.likes.through.objects.filter(user=instance).exclude(post__author=instance)
+    instance._author_stats_liked = Counter(likes.values_list('post__author_id', flat=True))
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def _user_deleted(sender, instance, **kwargs):
+    for author_id, count in instance.__dict__.pop('_author_stats_liked', {}).items():
+        AuthorStats.adjust(author_id, seed=False, likes=-count)
+
+
+@receiver(m2m_changed, sender=Post.likes.through)
+def _post_likes_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'post_add':
+        # pk_set only holds the likes that were actually added
+        if reverse:
+            authors = Counter(Post.objects.filter(pk__in=pk_set).values_list('author_id', flat=True))
+        else:
+            authors = Counter({instance.author_id: len(pk_set)})
+    elif action in ('pre_remove', 'pre_clear'):
+        # Count the rows about to go (pk_set may name likes that do not exist); applied after the delete
+        likes = sender.objects.filter(**{'user' if reverse else 'post': instance})
+        if action == 'pre_remove':
+            likes = likes.filter(**{'post_id__in' if reverse else 'user_id__in': pk_set})
+        instance._author_stats_unliked = Counter(likes.values_list('post__author_id', flat=True))
+        return
+    elif action in ('post_remove', 'post_clear'):
+        authors = Counter({author_id: -count for author_id, count in instance.__dict__.pop('_author_stats_unliked', {}).items()})
+    else:
+        return
+    for author_id, delta in authors.items():
+        AuthorStats.adjust(author_id, likes=delta)
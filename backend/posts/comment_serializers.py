@@ -1,32 +1,118 @@
+from collections import defaultdict
+
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from rest_framework import serializers
 from .models import Comment
 from authentication.serializers import UserSerializer
 
+
+def liked_comment_ids(request, comments):
+    """Ids of `comments` the viewer liked, in one query on the likes table"""
+    if not comments or not request.user.is_authenticated:
+        return set()
+    return set(
+        Comment.likes.through.objects.filter(
+            user=request.user, comment_id__in=[comment.id for comment in comments]
+        ).values_list('comment_id', flat=True)
+    )
+
+
+def with_comment_counts(queryset):
+    """Annotate like and direct reply counts (reply count as a subquery to avoid a join fan-out)"""
+    replies = (
+        Comment.objects.filter(parent=OuterRef('pk'))
+        .order_by().values('parent').annotate(count=Count('id')).values('count')
+    )
+    return queryset.select_related('author').annotate(
+        num_likes=Count('likes'),
+        num_replies=Coalesce(Subquery(replies), 0),
+    )
+
+
+def comment_page_context(request, comments):
+    """
+    Serializer context for one page of comments: replies are not embedded, each
+    comment carries `reply_count` and is expanded through the replies endpoint.
+    """
+    return {
+        'request': request,
+        'lazy_replies': True,
+        'liked_comment_ids': liked_comment_ids(request, comments),
+    }
+
+
+def load_comment_thread(request, post=None, root=None):
+    """
+    Load a whole thread (`post`) or one branch (`root`) in one indexed query on the
+    materialized path, like counts annotated, and group it by parent in memory.
+    Returns (top_level_comments, serializer_context).
+    """
+    queryset = root.branch() if root is not None else Comment.thread(post)
+    comments = list(queryset.select_related('author').annotate(num_likes=Count('likes')))
+    
+    # Path order is depth-first, so replies are appended in display order
+    children = defaultdict(list)
+    top_level = []
+    for comment in comments:
+        if (root is not None and comment.id == root.id) or (root is None and not comment.parent_id):
+            top_level.append(comment)
+        else:
+            children[comment.parent_id].append(comment)
+    
+    context = {
+        'request': request,
+        'comment_children': children,
+        'liked_comment_ids': liked_comment_ids(request, comments),
+    }
+    return top_level, context
+
 class CommentSerializer(serializers.ModelSerializer):
     """Serializer for comments with reply support"""
     author = UserSerializer(read_only=True)
     replies = serializers.SerializerMethodField()
+    reply_count = serializers.SerializerMethodField()
     like_count = serializers.SerializerMethodField()
     is_liked = serializers.SerializerMethodField()
     parent_id = serializers.IntegerField(write_only=True, required=False, allow_null=True)
     
     class Meta:
         model = Comment
-        fields = ['id', 'content', 'author', 'created_at', 'updated_at', 'like_count', 'is_liked', 'replies', 'parent_id']
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        fields = ['id', 'content', 'author', 'created_at', 'updated_at', 'like_count', 'is_liked', 'replies', 'reply_count', 'depth', 'parent_id']
+        read_only_fields = ['id', 'created_at', 'updated_at', 'depth']
     
     def get_replies(self, obj):
         """Get nested replies for this comment"""
+        if self.context.get('lazy_replies'):
+            return []
+        children = self.context.get('comment_children')
+        if children is not None:
+            # Tree assembled in memory by load_comment_thread
+            return CommentSerializer(children.get(obj.id, []), many=True, context=self.context).data
         if obj.replies.exists():
             return CommentSerializer(obj.replies.all(), many=True, context=self.context).data
         return []
     
+    def get_reply_count(self, obj):
+        """Get the number of direct replies to this comment"""
+        if hasattr(obj, 'num_replies'):
+            return obj.num_replies
+        children = self.context.get('comment_children')
+        if children is not None:
+            return len(children.get(obj.id, []))
+        return obj.replies.count()
+    
     def get_like_count(self, obj):
         """Get the number of likes for this comment"""
+        if hasattr(obj, 'num_likes'):
+            return obj.num_likes
         return obj.like_count()
     
     def get_is_liked(self, obj):
         """Check if current user has liked this comment"""
+        liked_ids = self.context.get('liked_comment_ids')
+        if liked_ids is not None:
+            return obj.id in liked_ids
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return obj.likes.filter(id=request.user.id).exists()
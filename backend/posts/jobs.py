@@ -0,0 +1,162 @@
+"""
+Lightweight database-backed job queue.
+
+Views call `enqueue()` to record side effects (notifications and the like) as
+`Job` rows instead of running them inline. `python manage.py process_jobs`
+claims due jobs in batches and runs the handler registered for each job name.
+"""
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Handler registry: job name -> callable(**payload)
+_handlers = {}
+
+
+def queue_setting(name):
+    """Read a value from settings.JOB_QUEUE"""
+    return settings.JOB_QUEUE[name]
+
+
+def job_handler(name):
+    """Register a function as the handler for jobs called `name`"""
+    def decorator(func):
+        _handlers[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, delay=None, max_attempts=None):
+    """Queue a job for the worker. Payload must be JSON serializable."""
+    run_at = timezone.now()
+    if delay:
+        run_at += timedelta(seconds=delay)
+
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        run_at=run_at,
+        max_attempts=max_attempts or queue_setting('MAX_ATTEMPTS'),
+    )
+
+
+def claim_jobs(worker_id, batch_size=None, visibility_timeout=None):
+    """
+    Claim a batch of due jobs for `worker_id`.
+    Jobs whose visibility timeout expired (worker died mid-job) are claimed again.
+    """
+    batch_size = batch_size or queue_setting('BATCH_SIZE')
+    visibility_timeout = visibility_timeout or queue_setting('VISIBILITY_TIMEOUT')
+    now = timezone.now()
+
+    with transaction.atomic():
+        # SKIP LOCKED lets several workers claim disjoint batches without blocking each other
+        job_ids = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status='pending', run_at__lte=now) |
+                Q(status='running', locked_until__lt=now)
+            )
+            .order_by('run_at')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not job_ids:
+            return []
+
+        Job.objects.filter(id__in=job_ids).update(
+            status='running',
+            locked_by=worker_id,
+            locked_until=now + timedelta(seconds=visibility_timeout),
+            started_at=now,
+            attempts=F('attempts') + 1,
+        )
+
+    return list(Job.objects.filter(id__in=job_ids, locked_by=worker_id).order_by('run_at'))
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter, capped at RETRY_BACKOFF_MAX seconds"""
+    delay = min(queue_setting('RETRY_BACKOFF_BASE') * (2 ** (attempts - 1)), queue_setting('RETRY_BACKOFF_MAX'))
+    return delay + random.uniform(0, delay * 0.1)
+
+
+def run_job(job, worker_id):
+    """Run a claimed job and record the outcome. Returns True on success."""
+    # Only touch the row while we still own it; if the visibility timeout expired
+    # another worker may have claimed it in the meantime.
+    owned = Job.objects.filter(pk=job.pk, locked_by=worker_id, status='running')
+    handler = _handlers.get(job.name)
+
+    if handler is None:
+        owned.update(status='failed', finished_at=timezone.now(), locked_until=None,
+                     last_error=f'No handler registered for "{job.name}"')
+        logger.error('Job %s failed: no handler registered for "%s"', job.pk, job.name)
+        return False
+
+    try:
+        handler(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        now = timezone.now()
+        if job.attempts >= job.max_attempts:
+            owned.update(status='failed', finished_at=now, locked_until=None, last_error=error)
+            logger.error('Job %s (%s) failed permanently after %s attempts', job.pk, job.name, job.attempts)
+        else:
+            owned.update(status='pending', locked_by='', locked_until=None, last_error=error,
+                         run_at=now + timedelta(seconds=retry_delay(job.attempts)))
+            logger.warning('Job %s (%s) failed on attempt %s, retrying', job.pk, job.name, job.attempts)
+        return False
+
+    owned.update(status='done', finished_at=timezone.now(), locked_until=None, last_error='')
+    return True
+
+
+def prune_jobs(older_than_hours=None):
+    """Delete finished jobs older than the retention window"""
+    older_than_hours = older_than_hours or queue_setting('RETENTION_HOURS')
+    cutoff = timezone.now() - timedelta(hours=older_than_hours)
+    deleted, _ = Job.objects.filter(status='done', finished_at__lt=cutoff).delete()
+    return deleted
+
+
+def schedule_periodic_jobs():
+    """Queue the next run of every job in JOB_QUEUE['PERIODIC'] that has none pending"""
+    now = timezone.now()
+    for name, interval in queue_setting('PERIODIC').items():
+        if Job.objects.filter(name=name, status__in=['pending', 'running']).exists():
+            continue
+        last_run = Job.objects.filter(name=name, finished_at__isnull=False).order_by('-finished_at').values_list(
+            'finished_at', flat=True
+        ).first()
+        delay = max(0, interval - (now - last_run).total_seconds()) if last_run else 0
+        enqueue(name, delay=delay)
+
+
+def queue_stats():
+    """Queue depth per status and processing lag of the oldest due job"""
+    now = timezone.now()
+    by_status = dict(
+        Job.objects.order_by().values_list('status').annotate(count=Count('id'))
+    )
+    oldest_due = Job.objects.filter(status='pending', run_at__lte=now).aggregate(
+        oldest=Min('run_at')
+    )['oldest']
+
+    return {
+        'depth': by_status.get('pending', 0) + by_status.get('running', 0),
+        'by_status': {status: by_status.get(status, 0) for status, _ in Job.STATUS_CHOICES},
+        'due': Job.objects.filter(status='pending', run_at__lte=now).count(),
+        'expired_claims': Job.objects.filter(status='running', locked_until__lt=now).count(),
+        'lag_seconds': round((now - oldest_due).total_seconds(), 3) if oldest_due else 0,
+        'oldest_due_at': oldest_due,
+    }
@@ -0,0 +1,80 @@
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_PATHS = [
+    '/api/posts/',
+    '/api/posts/trending/',
+    '/api/posts/search/?q=the',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test a running server at increasing concurrency, e.g. to compare '
+        '`gunicorn core.wsgi:application` with `gunicorn core.asgi:application -k uvicorn.workers.UvicornWorker`'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000', help='Server to test')
+        parser.add_argument('--path', action='append', dest='paths', help='Path to request (repeatable)')
+        parser.add_argument('--concurrency', default='1,10,50,100', help='Comma-separated concurrency levels')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per concurrency level')
+        parser.add_argument('--timeout', type=float, default=30, help='Per-request timeout in seconds')
+        parser.add_argument('--token', help='API token sent as "Authorization: Token <token>"')
+
+    def handle(self, *args, **options):
+        try:
+            levels = [int(level) for level in options['concurrency'].split(',')]
+        except ValueError:
+            raise CommandError('--concurrency must be a comma-separated list of integers')
+
+        headers = {'Accept': 'application/json'}
+        if options['token']:
+            headers['Authorization'] = f"Token {options['token']}"
+        urls = [options['base_url'].rstrip('/') + path for path in (options['paths'] or DEFAULT_PATHS)]
+
+        for url in urls:
+            self.stdout.write(self.style.MIGRATE_HEADING(url))
+            self.stdout.write(f"  {'conc':>5} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+            for concurrency in levels:
+                result = self.run_level(url, headers, concurrency, options['requests'], options['timeout'])
+                self.stdout.write(
+                    f"  {concurrency:>5} {result['throughput']:>9.1f} {result['p50']:>9.1f} "
+                    f"{result['p95']:>9.1f} {result['p99']:>9.1f} {result['errors']:>7}"
+                )
+
+    def run_level(self, url, headers, concurrency, total, timeout):
+        def fetch(_):
+            request = urllib.request.Request(url, headers=headers)
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=timeout) as response:
+                    response.read()
+                    ok = response.status < 400
+            except (urllib.error.URLError, TimeoutError, ConnectionError):
+                ok = False
+            return ok, (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(fetch, range(total)))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency for ok, latency in results if ok)
+        errors = sum(1 for ok, _ in results if not ok)
+        if not latencies:
+            return {'throughput': 0, 'p50': 0, 'p95': 0, 'p99': 0, 'errors': errors}
+
+        quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+        return {
+            'throughput': len(latencies) / elapsed,
+            'p50': quantiles[49],
+            'p95': quantiles[94],
+            'p99': quantiles[98],
+            'errors': errors,
+        }
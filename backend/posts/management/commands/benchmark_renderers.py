@@ -0,0 +1,96 @@
+import asyncio
+import io
+import time
+
+import orjson
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.urls import reverse
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import force_authenticate
+
+from core.parsers import ORJSONParser
+from core.renderers import MessagePackRenderer, ORJSONRenderer, msgpack
+from posts import async_views, views
+
+# Largest list endpoints: (label, view, url name, query string, needs a user)
+ENDPOINTS = [
+    ('post_list', async_views.post_list, 'posts:post_list', 'page_size={page_size}', False),
+    ('trending_posts', async_views.trending_posts, 'posts:trending_posts', '', False),
+    ('all_users', views.all_users, 'posts:all_users', '', False),
+    ('notifications_list', views.notifications_list, 'posts:notifications_list', 'page_size={page_size}', True),
+]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark JSON/MessagePack rendering and JSON parsing on the largest API payloads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200, help='Render/parse repetitions per payload')
+        parser.add_argument('--page-size', type=int, default=100, help='Page size for paginated endpoints')
+        parser.add_argument('--user', help='Username to request authenticated endpoints as (default: first user)')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        user = self.get_user(options['user'])
+        factory = RequestFactory()
+
+        renderers = [('drf-json', JSONRenderer()), ('orjson', ORJSONRenderer())]
+        if msgpack is not None:
+            renderers.append(('msgpack', MessagePackRenderer()))
+
+        self.stdout.write(f'{iterations} iterations per payload, times in ms per call\n')
+        for label, view, url_name, query, needs_user in ENDPOINTS:
+            if needs_user and user is None:
+                self.stdout.write(f'{label}: skipped (no user)')
+                continue
+
+            request = factory.get(reverse(url_name) + '?' + query.format(page_size=options['page_size']))
+            if user is not None:
+                force_authenticate(request, user=user)
+
+            started = time.perf_counter()
+            response = async_to_sync(view)(request) if asyncio.iscoroutinefunction(view) else view(request)
+            view_ms = (time.perf_counter() - started) * 1000
+            if response.status_code != 200:
+                self.stdout.write(f'{label}: skipped (HTTP {response.status_code})')
+                continue
+            # Async views return rendered responses; DRF views still carry the unrendered data
+            data = response.data if hasattr(response, 'data') else orjson.loads(response.content)
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{label}') + f'  (view incl. queries: {view_ms:.1f} ms)')
+            baseline = None
+            for name, renderer in renderers:
+                elapsed, body = self.time_call(lambda: renderer.render(data, renderer.media_type, {}), iterations)
+                baseline = baseline or elapsed
+                self.stdout.write(
+                    f'  render {name:<9} {elapsed:8.3f}  {len(body):>9} bytes  x{baseline / elapsed:.1f}'
+                )
+
+            body = JSONRenderer().render(data)
+            baseline = None
+            for name, parser in [('drf-json', JSONParser()), ('orjson', ORJSONParser())]:
+                elapsed, _ = self.time_call(lambda: parser.parse(io.BytesIO(body), parser.media_type, {}), iterations)
+                baseline = baseline or elapsed
+                self.stdout.write(f'  parse  {name:<9} {elapsed:8.3f}  x{baseline / elapsed:.1f}')
+
+    def get_user(self, username):
+        User = get_user_model()
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f'User "{username}" does not exist')
+        return User.objects.order_by('id').first()
+
+    @staticmethod
+    def time_call(func, iterations):
+        """Average milliseconds per call and the last result"""
+        result = func()  # warm up
+        started = time.perf_counter()
+        for _ in range(iterations):
+            result = func()
+        return (time.perf_counter() - started) * 1000 / iterations, result
@@ -0,0 +1,80 @@
+import os
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from posts.jobs import claim_jobs, run_job, prune_jobs, queue_stats, queue_setting, schedule_periodic_jobs
+
+
+class Command(BaseCommand):
+    help = 'Process queued background jobs (notifications and other side effects)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Number of jobs to claim per batch'
+        )
+        parser.add_argument(
+            '--visibility-timeout',
+            type=int,
+            default=None,
+            help='Seconds a claimed job stays invisible to other workers'
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=None,
+            help='Seconds to wait when the queue is empty'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain the queue once and exit instead of polling forever'
+        )
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            help='Print queue depth and lag and exit'
+        )
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            for key, value in queue_stats().items():
+                self.stdout.write(f'{key}: {value}')
+            return
+
+        worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        sleep = options['sleep'] if options['sleep'] is not None else queue_setting('POLL_INTERVAL')
+        last_prune = 0
+        last_schedule = 0
+
+        self.stdout.write(f'Job worker {worker_id} started')
+        try:
+            while True:
+                # Long-running process: drop connections that went stale between batches
+                close_old_connections()
+
+                if time.monotonic() - last_prune > 3600:
+                    pruned = prune_jobs()
+                    if pruned:
+                        self.stdout.write(f'Pruned {pruned} finished jobs')
+                    last_prune = time.monotonic()
+
+                if time.monotonic() - last_schedule > 60:
+                    schedule_periodic_jobs()
+                    last_schedule = time.monotonic()
+
+                jobs = claim_jobs(worker_id, options['batch_size'], options['visibility_timeout'])
+                succeeded = sum(1 for job in jobs if run_job(job, worker_id))
+                if jobs:
+                    self.stdout.write(f'Processed {len(jobs)} jobs ({succeeded} succeeded)')
+                elif options['once']:
+                    break
+                else:
+                    time.sleep(sleep)
+        except KeyboardInterrupt:
+            self.stdout.write('Job worker stopped')
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from authentication.images import prune_orphaned_media
+
+
+class Command(BaseCommand):
+    help = 'Delete content-addressed media files that no profile image or variant references'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='List the files without deleting them')
+
+    def handle(self, *args, **options):
+        removed = prune_orphaned_media(dry_run=options['dry_run'])
+        for name in removed:
+            self.stdout.write(f'  {name}')
+        verb = 'Would remove' if options['dry_run'] else 'Removed'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {len(removed)} unreferenced file(s)'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import AuthorStats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-author dashboard counters (AuthorStats) from the source tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids', help='Only rebuild this user id (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Users recomputed per query batch')
+
+    def handle(self, *args, **options):
+        if options['user_ids']:
+            written = AuthorStats.rebuild(options['user_ids'])
+        else:
+            written = AuthorStats.rebuild_all(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt author stats for {written} users'))
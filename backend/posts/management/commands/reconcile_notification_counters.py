@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import NotificationCounter
+
+
+class Command(BaseCommand):
+    help = 'Recompute drifted unread notification counters from the notifications table'
+
+    def handle(self, *args, **options):
+        fixed = NotificationCounter.reconcile_all()
+        self.stdout.write(self.style.SUCCESS(f'Reconciled notification counters ({fixed} corrected)'))
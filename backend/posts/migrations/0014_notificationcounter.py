@@ -0,0 +1,41 @@
+# Generated manually for cached unread notification counters
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_counters(apps, schema_editor):
+    Notification = apps.get_model('posts', 'Notification')
+    NotificationCounter = apps.get_model('posts', 'NotificationCounter')
+    unread = (
+        Notification.objects.filter(is_read=False).order_by()
+        .values_list('recipient_id').annotate(unread=models.Count('id'))
+    )
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(user_id=user_id, unread_count=count) for user_id, count in unread],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0013_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notification_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+                ('reconciled_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'notification_counters',
+            },
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
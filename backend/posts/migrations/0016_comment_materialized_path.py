@@ -0,0 +1,61 @@
+# Generated manually for materialized comment paths
+
+from django.db import migrations, models
+
+
+PATH_SEGMENT_WIDTH = 10
+
+
+def backfill_paths(apps, schema_editor):
+    """Compute path and depth for existing comments from their parent chain"""
+    Comment = apps.get_model('posts', 'Comment')
+    parents = dict(Comment.objects.values_list('id', 'parent_id'))
+    paths = {}
+
+    def path_for(comment_id):
+        # Walk up iteratively; threads can be deeper than the recursion limit allows
+        chain = []
+        while comment_id is not None and comment_id not in paths:
+            chain.append(comment_id)
+            comment_id = parents.get(comment_id)
+        prefix = paths.get(comment_id, '')
+        for ancestor_id in reversed(chain):
+            prefix += str(ancestor_id).zfill(PATH_SEGMENT_WIDTH)
+            paths[ancestor_id] = prefix
+        return paths[chain[0]] if chain else prefix
+
+    batch = []
+    for comment in Comment.objects.only('id').iterator():
+        comment.path = path_for(comment.id)
+        comment.depth = len(comment.path) // PATH_SEGMENT_WIDTH - 1
+        batch.append(comment)
+        if len(batch) >= 1000:
+            Comment.objects.bulk_update(batch, ['path', 'depth'])
+            batch = []
+    if batch:
+        Comment.objects.bulk_update(batch, ['path', 'depth'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_notification_coalescing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(blank=True, default='', editable=False, max_length=250),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_paths, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'path'], name='comments_post_path_idx'),
+        ),
+    ]
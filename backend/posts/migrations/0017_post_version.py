@@ -0,0 +1,23 @@
+# Generated manually for conditional GET validators
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_comment_materialized_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='changed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
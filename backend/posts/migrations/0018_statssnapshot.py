@@ -0,0 +1,25 @@
+# Generated manually for precomputed admin dashboard statistics
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_post_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatsSnapshot',
+            fields=[
+                ('key', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('data', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('computed_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'stats_snapshots',
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated manually for incrementally maintained author statistics
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0018_statssnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='author_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('followers', models.PositiveIntegerField(default=0)),
+                ('following', models.PositiveIntegerField(default=0)),
+                ('posts', models.PositiveIntegerField(default=0)),
+                ('published_posts', models.PositiveIntegerField(default=0)),
+                ('drafts', models.PositiveIntegerField(default=0)),
+                ('views', models.PositiveBigIntegerField(default=0)),
+                ('likes', models.PositiveIntegerField(default=0)),
+                ('saved_posts', models.PositiveIntegerField(default=0)),
+                ('rebuilt_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'author_stats',
+                'verbose_name_plural': 'Author stats',
+            },
+        ),
+    ]
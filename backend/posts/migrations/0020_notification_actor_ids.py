@@ -0,0 +1,33 @@
+# Generated manually for exact coalesced notification actor counts
+
+from django.db import migrations, models
+
+
+def backfill_actor_ids(apps, schema_editor):
+    """Seed from the recent actors; older actors of existing rows are not recorded anywhere"""
+    Notification = apps.get_model('posts', 'Notification')
+    batch = []
+    for notification in Notification.objects.exclude(recent_actors=[]).only('id', 'recent_actors').iterator():
+        notification.actor_ids = [actor['id'] for actor in notification.recent_actors if actor.get('id')]
+        batch.append(notification)
+        if len(batch) >= 1000:
+            Notification.objects.bulk_update(batch, ['actor_ids'])
+            batch = []
+    if batch:
+        Notification.objects.bulk_update(batch, ['actor_ids'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_authorstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='actor_ids',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.RunPython(backfill_actor_ids, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated manually: coalesced notification actors move from a JSON list to a table
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def copy_actor_ids(apps, schema_editor):
+    Notification = apps.get_model('posts', 'Notification')
+    NotificationActor = apps.get_model('posts', 'NotificationActor')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    batch = []
+    for notification in Notification.objects.exclude(actor_ids=[]).only('id', 'actor_ids').iterator():
+        user_ids = User.objects.filter(pk__in=set(notification.actor_ids)).values_list('pk', flat=True)
+        batch.extend(NotificationActor(notification_id=notification.pk, user_id=user_id) for user_id in user_ids)
+        if len(batch) >= 1000:
+            NotificationActor.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        NotificationActor.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0020_notification_actor_ids'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationActor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('notification', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='actors', to='posts.notification')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'notification_actors',
+                'constraints': [models.UniqueConstraint(fields=('notification', 'user'), name='notification_actors_unique')],
+            },
+        ),
+        migrations.RunPython(copy_actor_ids, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='notification',
+            name='actor_ids',
+        ),
+    ]
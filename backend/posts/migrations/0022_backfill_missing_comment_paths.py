@@ -0,0 +1,50 @@
+# Generated manually: comments saved while the insert and the path update were
+# separate writes could be left without a path; compute it once from the parent chain
+
+from django.db import migrations
+
+
+PATH_SEGMENT_WIDTH = 10
+
+
+def backfill_missing_paths(apps, schema_editor):
+    Comment = apps.get_model('posts', 'Comment')
+    missing = list(Comment.objects.filter(path='').values_list('id', flat=True))
+    if not missing:
+        return
+    parents = dict(Comment.objects.values_list('id', 'parent_id'))
+    paths = dict(Comment.objects.exclude(path='').values_list('id', 'path'))
+
+    def path_for(comment_id):
+        # Walk up iteratively to the first ancestor with a path (or the root)
+        chain = []
+        while comment_id is not None and comment_id not in paths:
+            chain.append(comment_id)
+            comment_id = parents.get(comment_id)
+        prefix = paths.get(comment_id, '')
+        for ancestor_id in reversed(chain):
+            prefix += str(ancestor_id).zfill(PATH_SEGMENT_WIDTH)
+            paths[ancestor_id] = prefix
+        return paths[chain[0]] if chain else prefix
+
+    batch = []
+    for comment in Comment.objects.filter(id__in=missing).only('id').iterator():
+        comment.path = path_for(comment.id)
+        comment.depth = len(comment.path) // PATH_SEGMENT_WIDTH - 1
+        batch.append(comment)
+        if len(batch) >= 1000:
+            Comment.objects.bulk_update(batch, ['path', 'depth'])
+            batch = []
+    if batch:
+        Comment.objects.bulk_update(batch, ['path', 'depth'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0021_notificationactor'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_missing_paths, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,15 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import F, Count, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Concat, Greatest, Substr
 from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone
+from asgiref.sync import sync_to_async
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
 import math
+from datetime import datetime, timedelta, timezone as dt_timezone
 
 class Category(models.Model):
     """Category model for post categorization"""
@@ -45,6 +51,10 @@ class Post(models.Model):
     likes = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='liked_posts', blank=True)
     views = models.PositiveIntegerField(default=0)
     
+    # Bumped whenever anything in the post's API payload changes (see versioning.py)
+    version = models.PositiveIntegerField(default=0, editable=False)
+    changed_at = models.DateTimeField(null=True, blank=True, editable=False)
+    
     class Meta:
         ordering = ['-created_at']
         db_table = 'posts'
@@ -79,15 +89,15 @@ class Post(models.Model):
             # Fallback to old views field if PostView table doesn't exist yet
             return self.views
     
-    def trending_score(self, decay_hours=24, lambda_decay=0.1):
+    def trending_score(self, decay_hours=24, lambda_decay=0.1, likes=None, views=None, comments=None):
         """
         Calculate time-weighted engagement score using exponential decay algorithm
-    
+        Engagement counts can be passed in when they were already annotated.
         """
         # Get current engagement metrics
-        likes = self.like_count()
-        views = self.view_count()
-        comments = self.comment_count()
+        likes = self.like_count() if likes is None else likes
+        views = self.view_count() if views is None else views
+        comments = self.comment_count() if comments is None else comments
         
         # Apply weighted scoring (comments are most valuable)
         weighted_engagement = (comments * 5) + (likes * 3) + (views * 1)
@@ -112,10 +122,17 @@ class Post(models.Model):
 
 class Comment(models.Model):
     """Comment model for post interactions"""
+    # Materialized path: one zero-padded id segment per ancestor plus the comment's own id.
+    # Ordering by path gives depth-first display order and a branch is a path range.
+    PATH_SEGMENT_WIDTH = 10
+    MAX_DEPTH = 25  # Replies deeper than this are attached to their parent's parent
+    
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments')
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='comments')
     content = models.TextField()
     parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='replies')
+    path = models.CharField(max_length=PATH_SEGMENT_WIDTH * MAX_DEPTH, blank=True, default='', editable=False)
+    depth = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     likes = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='liked_comments', blank=True)
@@ -123,12 +140,91 @@ class Comment(models.Model):
     class Meta:
         ordering = ['created_at']
         db_table = 'comments'
+        indexes = [
+            models.Index(fields=['post', 'path'], name='comments_post_path_idx'),
+        ]
     
     def __str__(self):
         return f"Comment by {self.author.username} on {self.post.title}"
     
     def like_count(self):
         return self.likes.count()
+    
+    @classmethod
+    def path_segment(cls, comment_id):
+        return str(comment_id).zfill(cls.PATH_SEGMENT_WIDTH)
+    
+    @staticmethod
+    def path_upper_bound(path):
+        """Smallest path greater than every path in the branch rooted at `path`"""
+        if not path:
+            raise ValueError('Comment has no materialized path (unsaved comment?)')
+        # Paths are fixed-width digit strings, so incrementing the number skips the whole branch
+        return str(int(path) + 1).zfill(len(path))
+    
+    def save(self, *args, **kwargs):
+        is_new = self._state.adding
+        if is_new and self.parent_id and self.parent.depth + 1 >= self.MAX_DEPTH:
+            self.parent = self.parent.parent
+        if not is_new:
+            return super().save(*args, **kwargs)
+        
+        # The path ends with our own id, which only exists after the insert; both
+        # writes commit together so no reader sees the row without its path
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            parent_path = self.parent.path if self.parent_id else ''
+            self.path = parent_path + self.path_segment(self.pk)
+            self.depth = self.parent.depth + 1 if self.parent_id else 0
+            Comment.objects.filter(pk=self.pk).update(path=self.path, depth=self.depth)
+    
+    def branch(self):
+        """This comment and all of its descendants in display order (one indexed range scan)"""
+        return Comment.objects.filter(
+            post_id=self.post_id, path__gte=self.path, path__lt=self.path_upper_bound(self.path)
+        ).order_by('path')
+    
+    @classmethod
+    def thread(cls, post):
+        """Every comment of a post in display order with depth"""
+        return cls.objects.filter(post=post).order_by('path')
+    
+    def move_to(self, new_parent=None):
+        """Re-parent this comment, rewriting the paths and depths of its whole branch"""
+        old_path, old_depth = self.path, self.depth
+        
+        with transaction.atomic():
+            if new_parent is not None:
+                new_parent = Comment.objects.select_for_update().get(pk=new_parent.pk)
+                if new_parent.path.startswith(old_path):
+                    raise ValueError('Cannot move a comment into its own branch')
+                if new_parent.depth + 1 + self.branch_height() >= self.MAX_DEPTH:
+                    raise ValueError('Moving this branch would exceed the maximum reply depth')
+                new_path = new_parent.path + self.path_segment(self.pk)
+                new_depth = new_parent.depth + 1
+                post_id = new_parent.post_id
+            else:
+                new_path = self.path_segment(self.pk)
+                new_depth = 0
+                post_id = self.post_id
+            
+            self.branch().update(
+                path=Concat(Value(new_path), Substr('path', len(old_path) + 1), output_field=models.CharField()),
+                depth=F('depth') + (new_depth - old_depth),
+                post_id=post_id,
+            )
+            Comment.objects.filter(pk=self.pk).update(parent=new_parent)
+        
+        # Queryset updates skip signals, so invalidate both threads' validators here
+        from .versioning import bump_posts
+        bump_posts({self.post_id, post_id})
+        
+        self.parent, self.path, self.depth, self.post_id = new_parent, new_path, new_depth, post_id
+    
+    def branch_height(self):
+        """Levels below this comment in its branch"""
+        deepest = self.branch().aggregate(deepest=models.Max('depth'))['deepest']
+        return (deepest or self.depth) - self.depth
 
 class Follow(models.Model):
     """Follow model for user relationships"""
@@ -224,21 +320,69 @@ class Notification(models.Model):
     # Additional data as JSON for flexibility
     extra_data = models.JSONField(default=dict, blank=True)
     
+    # Coalesced events: "alice and 41 others liked your post"
+    actor_count = models.PositiveIntegerField(default=1)
+    recent_actors = models.JSONField(default=list, blank=True)  # [{'id', 'username'}, ...], newest first
+    
+    RECENT_ACTORS_LIMIT = 3
+    EVENT_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+    
     class Meta:
         db_table = 'notifications'
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['recipient', '-created_at']),
             models.Index(fields=['recipient', 'is_read']),
+            models.Index(fields=['recipient', 'notification_type', 'content_type', 'object_id'], name='notifications_coalesce_idx'),
         ]
     
     def __str__(self):
         return f"Notification for {self.recipient.username}: {self.title}"
     
+    @property
+    def event_id(self):
+        """
+        SSE event id, '<created_at in microseconds>-<pk>'. Coalescing moves created_at
+        forward, so an updated notification sorts after the events a client has seen.
+        """
+        return f"{(self.created_at - self.EVENT_EPOCH) // timedelta(microseconds=1)}-{self.pk}"
+    
+    @classmethod
+    def events_after(cls, recipient_id, last_event_id):
+        """Notifications created or coalesced after the event `last_event_id`, oldest first; None if it is malformed"""
+        notifications = cls.objects.filter(recipient_id=recipient_id)
+        if last_event_id.isdigit():
+            # Ids sent before event ids carried the timestamp
+            return notifications.filter(id__gt=int(last_event_id)).order_by('id')
+        micros, _, pk = last_event_id.partition('-')
+        if not (micros.isdigit() and pk.isdigit()):
+            return None
+        created_at = cls.EVENT_EPOCH + timedelta(microseconds=int(micros))
+        return notifications.filter(
+            Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=int(pk))
+        ).order_by('created_at', 'id')
+    
     def mark_as_read(self):
         """Mark notification as read"""
+        # Conditional update so concurrent requests decrement the unread counter only once
+        updated = Notification.objects.filter(pk=self.pk, is_read=False).update(is_read=True)
         self.is_read = True
-        self.save()
+        NotificationCounter.adjust(self.recipient_id, -updated)
+    
+    def remove(self):
+        """Delete notification, keeping the recipient's unread counter in sync"""
+        deleted, _ = Notification.objects.filter(pk=self.pk, is_read=False).delete()
+        if deleted:
+            NotificationCounter.adjust(self.recipient_id, -1)
+        else:
+            Notification.objects.filter(pk=self.pk).delete()
+    
+    @classmethod
+    def mark_all_as_read(cls, recipient):
+        """Mark all of a user's notifications as read"""
+        updated = cls.objects.filter(recipient_id=recipient.pk, is_read=False).update(is_read=True)
+        NotificationCounter.adjust(recipient.pk, -updated)
+        return updated
     
     @classmethod
     def create_notification(cls, recipient, notification_type, title, message, sender=None, related_object=None, extra_data=None):
@@ -249,7 +393,8 @@ class Notification(models.Model):
             notification_type=notification_type,
             title=title,
             message=message,
-            extra_data=extra_data or {}
+            extra_data=extra_data or {},
+            recent_actors=[{'id': sender.pk, 'username': sender.username}] if sender else [],
         )
         
         if related_object:
@@ -257,4 +402,335 @@ class Notification(models.Model):
             notification.object_id = related_object.pk
         
         notification.save()
-        return notification
\ No newline at end of file
+        NotificationCounter.adjust(recipient.pk, 1)
+        
+        # Push to connected SSE clients once the row is visible to them
+        from .realtime import publish_notification
+        transaction.on_commit(lambda: publish_notification(notification))
+        return notification
+    
+    @staticmethod
+    def describe_actors(username, actor_count):
+        """'alice', 'alice and 1 other', 'alice and 41 others'"""
+        others = actor_count - 1
+        if others <= 0:
+            return username
+        return f"{username} and {others} other{'s' if others > 1 else ''}"
+    
+    @classmethod
+    def create_or_coalesce(cls, recipient, notification_type, title, describe, sender, related_object, extra_data=None):
+        """
+        Fold repeated events of the same type on the same object into one notification.
+        Within settings.NOTIFICATION_COALESCE_WINDOW of the last event the existing row is
+        updated in place (actor count, recent actors, message) and moved back to the top
+        as unread. `describe(actors)` builds the message from the actor summary.
+        """
+        from .realtime import publish_notification
+        
+        actor = {'id': sender.pk, 'username': sender.username}
+        content_type = ContentType.objects.get_for_model(related_object)
+        now = timezone.now()
+        
+        with transaction.atomic():
+            notification = cls.objects.select_for_update().filter(
+                recipient=recipient,
+                notification_type=notification_type,
+                content_type=content_type,
+                object_id=related_object.pk,
+                created_at__gte=now - settings.NOTIFICATION_COALESCE_WINDOW,
+            ).order_by('-created_at').first()
+            
+            if notification is None:
+                notification = cls.create_notification(
+                    recipient=recipient,
+                    notification_type=notification_type,
+                    title=title,
+                    message=describe(sender.username),
+                    sender=sender,
+                    related_object=related_object,
+                    extra_data=extra_data,
+                )
+                NotificationActor.objects.create(notification=notification, user=sender)
+                return notification
+            
+            # Repeat events by any earlier actor (e.g. unlike + like again) are not counted twice.
+            # The row lock above serializes coalescing, so get_or_create cannot race itself.
+            _, new_actor = NotificationActor.objects.get_or_create(notification=notification, user=sender)
+            if new_actor:
+                notification.actor_count += 1
+            others = [a for a in notification.recent_actors if a.get('id') != sender.pk]
+            notification.recent_actors = [actor] + others[:cls.RECENT_ACTORS_LIMIT - 1]
+            notification.sender = sender
+            notification.message = describe(cls.describe_actors(sender.username, notification.actor_count))
+            notification.created_at = now
+            was_read = notification.is_read
+            notification.is_read = False
+            notification.save(update_fields=[
+                'actor_count', 'recent_actors', 'sender', 'message', 'created_at', 'is_read'
+            ])
+            if was_read:
+                NotificationCounter.adjust(recipient.pk, 1)
+        
+        transaction.on_commit(lambda: publish_notification(notification))
+        return notification
+
+class NotificationActor(models.Model):
+    """Distinct actors folded into a coalesced notification; one indexed insert per event"""
+    notification = models.ForeignKey(Notification, on_delete=models.CASCADE, related_name='actors')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    
+    class Meta:
+        db_table = 'notification_actors'
+        constraints = [
+            models.UniqueConstraint(fields=['notification', 'user'], name='notification_actors_unique'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} on notification {self.notification_id}"
+
+
+class NotificationCounter(models.Model):
+    """
+    Unread notification count per user, so the badge endpoint is a single key lookup.
+    Adjusted in place by the Notification helpers; `reconcile()` recomputes it from the table.
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='notification_counter')
+    unread_count = models.PositiveIntegerField(default=0)
+    reconciled_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'notification_counters'
+    
+    def __str__(self):
+        return f"{self.user_id}: {self.unread_count} unread"
+    
+    @classmethod
+    def adjust(cls, user_id, delta):
+        """Add `delta` (may be negative) to a user's unread count"""
+        if not delta:
+            return
+        updated = cls.objects.filter(user_id=user_id).update(
+            unread_count=Greatest(F('unread_count') + delta, 0)
+        )
+        if not updated:
+            # No counter yet: seed it from the table, which already reflects this change
+            cls.reconcile(user_id)
+    
+    @classmethod
+    def get_unread_count(cls, user_id):
+        """Read a user's unread count (one primary key lookup)"""
+        unread_count = cls.objects.filter(user_id=user_id).values_list('unread_count', flat=True).first()
+        if unread_count is None:
+            unread_count = cls.reconcile(user_id)
+        return unread_count
+    
+    @classmethod
+    async def aget_unread_count(cls, user_id):
+        """Async variant of get_unread_count for async views"""
+        unread_count = await cls.objects.filter(user_id=user_id).values_list('unread_count', flat=True).afirst()
+        if unread_count is None:
+            unread_count = await sync_to_async(cls.reconcile)(user_id)
+        return unread_count
+    
+    @classmethod
+    def reconcile(cls, user_id):
+        """Recompute a user's unread count from the notifications table"""
+        unread_count = Notification.objects.filter(recipient_id=user_id, is_read=False).count()
+        defaults = {'unread_count': unread_count, 'reconciled_at': timezone.now()}
+        try:
+            cls.objects.update_or_create(user_id=user_id, defaults=defaults)
+        except IntegrityError:
+            # Lost a race creating the row; the winner's row just needs the fresh count
+            cls.objects.filter(user_id=user_id).update(**defaults)
+        return unread_count
+    
+    @classmethod
+    def reconcile_all(cls, batch_size=1000):
+        """Correct counters that drifted from the notifications table; returns how many were fixed"""
+        unread = (
+            Notification.objects.filter(recipient_id=OuterRef('user_id'), is_read=False).order_by()
+            .values('recipient_id').annotate(unread=Count('id')).values('unread')
+        )
+        actual = Coalesce(Subquery(unread), 0)
+        now = timezone.now()
+        fixed = 0
+        
+        # Existing counters, a batch of users at a time. The real count is computed inside
+        # the UPDATE itself, so notifications created meanwhile cannot be lost to a stale read.
+        last_user_id = 0
+        while True:
+            user_ids = list(
+                cls.objects.filter(user_id__gt=last_user_id).order_by('user_id')
+                .values_list('user_id', flat=True)[:batch_size]
+            )
+            if not user_ids:
+                break
+            last_user_id = user_ids[-1]
+            fixed += cls.objects.filter(user_id__in=user_ids).exclude(unread_count=actual).update(
+                unread_count=actual, reconciled_at=now
+            )
+        
+        # Users with unread notifications but no counter row yet
+        missing = (
+            Notification.objects.filter(is_read=False).exclude(recipient_id__in=cls.objects.values('user_id'))
+            .order_by().values_list('recipient_id', flat=True).distinct()
+        )
+        for user_id in missing.iterator(chunk_size=batch_size):
+            cls.reconcile(user_id)
+            fixed += 1
+        return fixed
+
+
+class Job(models.Model):
+    """Background job persisted in the database and drained by `manage.py process_jobs`"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    name = models.CharField(max_length=100)  # Registered handler name, e.g. 'notifications.like'
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)  # Earliest time the job may be claimed
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)  # Visibility timeout of a claimed job
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'jobs'
+        ordering = ['run_at']
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='jobs_status_run_at_idx'),
+            models.Index(fields=['status', 'locked_until'], name='jobs_status_locked_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} ({self.status}, attempt {self.attempts}/{self.max_attempts})"
+
+
+class StatsSnapshot(models.Model):
+    """
+    Precomputed statistics payload (e.g. the admin dashboard totals) stored under a
+    key and refreshed by a periodic job, so reading it is a single-row lookup
+    """
+    key = models.CharField(max_length=50, primary_key=True)
+    data = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    computed_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'stats_snapshots'
+    
+    def __str__(self):
+        return f"{self.key} at {self.computed_at}"
+
+
+class AuthorStats(models.Model):
+    """
+    Per-author dashboard counters, kept up to date by the write paths (posts/author_stats.py)
+    so the dashboard reads one row. `rebuild()` recomputes rows from the source tables.
+    """
+    COUNTERS = ('followers', 'following', 'posts', 'published_posts', 'drafts', 'views', 'likes', 'saved_posts')
+    
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='author_stats')
+    followers = models.PositiveIntegerField(default=0)
+    following = models.PositiveIntegerField(default=0)
+    posts = models.PositiveIntegerField(default=0)
+    published_posts = models.PositiveIntegerField(default=0)
+    drafts = models.PositiveIntegerField(default=0)
+    views = models.PositiveBigIntegerField(default=0)  # Sum of Post.views over the author's posts
+    likes = models.PositiveIntegerField(default=0)  # Likes received on the author's posts
+    saved_posts = models.PositiveIntegerField(default=0)  # Posts this user has saved
+    rebuilt_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'author_stats'
+        verbose_name_plural = 'Author stats'
+    
+    def __str__(self):
+        return f"{self.user_id}: {self.posts} posts, {self.followers} followers"
+    
+    @classmethod
+    def adjust(cls, user_id, seed=True, **deltas):
+        """
+        Add the non-zero `deltas` (counter name -> change, may be negative) to a user's row.
+        With `seed=False` a missing row stays missing: delete paths must not write rows for
+        users that may be going away in the same transaction.
+        """
+        deltas = {counter: delta for counter, delta in deltas.items() if delta}
+        if not user_id or not deltas:
+            return
+        updated = cls.objects.filter(user_id=user_id).update(
+            **{counter: Greatest(F(counter) + delta, 0) for counter, delta in deltas.items()}
+        )
+        if not updated and seed:
+            # No row yet: seed it from the tables, which already reflect this change
+            cls.rebuild([user_id])
+    
+    @classmethod
+    def refresh_views(cls, user_id):
+        """Recompute a user's `views` from their posts in one UPDATE, so concurrent view writes cannot drift it"""
+        total = Post.objects.filter(author_id=OuterRef('user_id')).order_by().values('author_id').annotate(total=Sum('views')).values('total')
+        if not cls.objects.filter(user_id=user_id).update(views=Coalesce(Subquery(total), 0)):
+            cls.rebuild([user_id])
+    
+    @classmethod
+    def for_user(cls, user_id):
+        """Read a user's counters (one primary key lookup)"""
+        stats = cls.objects.filter(user_id=user_id).first()
+        if stats is None:
+            cls.rebuild([user_id])
+            stats = cls.objects.get(user_id=user_id)
+        return stats
+    
+    @classmethod
+    def rebuild(cls, user_ids):
+        """Recompute the rows of `user_ids` from the source tables; returns how many were written"""
+        user_ids = list(get_user_model().objects.filter(pk__in=[user_id for user_id in user_ids if user_id]).values_list('pk', flat=True))
+        if not user_ids:
+            return 0
+        rows = {user_id: cls(user_id=user_id, rebuilt_at=timezone.now()) for user_id in user_ids}
+        
+        def fill(queryset, group_by, **aggregates):
+            for values in queryset.order_by().values(group_by).annotate(**aggregates):
+                for counter in aggregates:
+                    setattr(rows[values[group_by]], counter, values[counter] or 0)
+        
+        fill(Follow.objects.filter(following_id__in=user_ids), 'following', followers=Count('id'))
+        fill(Follow.objects.filter(follower_id__in=user_ids), 'follower', following=Count('id'))
+        fill(
+            Post.objects.filter(author_id__in=user_ids), 'author',
+            posts=Count('id'),
+            published_posts=Count('id', filter=Q(is_published=True)),
+            drafts=Count('id', filter=Q(is_published=False)),
+            views=Sum('views'),
+        )
+        fill(Post.likes.through.objects.filter(post__author_id__in=user_ids), 'post__author', likes=Count('id'))
+        fill(SavedPost.objects.filter(user_id__in=user_ids), 'user', saved_posts=Count('id'))
+        
+        cls.objects.bulk_create(
+            rows.values(), update_conflicts=True, unique_fields=['user'],
+            update_fields=[*cls.COUNTERS, 'rebuilt_at'],
+        )
+        return len(rows)
+    
+    @classmethod
+    def rebuild_all(cls, batch_size=1000):
+        """Recompute every user's row; returns how many were written"""
+        written = 0
+        user_ids = get_user_model().objects.order_by('pk').values_list('pk', flat=True)
+        batch = []
+        for user_id in user_ids.iterator(chunk_size=batch_size):
+            batch.append(user_id)
+            if len(batch) >= batch_size:
+                written += cls.rebuild(batch)
+                batch = []
+        if batch:
+            written += cls.rebuild(batch)
+        return written
@@ -1,14 +1,17 @@
-from .models import Notification
+from django.contrib.auth import get_user_model
+from .models import Notification, NotificationCounter, Post, Comment
+from .jobs import job_handler
 
 def create_like_notification(post, liker):
     """Create notification when someone likes a post"""
     if post.author != liker:  # Don't notify if user likes their own post
-        Notification.create_notification(
+        # Likes on the same post are coalesced into one row ("alice and 41 others liked ...")
+        Notification.create_or_coalesce(
             recipient=post.author,
             sender=liker,
             notification_type='like',
             title='New Like',
-            message=f'{liker.username} liked your post "{post.title}"',
+            describe=lambda actors: f'{actors} liked your post "{post.title}"',
             related_object=post,
             extra_data={'post_id': post.id, 'post_title': post.title}
         )
@@ -86,12 +89,12 @@ def create_goal_completed_notification(user, goal):
 def create_save_notification(post, saver):
     """Create notification when someone saves a post"""
     if post.author != saver:  # Don't notify if user saves their own post
-        Notification.create_notification(
+        Notification.create_or_coalesce(
             recipient=post.author,
             sender=saver,
             notification_type='save',
             title='Post Saved',
-            message=f'{saver.username} saved your post "{post.title}"',
+            describe=lambda actors: f'{actors} saved your post "{post.title}"',
             related_object=post,
             extra_data={'post_id': post.id, 'post_title': post.title}
         )
@@ -122,3 +125,46 @@ def create_system_notification(recipient, title, message, extra_data=None):
         message=message,
         extra_data=extra_data or {}
     )
+
+
+# Job handlers
+# Views enqueue these through posts.jobs.enqueue() so notifications are created
+# by the `process_jobs` worker instead of inside the request thread.
+
+@job_handler('notifications.like')
+def handle_like_notification(post_id, user_id):
+    post = Post.objects.select_related('author').filter(pk=post_id).first()
+    liker = get_user_model().objects.filter(pk=user_id).first()
+    if post and liker:
+        create_like_notification(post, liker)
+
+@job_handler('notifications.comment')
+def handle_comment_notification(comment_id):
+    comment = Comment.objects.select_related('author', 'post__author').filter(pk=comment_id).first()
+    if comment:
+        create_comment_notification(comment)
+
+@job_handler('notifications.follow')
+def handle_follow_notification(follower_id, following_id):
+    User = get_user_model()
+    follower = User.objects.filter(pk=follower_id).first()
+    followed_user = User.objects.filter(pk=following_id).first()
+    if follower and followed_user:
+        create_follow_notification(follower, followed_user)
+
+@job_handler('notifications.save')
+def handle_save_notification(post_id, user_id):
+    post = Post.objects.select_related('author').filter(pk=post_id).first()
+    saver = get_user_model().objects.filter(pk=user_id).first()
+    if post and saver:
+        create_save_notification(post, saver)
+
+@job_handler('notifications.new_post')
+def handle_new_post_notification(post_id):
+    post = Post.objects.select_related('author').filter(pk=post_id, is_published=True).first()
+    if post:
+        create_new_post_notification(post)
+
+@job_handler('notifications.reconcile_counters')
+def handle_reconcile_notification_counters():
+    NotificationCounter.reconcile_all()
@@ -0,0 +1,154 @@
+"""
+Pagination helpers for very large tables.
+
+An exact `COUNT(*)` reads every matching row, which dominates page loads once
+posts, comments or notifications run into the millions. `count_rows()` keeps
+the count exact while that is cheap and estimates it otherwise:
+
+1. Unfiltered querysets use the table's row statistics (PostgreSQL
+   `pg_class.reltuples`, SQLite `sqlite_stat1` once ANALYZE has run).
+2. Otherwise a bounded count (`SELECT COUNT(*) FROM (... LIMIT threshold + 1)`)
+   reads at most ESTIMATE_THRESHOLD rows; below that the count is exact.
+3. Above it, PostgreSQL's planner estimate for the query (EXPLAIN) is used,
+   never lower than the rows already counted. Without statistics the count
+   stays exact.
+
+Paginated responses carry `count_is_estimated` so clients can show "about N".
+"""
+import json
+
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import DatabaseError, connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+
+ESTIMATE_THRESHOLD = 10000
+
+
+def _is_unfiltered(queryset):
+    query = queryset.query
+    return not (query.where or query.distinct or query.combinator or query.low_mark or query.high_mark is not None)
+
+
+def table_row_estimate(queryset):
+    """Row count of the queryset's table from the database statistics, or None if there are none"""
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)', [table])
+            row = cursor.fetchone()
+            # reltuples is -1 (or 0) for tables never vacuumed or analyzed
+            return row[0] if row and row[0] > 0 else None
+        if connection.vendor == 'sqlite':
+            try:
+                # `stat` starts with the number of rows in the table (one row per index)
+                cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table])
+            except DatabaseError:
+                return None  # No sqlite_stat1 table: ANALYZE never ran
+            row = cursor.fetchone()
+            return int(row[0].split()[0]) if row else None
+    return None
+
+
+def planner_row_estimate(queryset):
+    """PostgreSQL planner estimate of the rows a queryset returns, or None on other databases"""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def count_rows(queryset, threshold=ESTIMATE_THRESHOLD):
+    """(count, is_estimated) for a queryset: exact while cheap, estimated for large results"""
+    if _is_unfiltered(queryset):
+        estimate = table_row_estimate(queryset)
+        if estimate is not None and estimate > threshold:
+            return estimate, True
+
+    bounded = queryset.order_by()[:threshold + 1].count()
+    if bounded <= threshold:
+        return bounded, False
+
+    estimate = table_row_estimate(queryset) if _is_unfiltered(queryset) else planner_row_estimate(queryset)
+    if estimate is None:
+        return queryset.count(), False
+    return max(estimate, bounded), True
+
+
+class EstimatedPage(Page):
+    def has_next(self):
+        if self.paginator.count_is_estimated:
+            return len(self) == self.paginator.per_page  # The count cannot tell where the rows end
+        return super().has_next()
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator whose count comes from count_rows(); estimated counts do not bound the page numbers"""
+    estimate_threshold = ESTIMATE_THRESHOLD
+
+    @cached_property
+    def _counted(self):
+        if not hasattr(self.object_list, 'query'):
+            return super().count, False
+        return count_rows(self.object_list, self.estimate_threshold)
+
+    @cached_property
+    def count(self):
+        return self._counted[0]
+
+    @property
+    def count_is_estimated(self):
+        return self._counted[1]
+
+    def validate_number(self, number):
+        if not self.count_is_estimated:
+            return super().validate_number(number)
+        # The estimate may be low: page() finds the real end
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        return number
+
+    def page(self, number):
+        if not self.count_is_estimated:
+            return super().page(number)
+        # No clamping to the estimated end: the slice stops where the rows do
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        page = self._get_page(self.object_list[bottom:bottom + self.per_page], number, self)
+        if number > 1 and not len(page):
+            raise EmptyPage('That page contains no results')
+        return page
+
+    def _get_page(self, *args, **kwargs):
+        return EstimatedPage(*args, **kwargs)
+
+
+class EstimatedCountPagination(PageNumberPagination):
+    """PageNumberPagination with estimated counts for large results, flagged by `count_is_estimated`"""
+    django_paginator_class = EstimatedCountPaginator
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.page.paginator.count,
+            'count_is_estimated': self.page.paginator.count_is_estimated,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count_is_estimated'] = {'type': 'boolean', 'example': False}
+        return response_schema
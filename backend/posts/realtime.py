@@ -0,0 +1,223 @@
+"""
+In-process pub/sub used to push notification events to server-sent event
+streams (see `views.notifications_stream`).
+
+`publish()` may be called from sync code (views, the job worker). Events are
+handed to the configured transport (settings.REALTIME['TRANSPORT']), which
+delivers them to the asyncio queues of subscribers connected to this process
+and, for cross-worker transports, to every other process as well.
+
+Open streams mark their user as listening in the cache (refreshed every
+heartbeat), so cross-worker transports skip serialization, the unread count
+query and the NOTIFY for users nobody is streaming to. That needs a cache all
+processes share (REDIS_URL); with a per-process cache every user counts as
+listening. A process only starts listening for events (PostgreSQL LISTEN)
+once one of its own streams subscribes, so the job worker never does.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class Broker:
+    """Tracks the SSE connections of this process and fans events out to them"""
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._subscribers = defaultdict(set)  # user_id -> {(loop, queue), ...}
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        """Register a connection; must be called from the connection's event loop"""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers[user_id].add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, user_id, queue):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id, set())
+            subscribers.difference_update({entry for entry in subscribers if entry[1] is queue})
+            if not subscribers:
+                self._subscribers.pop(user_id, None)
+
+    def has_subscribers(self, user_id):
+        return user_id in self._subscribers
+
+    def deliver(self, user_id, event):
+        """Thread-safe: hand an event to every local connection of `user_id`"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(self._put, queue, event)
+
+    @staticmethod
+    def _put(queue, event):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow client: drop the event, it resyncs from Last-Event-ID on reconnect
+            logger.warning('Dropping realtime event for a slow subscriber')
+
+
+class BaseTransport:
+    """Moves published events to the brokers that hold the subscribers"""
+
+    def __init__(self, broker):
+        self.broker = broker
+
+    def start(self):
+        """Called before every subscription in this process; must be idempotent"""
+
+    def mark_listening(self, user_id):
+        """Called by open streams at least once per heartbeat interval"""
+
+    def wants(self, user_id):
+        """Whether publishing for `user_id` can reach anyone (lets callers skip serialization)"""
+        return True
+
+    def publish(self, user_id, event):
+        raise NotImplementedError
+
+
+class LocalTransport(BaseTransport):
+    """Deliver events to subscribers of this process only (single-process deployments)"""
+
+    def wants(self, user_id):
+        return self.broker.has_subscribers(user_id)
+
+    def publish(self, user_id, event):
+        self.broker.deliver(user_id, event)
+
+
+class PostgresTransport(BaseTransport):
+    """
+    Fan events out to every web process through PostgreSQL LISTEN/NOTIFY.
+    NOTIFY is transactional, so events published inside a transaction are only
+    delivered once it commits.
+    """
+    channel = 'wrytera_realtime'
+
+    def __init__(self, broker):
+        super().__init__(broker)
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def start(self):
+        with self._listener_lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen_forever, name='realtime-listener', daemon=True)
+                self._listener.start()
+
+    def mark_listening(self, user_id):
+        # Outlives a couple of missed heartbeats; expires on its own once the stream is gone
+        cache.set(listening_cache_key(user_id), True, settings.REALTIME['HEARTBEAT_INTERVAL'] * 3)
+
+    def wants(self, user_id):
+        if isinstance(caches['default'], (LocMemCache, DummyCache)):
+            return True  # Streams in other processes cannot be seen through a per-process cache
+        return self.broker.has_subscribers(user_id) or cache.get(listening_cache_key(user_id)) is not None
+
+    def publish(self, user_id, event):
+        from django.db import connection
+        payload = json.dumps({'user_id': user_id, 'event': event}, cls=DjangoJSONEncoder)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [self.channel, payload])
+
+    def _listen_forever(self):
+        while True:
+            try:
+                self._listen()
+            except Exception:
+                logger.exception('Realtime listener lost its connection, reconnecting')
+                time.sleep(5)
+
+    def _listen(self):
+        import psycopg
+        from django.db import connections
+        # A dedicated connection outside the pool: LISTEN holds it for the life of the process
+        params = connections['default'].get_connection_params()
+        with psycopg.connect(**{**params, 'autocommit': True}) as conn:
+            conn.execute(f'LISTEN {self.channel}')
+            while True:
+                for notify in conn.notifies(timeout=60):
+                    message = json.loads(notify.payload)
+                    self.broker.deliver(message['user_id'], message['event'])
+
+
+def listening_cache_key(user_id):
+    return f'realtime:listening:{user_id}'
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_transport():
+    """Return the process-wide transport, creating it on first use (streams start it)"""
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                options = settings.REALTIME
+                broker = Broker(queue_size=options['QUEUE_SIZE'])
+                _transport = import_string(options['TRANSPORT'])(broker)
+    return _transport
+
+
+def publish(user_id, event_type, data, event_id=None):
+    """Publish an event to the SSE streams of `user_id`. Never raises: streams are best effort."""
+    try:
+        get_transport().publish(user_id, {'type': event_type, 'id': event_id, 'data': data})
+    except Exception:
+        logger.exception('Failed to publish realtime %s event', event_type)
+
+
+def publish_notification(notification):
+    """Push a new (or updated) notification and the recipient's unread count"""
+    from .serializers import NotificationSerializer
+
+    user_id = notification.recipient_id
+    if not get_transport().wants(user_id):
+        return
+
+    try:
+        data = NotificationSerializer(notification).data
+    except Exception:
+        logger.exception('Failed to serialize notification %s for realtime delivery', notification.pk)
+        return
+    publish(user_id, 'notification', data, event_id=notification.event_id)
+    publish_unread_count(user_id)
+
+
+def publish_unread_count(user_id):
+    """Push the current unread notification count of `user_id`"""
+    from .models import NotificationCounter
+
+    if not get_transport().wants(user_id):
+        return
+
+    unread_count = NotificationCounter.get_unread_count(user_id)
+    publish(user_id, 'unread_count', {'unread_count': unread_count})
+
+
+def format_event(event):
+    """Encode an event in the text/event-stream wire format"""
+    lines = []
+    if event.get('id') is not None:
+        lines.append(f"id: {event['id']}")
+    lines.append(f"event: {event['type']}")
+    lines.append(f"data: {json.dumps(event['data'], cls=DjangoJSONEncoder)}")
+    return '\n'.join(lines) + '\n\n'
@@ -112,14 +112,13 @@ class PostSerializer(serializers.ModelSerializer):
     is_liked = serializers.SerializerMethodField()
     is_saved = serializers.SerializerMethodField()
     is_following_author = serializers.SerializerMethodField()
-    comments = CommentSerializer(many=True, read_only=True)
     
     class Meta:
         model = Post
         fields = [
             'id', 'title', 'content', 'excerpt', 'image', 'image_credit', 'author', 
             'created_at', 'like_count', 'comment_count', 'saved_count', 'view_count', 'unique_view_count',
-            'is_liked', 'is_saved', 'is_following_author', 'comments', 'views', 'category', 'is_published',
+            'is_liked', 'is_saved', 'is_following_author', 'views', 'category', 'is_published',
             'is_premium', 'premium_price', 'premium_preview', 'allow_tips'
         ]
         read_only_fields = ['author', 'created_at', 'views', 'view_count', 'unique_view_count']
@@ -240,6 +239,47 @@ class SavedPostSerializer(serializers.ModelSerializer):
         read_only_fields = ['user', 'saved_at']
 
 
+# Fields of each related object type that NotificationSerializer emits
+NOTIFICATION_RELATED_FIELDS = {
+    Post: ['id', 'title'],
+    Comment: ['id', 'content'],
+}
+
+
+def resolve_related_objects(notifications):
+    """
+    Load the related objects of a page of notifications with one in_bulk query per
+    content type instead of one GenericForeignKey query per notification.
+    Returns {(content_type_id, object_id): object}.
+    """
+    from collections import defaultdict
+    from django.contrib.contenttypes.models import ContentType
+    
+    ids_by_type = defaultdict(set)
+    for notification in notifications:
+        if notification.content_type_id and notification.object_id:
+            ids_by_type[notification.content_type_id].add(notification.object_id)
+    
+    resolved = {}
+    for content_type_id, object_ids in ids_by_type.items():
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        fields = NOTIFICATION_RELATED_FIELDS.get(model)
+        if fields is None:
+            continue  # Nothing is emitted for other types
+        for object_id, obj in model.objects.only(*fields).in_bulk(object_ids).items():
+            resolved[(content_type_id, object_id)] = obj
+    return resolved
+
+
+class NotificationListSerializer(serializers.ListSerializer):
+    """Resolves related objects for the whole page before serializing each notification"""
+    
+    def to_representation(self, data):
+        notifications = list(data.all() if hasattr(data, 'all') else data)
+        self.context['related_objects'] = resolve_related_objects(notifications)
+        return super().to_representation(notifications)
+
+
 class NotificationSerializer(serializers.ModelSerializer):
     """Serializer for notifications"""
     sender = UserSerializer(read_only=True)
@@ -250,9 +290,11 @@ class NotificationSerializer(serializers.ModelSerializer):
         model = Notification
         fields = [
             'id', 'notification_type', 'title', 'message', 'is_read', 
-            'created_at', 'sender', 'time_ago', 'related_object_data', 'extra_data'
+            'created_at', 'sender', 'time_ago', 'related_object_data', 'extra_data',
+            'actor_count', 'recent_actors'
         ]
         read_only_fields = ['id', 'created_at', 'sender']
+        list_serializer_class = NotificationListSerializer
     
     def get_time_ago(self, obj):
         """Get human-readable time ago"""
@@ -273,23 +315,30 @@ class NotificationSerializer(serializers.ModelSerializer):
     
     def get_related_object_data(self, obj):
         """Get related object data based on notification type"""
-        if not obj.related_object:
+        related_objects = self.context.get('related_objects')
+        if related_objects is not None:
+            # Resolved in bulk by NotificationListSerializer
+            related_object = related_objects.get((obj.content_type_id, obj.object_id))
+        else:
+            related_object = obj.related_object
+        
+        if not related_object:
             return None
         
-        if obj.notification_type in ['like', 'comment', 'trending'] and hasattr(obj.related_object, 'title'):
+        if obj.notification_type in ['like', 'comment', 'trending'] and hasattr(related_object, 'title'):
             # Post-related notifications
             return {
                 'type': 'post',
-                'id': obj.related_object.id,
-                'title': obj.related_object.title,
-                'slug': getattr(obj.related_object, 'slug', None)
+                'id': related_object.id,
+                'title': related_object.title,
+                'slug': getattr(related_object, 'slug', None)
             }
-        elif obj.notification_type == 'comment' and hasattr(obj.related_object, 'content'):
+        elif obj.notification_type == 'comment' and hasattr(related_object, 'content'):
             # Comment-related notifications
             return {
                 'type': 'comment',
-                'id': obj.related_object.id,
-                'content': obj.related_object.content[:100] + '...' if len(obj.related_object.content) > 100 else obj.related_object.content
+                'id': related_object.id,
+                'content': related_object.content[:100] + '...' if len(related_object.content) > 100 else related_object.content
             }
         
         return None 
\ No newline at end of file
@@ -0,0 +1,81 @@
+"""
+Admin dashboard statistics.
+
+`compute_dashboard_stats()` gets each table's total and last-30-day count in one
+conditional aggregate (`COUNT(*) FILTER (WHERE ...)`), so a refresh is one query
+per table plus the recent users. The periodic `stats.refresh_dashboard` job stores
+the result as a StatsSnapshot row, and a dashboard load reads that single row.
+Responses carry `computed_at` and `age_seconds` so the dashboard can show how old
+the numbers are.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .jobs import job_handler
+from .models import Category, Comment, Post, StatsSnapshot
+
+DASHBOARD_KEY = 'admin_dashboard'
+TREND_DAYS = 30
+
+
+def trend(total, recent):
+    """Growth of the last period relative to everything before it, in percent"""
+    return round((recent / max(total - recent, 1)) * 100, 1) if total > recent else 0
+
+
+def compute_dashboard_stats(now=None):
+    now = now or timezone.now()
+    since = now - timedelta(days=TREND_DAYS)
+    User = get_user_model()
+
+    users = User.objects.aggregate(total=Count('id'), recent=Count('id', filter=Q(date_joined__gte=since)))
+    posts = Post.objects.aggregate(total=Count('id'), recent=Count('id', filter=Q(created_at__gte=since)))
+    # Only active categories are counted, but new ones are counted whatever their state
+    categories = Category.objects.aggregate(
+        total=Count('id', filter=Q(is_active=True)), recent=Count('id', filter=Q(created_at__gte=since))
+    )
+    comments = Comment.objects.aggregate(total=Count('id'), recent=Count('id', filter=Q(created_at__gte=since)))
+
+    recent_users = User.objects.order_by('-date_joined').values('id', 'username', 'email', 'date_joined')[:5]
+    return {
+        'total_users': users['total'],
+        'users_trend': trend(users['total'], users['recent']),
+        'total_posts': posts['total'],
+        'posts_trend': trend(posts['total'], posts['recent']),
+        'total_categories': categories['total'],
+        'categories_trend': trend(categories['total'], categories['recent']),
+        'total_comments': comments['total'],
+        'comments_trend': trend(comments['total'], comments['recent']),
+        'recent_users': list(recent_users),
+    }
+
+
+@job_handler('stats.refresh_dashboard')
+def refresh_dashboard_stats():
+    now = timezone.now()
+    snapshot, _ = StatsSnapshot.objects.update_or_create(
+        key=DASHBOARD_KEY, defaults={'data': compute_dashboard_stats(now), 'computed_at': now}
+    )
+    return snapshot
+
+
+def dashboard_stats(refresh=False):
+    """
+    The dashboard payload from the latest snapshot. It is recomputed inline when
+    missing, when `refresh` is set, or when older than STATS_SNAPSHOT['MAX_AGE']
+    (the worker is not running).
+    """
+    snapshot = None if refresh else StatsSnapshot.objects.filter(key=DASHBOARD_KEY).first()
+    if snapshot is None or timezone.now() - snapshot.computed_at > timedelta(seconds=settings.STATS_SNAPSHOT['MAX_AGE']):
+        snapshot = refresh_dashboard_stats()
+        # Read back through the JSON field so both paths return the same types
+        snapshot.refresh_from_db(fields=['data'])
+    return {
+        **snapshot.data,
+        'computed_at': snapshot.computed_at,
+        'age_seconds': int((timezone.now() - snapshot.computed_at).total_seconds()),
+    }
@@ -0,0 +1,514 @@
+import tempfile
+from datetime import timedelta
+from importlib.util import find_spec
+from unittest import mock, skipUnless
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from authentication.models import User
+from posts import jobs, realtime, throttling
+from posts.models import AuthorStats, Comment, Follow, Job, Notification, NotificationActor, NotificationCounter, Post, SavedPost
+from posts.notification_helpers import create_like_notification
+
+JOB_QUEUE = {
+    'BATCH_SIZE': 10, 'VISIBILITY_TIMEOUT': 60, 'POLL_INTERVAL': 1, 'MAX_ATTEMPTS': 3,
+    'RETRY_BACKOFF_BASE': 10, 'RETRY_BACKOFF_MAX': 60, 'RETENTION_HOURS': 24, 'PERIODIC': {},
+}
+
+
+@jobs.job_handler('tests.succeed')
+def _succeed(**payload):
+    pass
+
+
+@jobs.job_handler('tests.fail')
+def _fail(**payload):
+    raise RuntimeError('boom')
+
+
+@override_settings(JOB_QUEUE=JOB_QUEUE)
+class JobQueueTests(TestCase):
+    def test_claimed_jobs_are_not_claimed_again(self):
+        for _ in range(3):
+            jobs.enqueue('tests.succeed')
+
+        first = jobs.claim_jobs('worker-1', batch_size=2)
+        second = jobs.claim_jobs('worker-2', batch_size=2)
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(second), 1)
+        self.assertFalse({job.pk for job in first} & {job.pk for job in second})
+        self.assertEqual(jobs.claim_jobs('worker-3'), [])
+        self.assertTrue(all(job.status == 'running' and job.attempts == 1 for job in first))
+
+    def test_future_jobs_are_not_claimed(self):
+        jobs.enqueue('tests.succeed', delay=60)
+        self.assertEqual(jobs.claim_jobs('worker-1'), [])
+
+    def test_success_marks_done(self):
+        jobs.enqueue('tests.succeed')
+        [job] = jobs.claim_jobs('worker-1')
+        self.assertTrue(jobs.run_job(job, 'worker-1'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertIsNone(job.locked_until)
+
+    def test_failure_is_retried_with_backoff(self):
+        jobs.enqueue('tests.fail')
+        [job] = jobs.claim_jobs('worker-1')
+        before = timezone.now()
+        self.assertFalse(jobs.run_job(job, 'worker-1'))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'pending')
+        self.assertIn('boom', job.last_error)
+        # First retry waits RETRY_BACKOFF_BASE seconds plus up to 10% jitter
+        self.assertGreaterEqual(job.run_at, before + timedelta(seconds=10))
+        self.assertLessEqual(job.run_at, timezone.now() + timedelta(seconds=11))
+        self.assertEqual(jobs.claim_jobs('worker-1'), [])
+
+    def test_retry_delay_doubles_up_to_the_cap(self):
+        self.assertTrue(10 <= jobs.retry_delay(1) <= 11)
+        self.assertTrue(20 <= jobs.retry_delay(2) <= 22)
+        self.assertTrue(60 <= jobs.retry_delay(10) <= 66)
+
+    def test_failed_after_max_attempts(self):
+        job = jobs.enqueue('tests.fail', max_attempts=2)
+        for _ in range(2):
+            Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+            [claimed] = jobs.claim_jobs('worker-1')
+            jobs.run_job(claimed, 'worker-1')
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_unknown_handler_fails(self):
+        jobs.enqueue('tests.missing')
+        [job] = jobs.claim_jobs('worker-1')
+        self.assertFalse(jobs.run_job(job, 'worker-1'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+
+    def test_expired_claim_is_reclaimed(self):
+        jobs.enqueue('tests.succeed')
+        [job] = jobs.claim_jobs('worker-1')
+        Job.objects.filter(pk=job.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+
+        [reclaimed] = jobs.claim_jobs('worker-2')
+        self.assertEqual((reclaimed.pk, reclaimed.locked_by, reclaimed.attempts), (job.pk, 'worker-2', 2))
+        # The first worker no longer owns the row and cannot record an outcome
+        jobs.run_job(job, 'worker-1')
+        reclaimed.refresh_from_db()
+        self.assertEqual((reclaimed.status, reclaimed.locked_by), ('running', 'worker-2'))
+
+    def test_queue_stats(self):
+        jobs.enqueue('tests.succeed')
+        jobs.enqueue('tests.succeed', delay=60)
+        Job.objects.filter(pk=jobs.enqueue('tests.succeed').pk).update(run_at=timezone.now() - timedelta(seconds=30))
+        Job.objects.create(name='tests.succeed', status='running', locked_until=timezone.now() - timedelta(seconds=1))
+        Job.objects.create(name='tests.succeed', status='done', finished_at=timezone.now())
+
+        stats = jobs.queue_stats()
+        self.assertEqual(stats['depth'], 4)
+        self.assertEqual(stats['by_status'], {'pending': 3, 'running': 1, 'done': 1, 'failed': 0})
+        self.assertEqual(stats['due'], 2)
+        self.assertEqual(stats['expired_claims'], 1)
+        self.assertGreaterEqual(stats['lag_seconds'], 30)
+
+
+class AuthorStatsTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', email='alice@example.com', password='pass12345')
+        self.bob = User.objects.create_user(username='bob', email='bob@example.com', password='pass12345')
+        self.alice_post = Post.objects.create(author=self.alice, title='Alice', content='...', is_published=True, views=7)
+        self.bob_post = Post.objects.create(author=self.bob, title='Bob', content='...', is_published=True, views=3)
+
+        Follow.objects.create(follower=self.alice, following=self.bob)
+        Follow.objects.create(follower=self.bob, following=self.alice)
+        SavedPost.objects.create(user=self.alice, post=self.bob_post)
+        SavedPost.objects.create(user=self.bob, post=self.alice_post)
+        self.alice_post.likes.add(self.bob)
+        self.bob_post.likes.add(self.alice)
+
+    def counters(self, user):
+        stats = AuthorStats.objects.get(user=user)
+        return {counter: getattr(stats, counter) for counter in AuthorStats.COUNTERS}
+
+    def rebuilt_counters(self, user):
+        AuthorStats.rebuild([user.pk])
+        return self.counters(user)
+
+    def test_delete_user_with_posts_follows_and_saves(self):
+        self.alice.delete()
+        # The cascade must not write back the deleted user's row (FOREIGN KEY failure at commit)
+        connection.check_constraints()
+
+        self.assertFalse(AuthorStats.objects.filter(user_id=self.alice.pk).exists())
+        incremental = self.counters(self.bob)
+        self.assertEqual(incremental, self.rebuilt_counters(self.bob))
+        self.assertEqual((incremental['followers'], incremental['following']), (0, 0))
+        self.assertEqual((incremental['likes'], incremental['saved_posts']), (0, 0))
+
+    def test_delete_users_queryset(self):
+        User.objects.filter(pk__in=[self.alice.pk, self.bob.pk]).delete()
+        connection.check_constraints()
+
+        self.assertFalse(AuthorStats.objects.exists())
+
+    def test_delete_post(self):
+        self.alice_post.delete()
+
+        incremental = self.counters(self.alice)
+        self.assertEqual(incremental, self.rebuilt_counters(self.alice))
+        self.assertEqual((incremental['posts'], incremental['views'], incremental['likes']), (0, 0, 0))
+
+    def test_concurrent_view_saves_do_not_double_count(self):
+        # Two requests load the post before either saves, then both store the recounted views
+        first, second = Post.objects.get(pk=self.alice_post.pk), Post.objects.get(pk=self.alice_post.pk)
+        first.views = second.views = 9
+        first.save(update_fields=['views'])
+        second.save(update_fields=['views'])
+
+        self.assertEqual(self.counters(self.alice)['views'], 9)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', email='author@example.com', password='pass12345')
+        self.post = Post.objects.create(author=self.author, title='Versioned', content='...', is_published=True)
+        self.client = APIClient()
+        self.url = f'/api/posts/{self.post.pk}/'
+
+    def test_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Authorization', response['Vary'])
+
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+
+    def test_writes_change_the_etag(self):
+        reader = User.objects.create_user(username='reader', email='reader@example.com', password='pass12345')
+        etag = self.client.get(self.url)['ETag']
+        writes = [
+            lambda: self.post.likes.add(reader),
+            lambda: Comment.objects.create(post=self.post, author=reader, content='Nice'),
+            lambda: SavedPost.objects.create(user=reader, post=self.post),
+            lambda: Post.objects.get(pk=self.post.pk).save(update_fields=['views']),
+        ]
+        for write in writes:
+            write()
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            etag = response['ETag']
+
+    def test_etag_depends_on_the_user(self):
+        anonymous = self.client.get(self.url)['ETag']
+        self.client.force_authenticate(self.author)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=anonymous).status_code, 200)
+
+    def test_comment_list_and_profile_validators(self):
+        for url in (f'/api/posts/{self.post.pk}/comments/', '/api/posts/users/author/'):
+            etag = self.client.get(url)['ETag']
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304, url)
+
+        comments_url = f'/api/posts/{self.post.pk}/comments/'
+        etag = self.client.get(comments_url)['ETag']
+        Comment.objects.create(post=self.post, author=self.author, content='New')
+        self.assertEqual(self.client.get(comments_url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        profile_url = '/api/posts/users/author/'
+        etag = self.client.get(profile_url)['ETag']
+        fan = User.objects.create_user(username='fan', email='fan@example.com', password='pass12345')
+        Follow.objects.create(follower=fan, following=self.author)
+        self.assertEqual(self.client.get(profile_url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_admin_bulk_actions_change_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        admin_user = User.objects.create_superuser(username='admin', email='admin@example.com', password='pass12345')
+        admin_client = APIClient()
+        admin_client.force_login(admin_user)
+
+        for action in ('make_unpublished', 'make_published', 'reset_views'):
+            admin_client.post('/admin/posts/post/', {'action': action, '_selected_action': [self.post.pk]})
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200, action)
+            etag = response['ETag']
+
+    @skipUnless(find_spec('msgpack'), 'msgpack is not installed')
+    def test_etag_depends_on_media_type(self):
+        as_json = self.client.get(self.url, HTTP_ACCEPT='application/json')
+        as_msgpack = self.client.get(self.url, HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(as_msgpack['Content-Type'], 'application/msgpack')
+        self.assertNotEqual(as_json['ETag'], as_msgpack['ETag'])
+        self.assertIn('Accept', as_json['Vary'])
+
+        # A JSON validator must not revalidate the MessagePack representation
+        response = self.client.get(self.url, HTTP_ACCEPT='application/msgpack', HTTP_IF_NONE_MATCH=as_json['ETag'])
+        self.assertEqual(response.status_code, 200)
+
+
+class PostgresTransportPresenceTests(TestCase):
+    def setUp(self):
+        self.transport = realtime.PostgresTransport(realtime.Broker())
+
+    def test_not_listening_until_started(self):
+        self.assertIsNone(self.transport._listener)
+
+    def test_wants_only_users_with_open_streams(self):
+        with tempfile.TemporaryDirectory() as location, override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location},
+        }):
+            self.assertFalse(self.transport.wants(1))
+            self.transport.mark_listening(1)
+            self.assertTrue(self.transport.wants(1))
+            self.assertFalse(self.transport.wants(2))
+
+    def test_wants_everyone_with_a_per_process_cache(self):
+        self.assertTrue(self.transport.wants(1))
+
+
+class NotificationCounterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', email='reader@example.com', password='pass12345')
+        self.notifications = [
+            Notification.create_notification(self.user, 'system', 'Hello', f'Message {i}') for i in range(3)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertCounterExact(self, expected):
+        self.assertEqual(NotificationCounter.get_unread_count(self.user.pk), expected)
+        self.assertEqual(Notification.objects.filter(recipient=self.user, is_read=False).count(), expected)
+
+    def test_create_counts(self):
+        self.assertCounterExact(3)
+
+    def test_mark_read_is_counted_once(self):
+        url = f'/api/posts/notifications/{self.notifications[0].pk}/read/'
+        self.client.put(url)
+        self.client.put(url)
+        self.assertCounterExact(2)
+
+    def test_delete(self):
+        self.notifications[0].mark_as_read()
+        self.client.delete(f'/api/posts/notifications/{self.notifications[0].pk}/delete/')
+        self.client.delete(f'/api/posts/notifications/{self.notifications[1].pk}/delete/')
+        self.assertCounterExact(1)
+
+    def test_mark_all_read(self):
+        self.client.put('/api/posts/notifications/mark-all-read/')
+        self.assertCounterExact(0)
+
+    def test_reconcile_repairs_drift(self):
+        NotificationCounter.objects.filter(user=self.user).update(unread_count=42)
+        self.assertEqual(NotificationCounter.reconcile(self.user.pk), 3)
+        self.assertCounterExact(3)
+
+    def test_reconcile_all(self):
+        other = User.objects.create_user(username='other', email='other@example.com', password='pass12345')
+        Notification.create_notification(other, 'system', 'Hello', 'Message')
+        NotificationCounter.objects.filter(user=self.user).update(unread_count=0)
+        NotificationCounter.objects.filter(user=other).delete()
+
+        self.assertEqual(NotificationCounter.reconcile_all(batch_size=1), 2)
+        self.assertCounterExact(3)
+        self.assertEqual(NotificationCounter.objects.get(user=other).unread_count, 1)
+        self.assertEqual(NotificationCounter.reconcile_all(), 0)
+
+
+class NotificationCoalescingTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', email='author@example.com', password='pass12345')
+        self.post = Post.objects.create(author=self.author, title='Popular', content='...', is_published=True)
+        self.likers = [
+            User.objects.create_user(username=f'liker{i}', email=f'liker{i}@example.com', password='pass12345')
+            for i in range(4)
+        ]
+
+    def notification(self):
+        [notification] = Notification.objects.filter(recipient=self.author, notification_type='like')
+        return notification
+
+    def test_likes_are_coalesced(self):
+        for liker in self.likers:
+            create_like_notification(self.post, liker)
+
+        notification = self.notification()
+        self.assertEqual(notification.actor_count, 4)
+        self.assertEqual(notification.message, 'liker3 and 3 others liked your post "Popular"')
+        self.assertEqual([actor['username'] for actor in notification.recent_actors], ['liker3', 'liker2', 'liker1'])
+        self.assertEqual(NotificationActor.objects.filter(notification=notification).count(), 4)
+
+    def test_repeat_actor_is_not_counted_twice(self):
+        create_like_notification(self.post, self.likers[0])
+        create_like_notification(self.post, self.likers[1])
+        create_like_notification(self.post, self.likers[0])
+
+        notification = self.notification()
+        self.assertEqual(notification.actor_count, 2)
+        self.assertEqual(notification.message, 'liker0 and 1 other liked your post "Popular"')
+
+    def test_coalescing_marks_unread_again(self):
+        create_like_notification(self.post, self.likers[0])
+        self.notification().mark_as_read()
+        create_like_notification(self.post, self.likers[1])
+
+        self.assertFalse(self.notification().is_read)
+        self.assertEqual(NotificationCounter.get_unread_count(self.author.pk), 1)
+
+    def test_describe_actors(self):
+        self.assertEqual(Notification.describe_actors('alice', 1), 'alice')
+        self.assertEqual(Notification.describe_actors('alice', 2), 'alice and 1 other')
+        self.assertEqual(Notification.describe_actors('alice', 42), 'alice and 41 others')
+
+
+class CommentTreeTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='commenter', email='commenter@example.com', password='pass12345')
+        self.post = Post.objects.create(author=self.user, title='Thread', content='...', is_published=True)
+
+    def comment(self, parent=None, post=None):
+        return Comment.objects.create(post=post or self.post, author=self.user, content='...', parent=parent)
+
+    def chain(self, length, parent=None):
+        comments = []
+        for _ in range(length):
+            parent = self.comment(parent)
+            comments.append(parent)
+        return comments
+
+    def test_paths_and_thread_order(self):
+        first, second = self.comment(), self.comment()
+        reply = self.comment(first)
+        nested = self.comment(reply)
+
+        self.assertEqual(nested.path, first.path + Comment.path_segment(reply.pk) + Comment.path_segment(nested.pk))
+        self.assertEqual(nested.depth, 2)
+        thread = list(Comment.thread(self.post))
+        self.assertEqual(thread, [first, reply, nested, second])
+        self.assertEqual([comment.depth for comment in thread], [0, 1, 2, 0])
+
+    def test_branch(self):
+        first, second = self.comment(), self.comment()
+        reply = self.comment(first)
+        nested = self.comment(reply)
+        self.comment(second)
+
+        self.assertEqual(list(first.branch()), [first, reply, nested])
+        self.assertEqual(list(reply.branch()), [reply, nested])
+        self.assertEqual(first.branch_height(), 2)
+
+    def test_replies_past_max_depth_attach_to_the_grandparent(self):
+        chain = self.chain(Comment.MAX_DEPTH + 1)
+        self.assertEqual(chain[-2].depth, Comment.MAX_DEPTH - 1)
+        self.assertEqual(chain[-1].depth, Comment.MAX_DEPTH - 1)
+        self.assertEqual(chain[-1].parent_id, chain[-3].pk)
+
+    def test_move_to(self):
+        first, second = self.comment(), self.comment()
+        reply = self.comment(first)
+        nested = self.comment(reply)
+
+        reply.move_to(second)
+        nested.refresh_from_db()
+        self.assertEqual(nested.path, second.path + Comment.path_segment(reply.pk) + Comment.path_segment(nested.pk))
+        self.assertEqual(list(second.branch()), [second, reply, nested])
+        self.assertEqual(list(first.branch()), [first])
+
+        reply.move_to(None)
+        nested.refresh_from_db()
+        self.assertEqual((reply.depth, nested.depth), (0, 1))
+        self.assertEqual(list(Comment.thread(self.post)), [first, second, reply, nested])
+
+    def test_move_to_other_post(self):
+        other_post = Post.objects.create(author=self.user, title='Other', content='...', is_published=True)
+        target = self.comment(post=other_post)
+        reply = self.comment(self.comment())
+
+        reply.move_to(target)
+        self.assertEqual(list(Comment.thread(other_post)), [target, reply])
+
+    def test_move_into_own_branch_is_rejected(self):
+        root = self.comment()
+        reply = self.comment(root)
+        with self.assertRaises(ValueError):
+            root.move_to(reply)
+
+    def test_move_past_max_depth_is_rejected(self):
+        deep = self.chain(Comment.MAX_DEPTH - 1)[-1]
+        branch_root = self.comment()
+        self.comment(branch_root)
+        with self.assertRaises(ValueError):
+            branch_root.move_to(deep)
+        # A single comment still fits at the deepest level
+        self.comment().move_to(deep)
+
+
+class TokenBucketTests(TestCase):
+    def test_take_token_refills_over_time(self):
+        rate = throttling.parse_rate('60/min')
+        self.assertEqual(rate, 1)
+        self.assertEqual(throttling.take_token(0, 0, 0.5, rate, 5), (False, 0.5, 0.5))
+        self.assertEqual(throttling.take_token(0, 0, 3, rate, 5), (True, 2, 0))
+        # Never more than the burst, however long the bucket sat idle
+        self.assertEqual(throttling.take_token(0, 0, 3600, rate, 5), (True, 4, 0))
+
+    def test_memory_store_burst_then_refill(self):
+        store = throttling.MemoryBucketStore()
+        with mock.patch('posts.throttling.time.monotonic', return_value=100.0) as monotonic:
+            self.assertEqual([store.take('key', 1, 3)[0] for _ in range(4)], [True, True, True, False])
+            self.assertEqual(store.take('key', 1, 3), (False, 1))
+            monotonic.return_value = 101.0
+            self.assertEqual(store.take('key', 1, 3), (True, 0))
+            self.assertFalse(store.take('key', 1, 3)[0])
+
+
+@override_settings(THROTTLE={
+    'STORE': 'cache',
+    'RATES': {'track_post_view': {'user': ('1/min', 2), 'ip': ('1/min', 4)}},
+})
+class WriteThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', email='author@example.com', password='pass12345')
+        self.post = Post.objects.create(author=self.author, title='Throttled', content='...', is_published=True)
+        self.url = f'/api/posts/{self.post.pk}/view/'
+
+    def client_for(self, user=None, address='198.51.100.1'):
+        client = APIClient(REMOTE_ADDR=address)
+        if user:
+            client.force_authenticate(user)
+        return client
+
+    def statuses(self, client, count):
+        return [client.post(self.url).status_code for _ in range(count)]
+
+    def test_burst_then_429_with_retry_after(self):
+        client = self.client_for(self.author)
+        self.assertEqual(self.statuses(client, 2), [200, 200])
+        response = client.post(self.url)
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(1 <= int(response['Retry-After']) <= 60)
+
+    def test_users_have_their_own_buckets(self):
+        other = User.objects.create_user(username='other', email='other@example.com', password='pass12345')
+        self.assertEqual(self.statuses(self.client_for(self.author), 3), [200, 200, 429])
+        self.assertEqual(self.statuses(self.client_for(other, address='198.51.100.2'), 2), [200, 200])
+
+    def test_anonymous_clients_share_their_address_bucket(self):
+        self.assertEqual(self.statuses(self.client_for(), 2), [200, 200])
+        self.assertEqual(self.client_for().post(self.url).status_code, 429)
+        self.assertEqual(self.client_for(address='198.51.100.2').post(self.url).status_code, 200)
+
+    def test_ip_bucket_caps_many_accounts_behind_one_address(self):
+        users = [
+            User.objects.create_user(username=f'user{i}', email=f'user{i}@example.com', password='pass12345')
+            for i in range(3)
+        ]
+        statuses = [status for user in users for status in self.statuses(self.client_for(user), 2)]
+        self.assertEqual(statuses, [200, 200, 200, 200, 429, 429])
@@ -0,0 +1,121 @@
+"""
+Token-bucket throttling for toggle-style write endpoints (likes, follows,
+saves, reposts, view tracking).
+
+Each client gets a bucket per route holding up to `burst` tokens that refill at
+the configured rate; a request takes one token and is rejected with 429 and a
+Retry-After header (DRF's Throttled handling) when the bucket is empty. Limits
+live in settings.THROTTLE['RATES'], keyed by view name, with a per-user bucket
+(per-IP for anonymous clients) and a looser per-IP bucket that also caps many
+accounts behind one address.
+
+Buckets are kept in process memory by default; THROTTLE['STORE'] = 'cache'
+keeps them in the default cache (shared between workers with REDIS_URL). The
+cache store reads and writes the bucket without a lock, so concurrent requests
+can occasionally slip through. That is fine for abuse protection.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """'60/min' -> tokens per second"""
+    num, period = rate.split('/')
+    return int(num) / PERIODS[period[0]]
+
+
+def take_token(tokens, updated, now, rate, burst):
+    """Refill a bucket to `now` and take one token: (allowed, tokens left, seconds until the next token)"""
+    tokens = min(burst, tokens + (now - updated) * rate)
+    if tokens >= 1:
+        return True, tokens - 1, 0
+    return False, tokens, (1 - tokens) / rate
+
+
+class MemoryBucketStore:
+    """Buckets of this process: key -> (tokens, updated, time at which the bucket is full again)"""
+    max_keys = 10000
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated, _ = self._buckets.get(key, (burst, now, now))
+            allowed, tokens, wait = take_token(tokens, updated, now, rate, burst)
+            self._buckets[key] = (tokens, now, now + (burst - tokens) / rate)
+            if len(self._buckets) > self.max_keys:
+                # A bucket that has refilled completely behaves exactly like a missing one
+                self._buckets = {key: bucket for key, bucket in self._buckets.items() if bucket[2] > now}
+        return allowed, wait
+
+
+class CacheBucketStore:
+    """Buckets in the default cache, expiring once they would be full again"""
+
+    def take(self, key, rate, burst):
+        now = time.time()
+        tokens, updated = cache.get(key, (burst, now))
+        allowed, tokens, wait = take_token(tokens, updated, now, rate, burst)
+        cache.set(key, (tokens, now), int((burst - tokens) / rate) + 1)
+        return allowed, wait
+
+
+_memory_store = MemoryBucketStore()
+
+
+def get_store():
+    return CacheBucketStore() if settings.THROTTLE['STORE'] == 'cache' else _memory_store
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Base class: subclasses pick the bucket in THROTTLE['RATES'][view name] and the client key"""
+    bucket = None
+
+    def get_cache_key(self, request, view):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        self._wait = None
+        # @api_view names the wrapping APIView class after the view function
+        limits = settings.THROTTLE['RATES'].get(type(view).__name__, {}).get(self.bucket)
+        if limits is None:
+            return True
+
+        rate, burst = limits
+        # Anonymous clients are keyed by IP in both buckets; the bucket name keeps them apart
+        key = f'throttle:{type(view).__name__}:{self.bucket}:{self.get_cache_key(request, view)}'
+        allowed, self._wait = get_store().take(key, parse_rate(rate), burst)
+        return allowed
+
+    def wait(self):
+        return self._wait
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """Per-user bucket; anonymous requests are keyed by IP"""
+    bucket = 'user'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return f'ip:{self.get_ident(request)}'
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    """Per-IP bucket, whoever is logged in"""
+    bucket = 'ip'
+
+    def get_cache_key(self, request, view):
+        return f'ip:{self.get_ident(request)}'
+
+
+WRITE_THROTTLES = [UserTokenBucketThrottle, IPTokenBucketThrottle]
@@ -1,13 +1,13 @@
 from django.urls import path
-from . import views
+from . import views, async_views
 
 app_name = 'posts'
 
 urlpatterns = [
     # Post URLs
-    path('', views.post_list, name='post_list'),
-    path('search/', views.search_posts, name='search_posts'),
-    path('<int:pk>/', views.post_detail, name='post_detail'),
+    path('', async_views.post_list, name='post_list'),
+    path('search/', async_views.search_posts, name='search_posts'),
+    path('<int:pk>/', async_views.post_detail, name='post_detail'),
     path('<int:pk>/view/', views.track_post_view, name='track_post_view'),
     path('<int:pk>/like/', views.like_post, name='like_post'),
     
@@ -16,6 +16,7 @@ urlpatterns = [
     path('<int:post_pk>/comments/', views.comment_list, name='comment_list'),
     path('comments/<int:pk>/', views.comment_detail, name='comment_detail'),
     path('comments/<int:pk>/like/', views.like_comment, name='like_comment'),
+    path('comments/<int:pk>/replies/', views.comment_replies, name='comment_replies'),
     
     # User posts endpoint (for frontend compatibility) - must come before users/ patterns
     path('user/<int:user_id>/', views.user_posts, name='user_posts_by_id'),
@@ -29,6 +30,8 @@ urlpatterns = [
     # User Dashboard URLs
     path('users/stats/', views.user_stats, name='user_stats'),
     path('admin/dashboard-stats/', views.admin_dashboard_stats, name='admin_dashboard_stats'),
+    path('admin/queue-stats/', views.job_queue_stats, name='job_queue_stats'),
+    path('admin/db-pool-stats/', views.db_pool_stats, name='db_pool_stats'),
     path('users/posts/', views.current_user_posts, name='current_user_posts'),
     path('users/library/', views.user_library, name='user_library'),
     path('users/favorites/', views.user_favorites, name='user_favorites'),
@@ -45,7 +48,7 @@ urlpatterns = [
     path('<int:post_id>/save/', views.save_post, name='save_post_by_id'),
     
     # Trending posts
-    path('trending/', views.trending_posts, name='trending_posts'),
+    path('trending/', async_views.trending_posts, name='trending_posts'),
     
     # Repost URLs
     path('<int:post_pk>/repost/', views.repost, name='repost'),
@@ -57,7 +60,8 @@ urlpatterns = [
     
     # Notification URLs
     path('notifications/', views.notifications_list, name='notifications_list'),
-    path('notifications/count/', views.notifications_count, name='notifications_count'),
+    path('notifications/count/', async_views.notifications_count, name='notifications_count'),
+    path('notifications/stream/', views.notifications_stream, name='notifications_stream'),
     path('notifications/mark-all-read/', views.mark_all_notifications_read, name='mark_all_notifications_read'),
     path('notifications/<int:pk>/read/', views.mark_notification_read, name='mark_notification_read'),
     path('notifications/<int:pk>/delete/', views.delete_notification, name='delete_notification'),
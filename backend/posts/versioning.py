@@ -0,0 +1,201 @@
+"""
+Per-object version counters used as HTTP validators.
+
+`Post.version` and `User.version` are bumped (together with `changed_at`) by the
+signal receivers below whenever something shown in the post detail, comment
+thread or public profile payload changes. Views decorated with
+`conditional_get` compare those counters against If-None-Match /
+If-Modified-Since and answer 304 before any serializer runs.
+
+ETags also cover the requesting user and the negotiated media type (JSON,
+MessagePack), and responses vary on Authorization and Accept, so no cache or
+client reuses a body for another user or format.
+"""
+import hashlib
+from functools import wraps
+
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import condition
+from rest_framework.exceptions import NotAcceptable
+from rest_framework.settings import api_settings
+
+from .models import Comment, Follow, Post, PostView, SavedPost
+
+User = get_user_model()
+
+
+def bump_posts(post_ids):
+    post_ids = [post_id for post_id in post_ids if post_id]
+    if post_ids:
+        Post.objects.filter(pk__in=post_ids).update(version=F('version') + 1, changed_at=timezone.now())
+
+
+def bump_users(user_ids):
+    user_ids = [user_id for user_id in user_ids if user_id]
+    if user_ids:
+        User.objects.filter(pk__in=user_ids).update(version=F('version') + 1, changed_at=timezone.now())
+
+
+# Write paths that change a post's payload
+
+@receiver([post_save, post_delete], sender=Post)
+def _post_changed(sender, instance, **kwargs):
+    # Saves with update_fields (e.g. the view counter) skip auto_now, so bump explicitly
+    bump_posts([instance.pk])
+    bump_users([instance.author_id])  # posts_count on the profile
+
+
+@receiver([post_save, post_delete], sender=Comment)
+@receiver([post_save, post_delete], sender=SavedPost)
+@receiver([post_save, post_delete], sender=PostView)
+def _post_child_changed(sender, instance, **kwargs):
+    bump_posts([instance.post_id])
+
+
+@receiver(m2m_changed, sender=Post.likes.through)
+def _post_likes_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        # instance is the user and pk_set holds post ids
+        bump_posts(pk_set or [])
+    else:
+        bump_posts([instance.pk])
+
+
+@receiver(m2m_changed, sender=Comment.likes.through)
+def _comment_likes_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        post_ids = Comment.objects.filter(pk__in=pk_set or []).values_list('post_id', flat=True).distinct()
+        bump_posts(list(post_ids))
+    else:
+        bump_posts([instance.post_id])
+
+
+# Write paths that change a user's public profile (and is_following_author on their posts)
+
+@receiver([post_save, post_delete], sender=Follow)
+def _follow_changed(sender, instance, **kwargs):
+    bump_users([instance.follower_id, instance.following_id])
+
+
+# Validators
+
+VARY_HEADERS = ('Authorization', 'Accept')
+
+
+def negotiated_media_type(request):
+    """Media type (with parameters such as indent) the response to a DRF request is rendered as"""
+    media_type = getattr(request, 'accepted_media_type', None)
+    if media_type is None:
+        # Async views negotiate when they render; do the same selection here
+        renderers = [renderer_class() for renderer_class in api_settings.DEFAULT_RENDERER_CLASSES]
+        try:
+            _, media_type = request.negotiator.select_renderer(request, renderers)
+        except NotAcceptable:
+            media_type = renderers[0].media_type
+    return media_type
+
+
+def _etag(*parts):
+    return hashlib.md5(':'.join(str(part) for part in parts).encode(), usedforsecurity=False).hexdigest()
+
+
+def _latest(*timestamps):
+    timestamps = [timestamp for timestamp in timestamps if timestamp]
+    return max(timestamps) if timestamps else None
+
+
+def post_validators(request, pk):
+    """(etag, last_modified) of a post detail payload for the requesting user"""
+    row = Post.objects.filter(pk=pk).values_list(
+        'version', 'updated_at', 'changed_at', 'author__version', 'author__updated_at', 'author__changed_at'
+    ).first()
+    if row is None:
+        return None, None
+    version, updated_at, changed_at, author_version, author_updated_at, author_changed_at = row
+    etag = _etag(
+        'post', pk, version, updated_at, author_version, author_updated_at, request.user.pk, negotiated_media_type(request)
+    )
+    return etag, _latest(updated_at, changed_at, author_updated_at, author_changed_at)
+
+
+def comment_list_validators(request, post_pk):
+    """(etag, last_modified) of a page of a post's comment thread"""
+    row = Post.objects.filter(pk=post_pk).values_list('version', 'changed_at').first()
+    if row is None:
+        return None, None
+    version, changed_at = row
+    # The cursor is part of the URL, so one validator covers every page
+    return _etag('comments', post_pk, version, request.user.pk, negotiated_media_type(request)), changed_at
+
+
+def user_profile_validators(request, username):
+    """(etag, last_modified) of a public profile payload"""
+    row = User.objects.filter(username=username).values_list('pk', 'version', 'updated_at', 'changed_at').first()
+    if row is None:
+        return None, None
+    user_id, version, updated_at, changed_at = row
+    etag = _etag('profile', user_id, version, updated_at, request.user.pk, negotiated_media_type(request))
+    return etag, _latest(updated_at, changed_at)
+
+
+def not_modified_response(request, etag, last_modified):
+    """304 response when the request's validators match, else None (for async views)"""
+    if etag is None:
+        return None
+    response = get_conditional_response(
+        request,
+        etag=quote_etag(etag),
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+    if response is not None:
+        patch_vary_headers(response, VARY_HEADERS)
+    return response
+
+
+def set_validators(response, etag, last_modified):
+    """Add ETag / Last-Modified to a response built by an async view"""
+    if etag is not None:
+        response.headers.setdefault('ETag', quote_etag(etag))
+    if last_modified is not None and not response.has_header('Last-Modified'):
+        response.headers['Last-Modified'] = http_date(last_modified.timestamp())
+    patch_vary_headers(response, VARY_HEADERS)
+    return response
+
+
+def conditional_get(validators):
+    """
+    Wrap a DRF view so If-None-Match / If-Modified-Since are answered with 304
+    from `validators(request, *args, **kwargs)` before the view body runs.
+    Goes between @api_view and the view function so request.user is available.
+    """
+    def decorator(view):
+        def cached_validators(request, *args, **kwargs):
+            # condition() asks for the ETag and Last-Modified separately; look them up once
+            if not hasattr(request, '_validators'):
+                request._validators = validators(request, *args, **kwargs)
+            return request._validators
+
+        conditional_view = condition(
+            etag_func=lambda request, *args, **kwargs: cached_validators(request, *args, **kwargs)[0],
+            last_modified_func=lambda request, *args, **kwargs: cached_validators(request, *args, **kwargs)[1],
+        )(view)
+
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            # Validators depend on who is asking and in which format
+            patch_vary_headers(response, VARY_HEADERS)
+            return response
+
+        return wrapped
+    return decorator
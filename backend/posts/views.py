@@ -1,156 +1,159 @@
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes, authentication_classes
+from rest_framework.decorators import api_view, permission_classes, authentication_classes, throttle_classes
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.authentication import TokenAuthentication
+from authentication.backends import CachedTokenAuthentication, SnapshotJWTAuthentication
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken
 from django.shortcuts import get_object_or_404
+from django.http import JsonResponse, StreamingHttpResponse
+from django.conf import settings
+from asgiref.sync import sync_to_async
+import asyncio
 from django.db.models import Q
 from django.db import models
-from .models import Post, Comment, Follow, Repost, Category, SavedPost, PostView, Notification
+from .models import Post, Comment, Follow, Repost, Category, SavedPost, PostView, Notification, NotificationCounter, AuthorStats
 from .serializers import (
     PostSerializer, PostCreateSerializer, 
     FollowSerializer, RepostSerializer, RepostCreateSerializer,
     CategorySerializer, SavedPostSerializer, NotificationSerializer
 )
-from .comment_serializers import CommentSerializer, AdminCommentSerializer
+from .comment_serializers import CommentSerializer, AdminCommentSerializer, with_comment_counts, comment_page_context, load_comment_thread
+from .jobs import enqueue, queue_stats
+from .stats import dashboard_stats
+from .realtime import get_transport, publish_unread_count, format_event
+from core.db_pool import pool_stats
+from authentication.images import requested_variant
+from .pagination import EstimatedCountPagination
+from .throttling import WRITE_THROTTLES
+from .versioning import conditional_get, post_validators, comment_list_validators, user_profile_validators
 
-# Custom pagination class
-class PostPagination(PageNumberPagination):
+# Custom pagination class; counts of large results are estimated (see pagination.py)
+class PostPagination(EstimatedCountPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
 
+class CommentCursorPagination(CursorPagination):
+    """Cursor pagination keeps paging cheap and stable while new comments arrive"""
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('created_at', 'id')
+
 # Post views
-@api_view(['GET', 'POST'])
-def post_list(request):
-    """Get all posts or create a new post"""
-    if request.method == 'GET':
-        # Get all published posts, regardless of authentication status
-        posts = Post.objects.filter(is_published=True).select_related('author').prefetch_related('likes', 'comments')
-        
-        # Handle search parameter - only search by post title and username
-        search = request.GET.get('search', '')
-        if search:
-            posts = posts.filter(
-                Q(title__icontains=search) | 
-                Q(author__username__icontains=search)
-            )
-        
-        # Apply pagination
-        paginator = PostPagination()
-        paginated_posts = paginator.paginate_queryset(posts, request)
-        serializer = PostSerializer(paginated_posts, many=True, context={'request': request})
-        return paginator.get_paginated_response(serializer.data)
+# Reads (GET) of the post list, post detail, trending, search and the unread
+# notification count are served by the async views in async_views.py, which
+# hand the write methods below over to DRF.
+@api_view(['POST'])
+def create_post(request):
+    """Create a new post"""
+    if not request.user.is_authenticated:
+        return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
     
-    elif request.method == 'POST':
-        if not request.user.is_authenticated:
-            return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
-        
-        try:
-            # Debug logging
-            print(f"=== POST CREATION DEBUG ===")
-            print(f"User: {request.user}")
-            print(f"Request data: {request.data}")
-            print(f"Request content type: {request.content_type}")
-            
-            # Clean the data before serialization
-            data = dict(request.data)
+    try:
+        # Debug logging
+        print(f"=== POST CREATION DEBUG ===")
+        print(f"User: {request.user}")
+        print(f"Request data: {request.data}")
+        print(f"Request content type: {request.content_type}")
+        
+        # Clean the data before serialization
+        data = dict(request.data)
+        
+        # Handle category field specifically
+        if 'category' in data:
+            category_value = data['category']
+            print(f"Category value: '{category_value}' (type: {type(category_value)})")
             
-            # Handle category field specifically
-            if 'category' in data:
-                category_value = data['category']
-                print(f"Category value: '{category_value}' (type: {type(category_value)})")
-                
-                if category_value and isinstance(category_value, str) and category_value.strip():
-                    # Try to find existing category or create new one
-                    from django.utils.text import slugify
-                    category_name = category_value.strip()
-                    try:
-                        category_obj = Category.objects.get(name__iexact=category_name)
-                        print(f"Found existing category: {category_obj}")
-                    except Category.DoesNotExist:
-                        # Create new category
-                        slug = slugify(category_name)
-                        if not slug:
-                            slug = 'general'
-                        
-                        # Ensure unique slug
-                        counter = 1
-                        original_slug = slug
-                        while Category.objects.filter(slug=slug).exists():
-                            slug = f"{original_slug}-{counter}"
-                            counter += 1
-                        
-                        category_obj = Category.objects.create(
-                            name=category_name,
-                            slug=slug
-                        )
-                        print(f"Created new category: {category_obj}")
+            if category_value and isinstance(category_value, str) and category_value.strip():
+                # Try to find existing category or create new one
+                from django.utils.text import slugify
+                category_name = category_value.strip()
+                try:
+                    category_obj = Category.objects.get(name__iexact=category_name)
+                    print(f"Found existing category: {category_obj}")
+                except Category.DoesNotExist:
+                    # Create new category
+                    slug = slugify(category_name)
+                    if not slug:
+                        slug = 'general'
                     
-                    # Replace string with category object ID
-                    data['category'] = category_obj.id
-                else:
-                    # Remove empty category
-                    data.pop('category', None)
-                    print("Removed empty category")
-            
-            print(f"Cleaned data: {data}")
-            
-            # Ensure author is set in data before serialization
-            print(f"Setting author in data: {request.user} (ID: {request.user.id})")
-            data['author'] = request.user.id
-            
-            # Create serializer with cleaned data
-            serializer = PostCreateSerializer(data=data, context={'request': request})
-            print(f"Serializer created with author: {data.get('author')}")
-            
-            if serializer.is_valid():
-                print("Serializer is valid, saving...")
-                # Double-check author is set before saving
-                validated_data = serializer.validated_data
-                if 'author' not in validated_data or not validated_data['author']:
-                    print("WARNING: Author not in validated_data, setting manually")
-                    validated_data['author'] = request.user
-                
-                post = serializer.save()
-                print(f"Post saved successfully: {post.id} by {post.author}")
+                    # Ensure unique slug
+                    counter = 1
+                    original_slug = slug
+                    while Category.objects.filter(slug=slug).exists():
+                        slug = f"{original_slug}-{counter}"
+                        counter += 1
+                    
+                    category_obj = Category.objects.create(
+                        name=category_name,
+                        slug=slug
+                    )
+                    print(f"Created new category: {category_obj}")
                 
-                # Return the created post with full serialization
-                response_serializer = PostSerializer(post, context={'request': request})
-                return Response(response_serializer.data, status=status.HTTP_201_CREATED)
+                # Replace string with category object ID
+                data['category'] = category_obj.id
             else:
-                print(f"Serializer validation errors: {serializer.errors}")
-                return Response({
-                    'error': 'Validation failed',
-                    'details': serializer.errors,
-                    'received_data': data
-                }, status=status.HTTP_400_BAD_REQUEST)
-                
-        except Exception as e:
-            import traceback
-            print(f"Exception in post creation: {str(e)}")
-            print(f"Exception type: {type(e)}")
-            traceback.print_exc()
+                # Remove empty category
+                data.pop('category', None)
+                print("Removed empty category")
+        
+        print(f"Cleaned data: {data}")
+        
+        # Ensure author is set in data before serialization
+        print(f"Setting author in data: {request.user} (ID: {request.user.id})")
+        data['author'] = request.user.id
+        
+        # Create serializer with cleaned data
+        serializer = PostCreateSerializer(data=data, context={'request': request})
+        print(f"Serializer created with author: {data.get('author')}")
+        
+        if serializer.is_valid():
+            print("Serializer is valid, saving...")
+            # Double-check author is set before saving
+            validated_data = serializer.validated_data
+            if 'author' not in validated_data or not validated_data['author']:
+                print("WARNING: Author not in validated_data, setting manually")
+                validated_data['author'] = request.user
+            
+            post = serializer.save()
+            print(f"Post saved successfully: {post.id} by {post.author}")
             
+            if post.is_published:
+                enqueue('notifications.new_post', {'post_id': post.id})
+            
+            # Return the created post with full serialization
+            response_serializer = PostSerializer(post, context={'request': request})
+            return Response(response_serializer.data, status=status.HTTP_201_CREATED)
+        else:
+            print(f"Serializer validation errors: {serializer.errors}")
             return Response({
-                'error': f'Server error during post creation: {str(e)}',
-                'type': str(type(e)),
-                'traceback': traceback.format_exc()
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                'error': 'Validation failed',
+                'details': serializer.errors,
+                'received_data': data
+            }, status=status.HTTP_400_BAD_REQUEST)
+            
+    except Exception as e:
+        import traceback
+        print(f"Exception in post creation: {str(e)}")
+        print(f"Exception type: {type(e)}")
+        traceback.print_exc()
+        
+        return Response({
+            'error': f'Server error during post creation: {str(e)}',
+            'type': str(type(e)),
+            'traceback': traceback.format_exc()
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-@api_view(['GET', 'PUT', 'DELETE'])
-def post_detail(request, pk):
-    """Get, update, or delete a specific post"""
+@api_view(['PUT', 'DELETE'])
+@conditional_get(post_validators)
+def modify_post(request, pk):
+    """Update or delete a specific post"""
     post = get_object_or_404(Post, pk=pk)
     
-    if request.method == 'GET':
-        # Only increment view count if this is a full post view (not API call for other purposes)
-        # Views should only be counted when users actually view the post content
-        serializer = PostSerializer(post, context={'request': request})
-        return Response(serializer.data)
-    
-    elif request.method == 'PUT':
+    if request.method == 'PUT':
         if not request.user.is_authenticated or post.author != request.user:
             return Response({'error': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
         
@@ -186,6 +189,7 @@ def post_detail(request, pk):
             )
 
 @api_view(['POST'])
+@throttle_classes(WRITE_THROTTLES)
 def track_post_view(request, pk):
     """Track a post view - only counts when user actually views the full post"""
     from datetime import datetime, timedelta
@@ -260,6 +264,7 @@ def track_post_view(request, pk):
         })
 
 @api_view(['POST'])
+@throttle_classes(WRITE_THROTTLES)
 @permission_classes([IsAuthenticated])
 def like_post(request, pk):
     """Like or unlike a post"""
@@ -275,6 +280,7 @@ def like_post(request, pk):
     else:
         post.likes.add(request.user)
         like_count = post.likes.count()
+        enqueue('notifications.like', {'post_id': post.id, 'user_id': request.user.id})
         return Response({
             'liked': True,
             'like_count': like_count
@@ -282,7 +288,7 @@ def like_post(request, pk):
 
 # Comment views
 @api_view(['GET', 'POST'])
-@authentication_classes([TokenAuthentication])
+@authentication_classes([CachedTokenAuthentication])
 def comment_list(request, post_pk):
     """Get comments for a post or add a new comment"""
     try:
@@ -317,6 +323,7 @@ def comment_list(request, post_pk):
         return Response({'error': f'Server error: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 @api_view(['POST'])
+@throttle_classes(WRITE_THROTTLES)
 @permission_classes([IsAuthenticated])
 def like_comment(request, pk):
     """Like or unlike a comment"""
@@ -331,6 +338,7 @@ def like_comment(request, pk):
 
 # Follow views
 @api_view(['POST'])
+@throttle_classes(WRITE_THROTTLES)
 @permission_classes([IsAuthenticated])
 def follow_user(request, user_id):
     """Follow or unfollow a user"""
@@ -349,6 +357,7 @@ def follow_user(request, user_id):
         follow.delete()
         return Response({'following': False})
     
+    enqueue('notifications.follow', {'follower_id': request.user.id, 'following_id': user_to_follow.id})
     return Response({'following': True})
 
 @api_view(['GET'])
@@ -371,6 +380,7 @@ def user_following(request, user_id):
 
 # Repost views
 @api_view(['POST'])
+@throttle_classes(WRITE_THROTTLES)
 @permission_classes([IsAuthenticated])
 def repost(request, post_pk):
     """Repost a post"""
@@ -455,49 +465,6 @@ def category_posts(request, category_slug):
     serializer = PostSerializer(paginated_posts, many=True, context={'request': request})
     return paginator.get_paginated_response(serializer.data)
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def user_stats(request):
-    """Get statistics for the current user"""
-    user = request.user
-    
-    # Count followers (users following this user)
-    followers_count = Follow.objects.filter(following=user).count()
-    
-    # Count following (users this user is following)
-    following_count = Follow.objects.filter(follower=user).count()
-    
-    # Count posts
-    total_posts = Post.objects.filter(author=user).count()
-    published_posts = Post.objects.filter(author=user, is_published=True).count()
-    draft_posts = Post.objects.filter(author=user, is_published=False).count()
-    
-    # Count total views from all user's posts
-    total_views = Post.objects.filter(author=user).aggregate(
-        total_views=models.Sum('views')
-    )['total_views'] or 0
-    
-    # Count total likes received on all user's posts
-    total_likes = Post.objects.filter(author=user).aggregate(
-        total_likes=models.Count('likes')
-    )['total_likes'] or 0
-    
-    # Count saved posts by this user
-    saved_posts_count = SavedPost.objects.filter(user=user).count()
-    
-    stats = {
-        'followers': followers_count,
-        'following': following_count,
-        'posts': total_posts,
-        'published_posts': published_posts,
-        'drafts': draft_posts,
-        'views': total_views,
-        'likes': total_likes,
-        'saved_posts': saved_posts_count
-    }
-    
-    return Response(stats)
-
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def user_posts_list(request):
@@ -550,7 +517,8 @@ def user_following_list(request):
         )
 
 @api_view(['POST'])
-@authentication_classes([TokenAuthentication])
+@throttle_classes(WRITE_THROTTLES)
+@authentication_classes([CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 def save_post(request, post_id=None):
     """Save a post to user's library"""
@@ -589,6 +557,7 @@ def save_post(request, post_id=None):
         else:
             # Save the post
             saved_post = SavedPost.objects.create(user=user, post=post)
+            enqueue('notifications.save', {'post_id': post.id, 'user_id': user.id})
             serializer = SavedPostSerializer(saved_post, context={'request': request})
             
             return Response({
@@ -605,35 +574,13 @@ def save_post(request, post_id=None):
 
 
 @api_view(['GET'])
-@authentication_classes([TokenAuthentication])
+@authentication_classes([CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 def user_stats(request):
-    """Get user statistics for dashboard"""
+    """Get user statistics for dashboard (one row of AuthorStats, kept current by author_stats.py)"""
     try:
-        user = request.user
-        
-        # Count user's posts
-        posts_count = Post.objects.filter(author=user).count()
-        
-        # Count user's followers
-        followers_count = Follow.objects.filter(following=user).count()
-        
-        # Count user's drafts (unpublished posts)
-        drafts_count = Post.objects.filter(author=user, is_published=False).count()
-        
-        # Calculate total views (sum of views from all user's posts)
-        total_views = Post.objects.filter(author=user).aggregate(
-            total=models.Sum('views')
-        )['total'] or 0
-        
-        stats = {
-            'posts': posts_count,
-            'followers': followers_count,
-            'drafts': drafts_count,
-            'views': total_views
-        }
-        
-        return Response(stats)
+        stats = AuthorStats.for_user(request.user.pk)
+        return Response({counter: getattr(stats, counter) for counter in AuthorStats.COUNTERS})
     except Exception as e:
         return Response(
             {'error': 'Failed to fetch user stats'}, 
@@ -642,61 +589,16 @@ def user_stats(request):
 
 
 @api_view(['GET'])
-@authentication_classes([TokenAuthentication])
+@authentication_classes([CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 def admin_dashboard_stats(request):
-    """Get admin dashboard statistics with accurate counts and trends"""
+    """
+    Get admin dashboard statistics with counts and trends, served from the
+    snapshot kept fresh by the job worker (see stats.py); ?refresh=true recomputes it
+    """
     try:
-        from authentication.models import User
-        from datetime import datetime, timedelta
-        from django.utils import timezone
-        
-        # Get current date and last month date for trend calculations
-        now = timezone.now()
-        last_month = now - timedelta(days=30)
-        
-        # Total Users
-        total_users = User.objects.count()
-        users_last_month = User.objects.filter(date_joined__gte=last_month).count()
-        users_trend = round((users_last_month / max(total_users - users_last_month, 1)) * 100, 1) if total_users > users_last_month else 0
-        
-        # Total Posts
-        total_posts = Post.objects.count()
-        posts_last_month = Post.objects.filter(created_at__gte=last_month).count()
-        posts_trend = round((posts_last_month / max(total_posts - posts_last_month, 1)) * 100, 1) if total_posts > posts_last_month else 0
-        
-        # Total Categories
-        total_categories = Category.objects.filter(is_active=True).count()
-        categories_last_month = Category.objects.filter(created_at__gte=last_month).count()
-        categories_trend = round((categories_last_month / max(total_categories - categories_last_month, 1)) * 100, 1) if total_categories > categories_last_month else 0
-        
-        # Total Comments
-        total_comments = Comment.objects.count()
-        comments_last_month = Comment.objects.filter(created_at__gte=last_month).count()
-        comments_trend = round((comments_last_month / max(total_comments - comments_last_month, 1)) * 100, 1) if total_comments > comments_last_month else 0
-        
-        # Recent Users (latest 5)
-        recent_users = User.objects.order_by('-date_joined')[:5]
-        recent_users_data = [{
-            'id': user.id,
-            'username': user.username,
-            'email': user.email,
-            'date_joined': user.date_joined
-        } for user in recent_users]
-        
-        stats = {
-            'total_users': total_users,
-            'users_trend': users_trend,
-            'total_posts': total_posts,
-            'posts_trend': posts_trend,
-            'total_categories': total_categories,
-            'categories_trend': categories_trend,
-            'total_comments': total_comments,
-            'comments_trend': comments_trend,
-            'recent_users': recent_users_data
-        }
-        
-        return Response(stats)
+        refresh = request.GET.get('refresh', '').lower() in ('1', 'true')
+        return Response(dashboard_stats(refresh=refresh))
     except Exception as e:
         return Response(
             {'error': 'Failed to fetch admin dashboard stats'}, 
@@ -704,7 +606,27 @@ def admin_dashboard_stats(request):
         )
 
 @api_view(['GET'])
-@authentication_classes([TokenAuthentication])
+@authentication_classes([CachedTokenAuthentication, SnapshotJWTAuthentication])
+@permission_classes([IsAuthenticated])
+def job_queue_stats(request):
+    """Get background job queue depth and processing lag (admin only)"""
+    if not request.user.is_staff and not request.user.is_superuser:
+        return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
+    
+    return Response(queue_stats())
+
+@api_view(['GET'])
+@authentication_classes([CachedTokenAuthentication, SnapshotJWTAuthentication])
+@permission_classes([IsAuthenticated])
+def db_pool_stats(request):
+    """Get database connection pool metrics for this worker process (admin only)"""
+    if not request.user.is_staff and not request.user.is_superuser:
+        return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
+    
+    return Response(pool_stats())
+
+@api_view(['GET'])
+@authentication_classes([CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 def current_user_posts(request):
     """Get all posts by the current user"""
@@ -747,118 +669,7 @@ def current_user_posts(request):
 
 
 @api_view(['GET'])
-def trending_posts(request):
-    """Get trending posts using Exponential Decay Algorithm"""
-    try:
-        from datetime import datetime, timedelta
-        
-        # Get all published posts from the last 30 days (wider range for algorithm)
-        month_ago = datetime.now() - timedelta(days=30)
-        
-        # Get posts with related data for efficiency
-        posts = Post.objects.filter(
-            is_published=True,
-            created_at__gte=month_ago
-        ).select_related('author', 'category').prefetch_related('likes', 'comments')
-        
-        # Calculate trending scores for all posts
-        posts_with_scores = []
-        for post in posts:
-            # Calculate trending score using our algorithm
-            score = post.trending_score(decay_hours=24, lambda_decay=0.1)
-            
-            # Only include posts with engagement (score > 0)
-            if score > 0:
-                posts_with_scores.append({
-                    'post': post,
-                    'trending_score': score
-                })
-        
-        # Sort by trending score (highest first)
-        posts_with_scores.sort(key=lambda x: x['trending_score'], reverse=True)
-        
-        # Get top 10 trending posts
-        top_trending = posts_with_scores[:10]
-        
-        # Format response data
-        posts_data = []
-        for item in top_trending:
-            post = item['post']
-            
-            posts_data.append({
-                'id': post.id,
-                'title': post.title,
-                'content': post.content,
-                'excerpt': post.excerpt,
-                'created_at': post.created_at,
-                'views': post.view_count(),
-                'like_count': post.like_count(),
-                'comment_count': post.comment_count(),
-                'trending_score': item['trending_score'],  # Include the algorithm score
-                'author': {
-                    'id': post.author.id,
-                    'username': post.author.username,
-                    'first_name': post.author.first_name,
-                    'last_name': post.author.last_name
-                },
-                'category': {
-                    'id': post.category.id,
-                    'name': post.category.name,
-                    'slug': post.category.slug
-                } if post.category else None
-            })
-        
-        return Response({
-            'results': posts_data,
-            'algorithm_info': {
-                'name': 'Time Delay Weighted Engagement Algorithm',
-                'description': 'Uses exponential decay to prioritize recent engagement',
-                'formula': '(comments×5 + likes×3 + views×1) × e^(-λ×hours_since_decay)',
-                'decay_hours': 24,
-                'lambda_decay': 0.1
-            }
-        })
-        
-    except Exception as e:
-        return Response(
-            {'error': 'Failed to fetch trending posts'}, 
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
-
-
-@api_view(['GET'])
-def search_posts(request):
-    """Search posts by title, content, or author"""
-    query = request.GET.get('q', '').strip()
-    
-    if not query:
-        return Response([], status=status.HTTP_200_OK)
-    
-    try:
-        # Search in title, content, excerpt, and author username
-        posts = Post.objects.filter(
-            Q(title__icontains=query) |
-            Q(content__icontains=query) |
-            Q(excerpt__icontains=query) |
-            Q(author__username__icontains=query),
-            is_published=True
-        ).select_related('author', 'category').prefetch_related('likes', 'comments').order_by('-created_at')
-        
-        # Limit results to prevent overwhelming response
-        posts = posts[:50]
-        
-        serializer = PostSerializer(posts, many=True, context={'request': request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
-        
-    except Exception as e:
-        return Response(
-            {'error': 'Search failed. Please try again.'}, 
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
-
-
-@api_view(['GET'])
-@authentication_classes([TokenAuthentication])
+@authentication_classes([CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 def following_feed(request):
     """Get posts from users that the current user follows"""
@@ -891,39 +702,7 @@ def following_feed(request):
 
 
 @api_view(['GET'])
-@authentication_classes([TokenAuthentication])
-@permission_classes([IsAuthenticated])
-def all_comments_list(request):
-    """Get all comments for admin dashboard"""
-    try:
-        # Get all comments with related data including post author
-        comments = Comment.objects.select_related(
-            'author', 'post', 'post__author'
-        ).order_by('-created_at')
-        
-        # Handle search parameter
-        search = request.GET.get('search', '')
-        if search:
-            comments = comments.filter(
-                Q(content__icontains=search) |
-                Q(author__username__icontains=search) |
-                Q(post__title__icontains=search)
-            )
-        
-        # Apply pagination
-        paginator = PostPagination()
-        paginated_comments = paginator.paginate_queryset(comments, request)
-        serializer = AdminCommentSerializer(paginated_comments, many=True, context={'request': request})
-        return paginator.get_paginated_response(serializer.data)
-        
-    except Exception as e:
-        return Response(
-            {'error': 'Failed to fetch comments'}, 
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
-
-@api_view(['GET'])
-@authentication_classes([TokenAuthentication])
+@authentication_classes([CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 def comment_detail(request, pk):
     """Get, update, or delete a specific comment"""
@@ -952,7 +731,7 @@ def comment_detail(request, pk):
 
 
 @api_view(['GET', 'PUT', 'DELETE'])
-@authentication_classes([TokenAuthentication])
+@authentication_classes([CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 def category_detail(request, pk):
     """Get, update, or delete a specific category"""
@@ -994,11 +773,11 @@ def category_detail(request, pk):
 
 # Notification views
 @api_view(['GET'])
-@authentication_classes([TokenAuthentication])
+@authentication_classes([CachedTokenAuthentication, SnapshotJWTAuthentication])
 @permission_classes([IsAuthenticated])
 def notifications_list(request):
     """Get user's notifications"""
-    notifications = Notification.objects.filter(recipient=request.user).select_related('sender')
+    notifications = Notification.objects.filter(recipient_id=request.user.id).select_related('sender')
     
     # Filter by read status if specified
     is_read = request.GET.get('is_read')
@@ -1014,43 +793,130 @@ def notifications_list(request):
 
 
 @api_view(['PUT'])
-@authentication_classes([TokenAuthentication])
+@authentication_classes([CachedTokenAuthentication, SnapshotJWTAuthentication])
 @permission_classes([IsAuthenticated])
 def mark_notification_read(request, pk):
     """Mark a notification as read"""
-    notification = get_object_or_404(Notification, pk=pk, recipient=request.user)
+    notification = get_object_or_404(Notification, pk=pk, recipient_id=request.user.id)
     notification.mark_as_read()
+    publish_unread_count(request.user.id)
     return Response({'message': 'Notification marked as read'})
 
 
 @api_view(['PUT'])
-@authentication_classes([TokenAuthentication])
+@authentication_classes([CachedTokenAuthentication, SnapshotJWTAuthentication])
 @permission_classes([IsAuthenticated])
 def mark_all_notifications_read(request):
     """Mark all user's notifications as read"""
-    Notification.objects.filter(recipient=request.user, is_read=False).update(is_read=True)
+    Notification.mark_all_as_read(request.user)
+    publish_unread_count(request.user.id)
     return Response({'message': 'All notifications marked as read'})
 
 
-@api_view(['GET'])
-@authentication_classes([TokenAuthentication])
-@permission_classes([IsAuthenticated])
-def notifications_count(request):
-    """Get count of unread notifications"""
-    unread_count = Notification.objects.filter(recipient=request.user, is_read=False).count()
-    return Response({'unread_count': unread_count})
-
-
 @api_view(['DELETE'])
-@authentication_classes([TokenAuthentication])
+@authentication_classes([CachedTokenAuthentication, SnapshotJWTAuthentication])
 @permission_classes([IsAuthenticated])
 def delete_notification(request, pk):
     """Delete a notification"""
-    notification = get_object_or_404(Notification, pk=pk, recipient=request.user)
-    notification.delete()
+    notification = get_object_or_404(Notification, pk=pk, recipient_id=request.user.id)
+    notification.remove()
+    publish_unread_count(request.user.id)
     return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+def _authenticate_stream(request):
+    """
+    Resolve the token of an SSE request (EventSource cannot send headers, so ?token= is accepted).
+    DRF tokens and JWTs are both accepted; snapshot access tokens need no user lookup.
+    """
+    key = request.GET.get('token')
+    header = request.headers.get('Authorization', '')
+    if not key and header.startswith(('Token ', 'Bearer ')):
+        key = header.split(' ', 1)[1].strip()
+    if not key:
+        return None
+    
+    try:
+        if key.count('.') == 2:  # JWT (header.payload.signature)
+            authentication = SnapshotJWTAuthentication()
+            return authentication.get_user(authentication.get_validated_token(key))
+        user, _ = CachedTokenAuthentication().authenticate_credentials(key)
+    except (AuthenticationFailed, InvalidToken):
+        return None
+    return user
+
+
+def _initial_stream_events(user, last_event_id):
+    """Events sent when a stream (re)connects: missed notifications and the unread count"""
+    events = []
+    missed = Notification.events_after(user.id, last_event_id) if last_event_id else None
+    if missed is not None:
+        missed = list(missed.select_related('sender')[:50])
+        serialized = NotificationSerializer(missed, many=True).data
+        for notification, data in zip(missed, serialized):
+            events.append({
+                'type': 'notification',
+                'id': notification.event_id,
+                'data': data,
+            })
+    
+    unread_count = NotificationCounter.get_unread_count(user.id)
+    events.append({'type': 'unread_count', 'id': None, 'data': {'unread_count': unread_count}})
+    return events
+
+
+async def notifications_stream(request):
+    """Server-sent event stream of new notifications and unread count changes (ASGI only)"""
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+    if 'wsgi.version' in request.META:
+        # A never-ending stream would pin a sync worker forever
+        return JsonResponse({'error': 'Notification streams require the ASGI server'}, status=503)
+    
+    user = await sync_to_async(_authenticate_stream)(request)
+    if user is None:
+        return JsonResponse({'error': 'Authentication required'}, status=401)
+    
+    options = settings.REALTIME
+    transport = await sync_to_async(get_transport)()
+    await sync_to_async(transport.start)()
+    await sync_to_async(transport.mark_listening)(user.id)
+    # Subscribe before loading the initial state so nothing published in between is lost
+    queue = transport.broker.subscribe(user.id)
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        initial_events = await sync_to_async(_initial_stream_events)(user, last_event_id)
+    except Exception:
+        transport.broker.unsubscribe(user.id, queue)
+        raise
+    
+    async def event_stream():
+        loop = asyncio.get_running_loop()
+        marked_at = loop.time()
+        try:
+            yield f"retry: {options['RETRY_MS']}\n\n"
+            for event in initial_events:
+                yield format_event(event)
+            while True:
+                if loop.time() - marked_at >= options['HEARTBEAT_INTERVAL']:
+                    await sync_to_async(transport.mark_listening)(user.id)
+                    marked_at = loop.time()
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=options['HEARTBEAT_INTERVAL'])
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing an idle connection
+                    yield ': heartbeat\n\n'
+                    continue
+                yield format_event(event)
+        finally:
+            transport.broker.unsubscribe(user.id, queue)
+    
+    response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Disable proxy buffering (nginx)
+    return response
+
+
 
 @api_view(['GET'])
 def recommended_posts(request):
@@ -1148,6 +1014,7 @@ def all_users(request):
 
 
 @api_view(['GET'])
+@conditional_get(user_profile_validators)
 def user_profile_by_username(request, username):
     """Get user profile by username for profile pages"""
     from django.contrib.auth import get_user_model
@@ -1178,7 +1045,7 @@ def user_profile_by_username(request, username):
             'email': user.email,
             'bio': getattr(user, 'bio', ''),
             'avatar': getattr(user, 'avatar', ''),
-            'profile_image_url': user.profile_image_url,
+            'profile_image_url': user.get_profile_image_url(*requested_variant(request)),
             'website': getattr(user, 'website', ''),
             'twitter': getattr(user, 'twitter', ''),
             'linkedin': getattr(user, 'linkedin', ''),
@@ -1197,14 +1064,18 @@ def user_profile_by_username(request, username):
 
 # Comment Views
 @api_view(['GET', 'POST'])
+@conditional_get(comment_list_validators)
 def comment_list(request, post_pk):
     """Get comments for a post or create a new comment"""
     post = get_object_or_404(Post, pk=post_pk)
     
     if request.method == 'GET':
-        comments = Comment.objects.filter(post=post, parent=None).select_related('author').prefetch_related('replies__author')
-        serializer = CommentSerializer(comments, many=True, context={'request': request})
-        return Response(serializer.data)
+        # Top-level comments only; replies are paged through comment_replies
+        comments = with_comment_counts(Comment.objects.filter(post=post, parent=None))
+        paginator = CommentCursorPagination()
+        page = paginator.paginate_queryset(comments, request)
+        serializer = CommentSerializer(page, many=True, context=comment_page_context(request, page))
+        return paginator.get_paginated_response(serializer.data)
     
     elif request.method == 'POST':
         if not request.user.is_authenticated:
@@ -1213,19 +1084,42 @@ def comment_list(request, post_pk):
         serializer = CommentSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
             comment = serializer.save(author=request.user, post=post)
+            enqueue('notifications.comment', {'comment_id': comment.id})
             return Response(CommentSerializer(comment, context={'request': request}).data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['GET'])
+def comment_replies(request, pk):
+    """Get a page of direct replies to a comment"""
+    parent = get_object_or_404(Comment, pk=pk)
+    replies = with_comment_counts(Comment.objects.filter(parent=parent))
+    paginator = CommentCursorPagination()
+    page = paginator.paginate_queryset(replies, request)
+    serializer = CommentSerializer(page, many=True, context=comment_page_context(request, page))
+    return paginator.get_paginated_response(serializer.data)
+
+@api_view(['GET'])
+@authentication_classes([CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 def all_comments_list(request):
-    """Get all comments (admin view)"""
+    """Get a page of all comments (admin view); query params: page, page_size, search"""
     if not request.user.is_staff and not request.user.is_superuser:
         return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
     
-    comments = Comment.objects.all().select_related('author', 'post').order_by('-created_at')
-    serializer = AdminCommentSerializer(comments, many=True, context={'request': request})
-    return Response(serializer.data)
+    comments = Comment.objects.select_related('author', 'post', 'post__author').order_by('-created_at')
+    
+    search = request.GET.get('search', '')
+    if search:
+        comments = comments.filter(
+            Q(content__icontains=search) |
+            Q(author__username__icontains=search) |
+            Q(post__title__icontains=search)
+        )
+    
+    paginator = PostPagination()
+    page = paginator.paginate_queryset(comments, request)
+    serializer = AdminCommentSerializer(page, many=True, context={'request': request})
+    return paginator.get_paginated_response(serializer.data)
 
 @api_view(['GET', 'PUT', 'DELETE'])
 def comment_detail(request, pk):
@@ -1233,7 +1127,9 @@ def comment_detail(request, pk):
     comment = get_object_or_404(Comment, pk=pk)
     
     if request.method == 'GET':
-        serializer = CommentSerializer(comment, context={'request': request})
+        # The comment with its whole branch of replies, loaded in one query
+        comments, context = load_comment_thread(request, root=comment)
+        serializer = CommentSerializer(comments[0], context=context)
         return Response(serializer.data)
     
     elif request.method == 'PUT':
@@ -1258,6 +1154,7 @@ def comment_detail(request, pk):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 @api_view(['POST'])
+@throttle_classes(WRITE_THROTTLES)
 @permission_classes([IsAuthenticated])
 def like_comment(request, pk):
     """Like or unlike a comment"""
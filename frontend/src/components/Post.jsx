@@ -9,6 +9,7 @@ import { useToast } from '../context/ToastContext';
 import { useLike } from '../contexts/LikeContext';
 import { useFollow } from '../contexts/FollowContext';
 import PremiumBadge from './PremiumBadge';
+import useComments from '../hooks/useComments';
 
 const Post = ({ post, onLike, onFollow, onComment, onSave, onPostClick }) => {
   const navigate = useNavigate();
@@ -23,7 +24,7 @@ const Post = ({ post, onLike, onFollow, onComment, onSave, onPostClick }) => {
   const [isLiked, setIsLiked] = useState(currentLike.is_liked);
   const [likeCount, setLikeCount] = useState(currentLike.like_count);
   const [isLiking, setIsLiking] = useState(false);
-  const [comments, setComments] = useState(post.comments || []);
+  const { comments, setComments, commentsLoaded, loadingComments, hasMoreComments, loadComments, loadMoreComments } = useComments(post.id);
   const [commentCount, setCommentCount] = useState(post.comment_count);
   const [isSaved, setIsSaved] = useState(post.is_saved || false);
   const [isFollowLoading, setIsFollowLoading] = useState(false);
@@ -371,7 +372,11 @@ const Post = ({ post, onLike, onFollow, onComment, onSave, onPostClick }) => {
             </button>
             
             <button
-              onClick={() => setShowComments(!showComments)}
+              onClick={() => {
+                // Comments are fetched page by page the first time the thread is opened
+                if (!showComments && !commentsLoaded) loadComments();
+                setShowComments(!showComments);
+              }}
               className="flex items-center space-x-1 text-sm text-gray-500 hover:text-blue-500 transition-colors"
             >
               <MessageCircle className="w-4 h-4" />
@@ -446,9 +451,20 @@ const Post = ({ post, onLike, onFollow, onComment, onSave, onPostClick }) => {
                   </div>
                 </div>
               ))
+            ) : loadingComments ? (
+              <p className="text-gray-500 text-sm text-center py-4">Loading comments...</p>
             ) : (
               <p className="text-gray-500 text-sm text-center py-4">No comments yet. Be the first to comment!</p>
             )}
+            {hasMoreComments && (
+              <button
+                onClick={loadMoreComments}
+                disabled={loadingComments}
+                className="w-full text-sm text-blue-600 hover:text-blue-700 py-2 disabled:opacity-50"
+              >
+                {loadingComments ? 'Loading...' : 'Load more comments'}
+              </button>
+            )}
           </div>
         </div>
       )}
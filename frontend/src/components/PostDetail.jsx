@@ -10,6 +10,7 @@ import useToast from '../hooks/useToast';
 import { ToastContainer } from './ToastNotification';
 import PremiumBadge from './PremiumBadge';
 import PremiumPaywall from './PremiumPaywall';
+import useComments from '../hooks/useComments';
 
 const PostDetail = () => {
   const { id: postId } = useParams();
@@ -21,6 +22,7 @@ const PostDetail = () => {
   const [showComments, setShowComments] = useState(false);
   const [newComment, setNewComment] = useState('');
   const [submittingComment, setSubmittingComment] = useState(false);
+  const { comments, setComments, commentsLoaded, loadingComments, hasMoreComments, loadComments, loadMoreComments } = useComments(postId);
   const { toasts, showWarning, showSuccess, showError, removeToast } = useToast();
 
   // Check if user is logged in
@@ -266,11 +268,11 @@ const PostDetail = () => {
           ...newCommentData
         };
         
+        setComments(prev => [...prev, commentToAdd]);
         setPost(prev => {
           if (!prev) return prev;
           return {
             ...prev,
-            comments: [...(prev.comments || []), commentToAdd],
             comment_count: (prev.comment_count || 0) + 1
           };
         });
@@ -700,7 +702,11 @@ if (!post) {
             </button>
             {/* Comment Button */}
             <button
-              onClick={() => setShowComments(!showComments)}
+              onClick={() => {
+                // Comments are fetched page by page the first time the thread is opened
+                if (!showComments && !commentsLoaded) loadComments();
+                setShowComments(!showComments);
+              }}
               className="flex items-center space-x-2 px-4 py-2 rounded-lg transition-colors text-gray-600 hover:text-blue-600"
             >
               <MessageCircle className="w-5 h-5" />
@@ -763,8 +769,8 @@ if (!post) {
 
             {/* Comments List */}
             <div className="space-y-6">
-              {post.comments && post.comments.length > 0 ? (
-                post.comments.map((comment) => (
+              {comments.length > 0 ? (
+                comments.map((comment) => (
                   <div key={comment.id} className="border-b border-gray-100 pb-6">
                     <div className="flex items-start space-x-3">
                       <div className="w-10 h-10 bg-gray-300 rounded-full flex items-center justify-center flex-shrink-0">
@@ -786,9 +792,20 @@ if (!post) {
                     </div>
                   </div>
                 ))
+              ) : loadingComments ? (
+                <p className="text-center text-gray-500 py-8">Loading comments...</p>
               ) : (
                 <p className="text-center text-gray-500 py-8">No comments yet. Be the first to comment!</p>
               )}
+              {hasMoreComments && (
+                <button
+                  onClick={loadMoreComments}
+                  disabled={loadingComments}
+                  className="w-full text-blue-600 hover:text-blue-700 font-medium py-2 disabled:opacity-50"
+                >
+                  {loadingComments ? 'Loading...' : 'Load more comments'}
+                </button>
+              )}
             </div>
           </div>
         )}
@@ -304,7 +304,6 @@ const PostList = ({ selectedCategory, refreshTrigger, searchQuery, searchResults
             if (post.id === postId) {
               return {
                 ...post,
-                comments: [...(post.comments || []), newComment],
                 comment_count: (post.comment_count || 0) + 1
               };
             }
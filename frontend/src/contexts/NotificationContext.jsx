@@ -144,17 +144,49 @@ export const NotificationProvider = ({ children }) => {
     }
   };
 
-  // Auto-refresh notifications every 30 seconds
+  // Live updates over server-sent events, falling back to polling every 30 seconds
   useEffect(() => {
     if (user) {
       fetchNotifications();
       fetchUnreadCount();
-      
-      const interval = setInterval(() => {
-        fetchUnreadCount();
-      }, 30000); // 30 seconds
 
-      return () => clearInterval(interval);
+      let interval = null;
+      const startPolling = () => {
+        if (!interval) {
+          interval = setInterval(() => {
+            fetchUnreadCount();
+          }, 30000); // 30 seconds
+        }
+      };
+
+      const token = localStorage.getItem('token');
+      if (typeof EventSource === 'undefined' || !token) {
+        startPolling();
+        return () => clearInterval(interval);
+      }
+
+      // EventSource reconnects on its own and resumes from the last event id
+      const source = new EventSource(
+        `${API_CONFIG.BASE_URL}/api/posts/notifications/stream/?token=${encodeURIComponent(token)}`
+      );
+      source.addEventListener('notification', (event) => {
+        const notification = JSON.parse(event.data);
+        setNotifications(prev => [notification, ...prev.filter(notif => notif.id !== notification.id)]);
+      });
+      source.addEventListener('unread_count', (event) => {
+        setUnreadCount(JSON.parse(event.data).unread_count || 0);
+      });
+      source.onerror = () => {
+        // CLOSED means the server refused the stream (e.g. no ASGI server); poll instead
+        if (source.readyState === EventSource.CLOSED) {
+          startPolling();
+        }
+      };
+
+      return () => {
+        source.close();
+        if (interval) clearInterval(interval);
+      };
     } else {
       setNotifications([]);
       setUnreadCount(0);
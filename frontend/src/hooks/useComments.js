@@ -0,0 +1,55 @@
+import { useState, useCallback } from 'react';
+import API_CONFIG from '../config/api';
+
+// Pages through a post's top-level comments using the cursor links returned by the API
+export const useComments = (postId) => {
+  const [comments, setComments] = useState([]);
+  const [nextUrl, setNextUrl] = useState(null);
+  const [commentsLoaded, setCommentsLoaded] = useState(false);
+  const [loadingComments, setLoadingComments] = useState(false);
+
+  const fetchPage = useCallback(async (url, reset) => {
+    setLoadingComments(true);
+    try {
+      const token = localStorage.getItem('token');
+      const headers = { 'Content-Type': 'application/json' };
+      if (token) {
+        headers['Authorization'] = `Token ${token}`;
+      }
+
+      const response = await fetch(url, { headers });
+      if (response.ok) {
+        const data = await response.json();
+        setComments(prev => (reset ? data.results : [...prev, ...data.results]));
+        setNextUrl(data.next);
+        setCommentsLoaded(true);
+      }
+    } catch (error) {
+      console.error('Error fetching comments:', error);
+    } finally {
+      setLoadingComments(false);
+    }
+  }, []);
+
+  const loadComments = useCallback(() => {
+    return fetchPage(`${API_CONFIG.BASE_URL}/api/posts/${postId}/comments/`, true);
+  }, [fetchPage, postId]);
+
+  const loadMoreComments = useCallback(() => {
+    if (nextUrl) {
+      return fetchPage(nextUrl, false);
+    }
+  }, [fetchPage, nextUrl]);
+
+  return {
+    comments,
+    setComments,
+    commentsLoaded,
+    loadingComments,
+    hasMoreComments: Boolean(nextUrl),
+    loadComments,
+    loadMoreComments,
+  };
+};
+
+export default useComments;